@@ -0,0 +1,108 @@
+"""
+Benchmark das codificações de resposta (formato x compressão).
+
+Gera listas sintéticas de LivroComCompras e UsuarioComCompras, serializadas
+como o FastAPI faria, e mede o tempo de CPU de codificação contra os bytes
+economizados em relação ao JSON puro.
+
+Uso:
+    python -m benchmarks.encoding [--itens 100] [--compras 20] [--repeticoes 20]
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from middlewares.encoding import COMPRESSORES, comprimir, msgpack, serializar
+
+
+def _compras(quantidade: int, livro_id: int | None = None, usuario_id: int | None = None) -> list[dict]:
+    inicio = datetime(2025, 1, 1)
+    return [
+        {
+            "usuario_id": usuario_id or random.randint(1, 10_000),
+            "livro_id": livro_id or random.randint(1, 10_000),
+            "preco_pago": round(random.uniform(10, 300), 2),
+            "quantidade_comprados": random.randint(1, 5),
+            "data_compra": (inicio + timedelta(seconds=random.randint(0, 31_536_000))).isoformat(),
+        }
+        for _ in range(quantidade)
+    ]
+
+
+def gerar_livros(itens: int, compras: int) -> bytes:
+    livros = [
+        {
+            "id": i,
+            "titulo": f"Livro de exemplo número {i}",
+            "autor": f"Autor {i % 300}",
+            "quantidade_paginas": random.randint(80, 900),
+            "editora": f"Editora {i % 40}",
+            "genero": random.choice(["Romance", "Fantasia", "Ficção", "Biografia", "Técnico"]),
+            "quantidade_estoque": random.randint(0, 500),
+            "preco_uni": round(random.uniform(10, 200), 2),
+            "admin_id": i % 7 + 1,
+            "compras": _compras(compras, livro_id=i),
+        }
+        for i in range(1, itens + 1)
+    ]
+    return json.dumps(livros, separators=(",", ":")).encode()
+
+
+def gerar_usuarios(itens: int, compras: int) -> bytes:
+    usuarios = [
+        {
+            "id": i,
+            "nome": f"Usuário {i}",
+            "email": f"usuario{i}@exemplo.com",
+            "endereco": f"Rua {i}, Centro",
+            "telefone": f"(11) 9{i:08d}",
+            "livros_comprados": _compras(compras, usuario_id=i),
+        }
+        for i in range(1, itens + 1)
+    ]
+    return json.dumps(usuarios, separators=(",", ":")).encode()
+
+
+def _medir(funcao, repeticoes: int) -> tuple[float, bytes]:
+    tempos = []
+    resultado = b""
+    for _ in range(repeticoes):
+        inicio = time.process_time_ns()
+        resultado = funcao()
+        tempos.append(time.process_time_ns() - inicio)
+    return statistics.median(tempos) / 1e6, resultado
+
+
+def executar(nome: str, corpo_json: bytes, repeticoes: int) -> None:
+    formatos = ["json"] + (["msgpack"] if msgpack is not None else [])
+    codificacoes = [None, *COMPRESSORES]
+
+    print(f"\n{nome}: {len(corpo_json)} bytes em JSON")
+    print(f"{'formato':<9}{'compressão':<12}{'bytes':>10}{'economia':>10}{'cpu (ms)':>10}")
+    for formato in formatos:
+        for codificacao in codificacoes:
+            def codificar():
+                corpo = serializar(corpo_json, formato)
+                return comprimir(corpo, codificacao) if codificacao else corpo
+
+            cpu_ms, corpo = _medir(codificar, repeticoes)
+            economia = 1 - len(corpo) / len(corpo_json)
+            print(f"{formato:<9}{codificacao or '-':<12}{len(corpo):>10}{economia:>10.1%}{cpu_ms:>10.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--itens", type=int, default=100)
+    parser.add_argument("--compras", type=int, default=20)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(42)
+    executar("LivroComCompras", gerar_livros(args.itens, args.compras), args.repeticoes)
+    executar("UsuarioComCompras", gerar_usuarios(args.itens, args.compras), args.repeticoes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Orçamento de tempo de importação da aplicação.
+
+Executa `python -X importtime -c "import main"` em um processo novo, soma o
+tempo de importação e lista os módulos mais caros. Termina com código 1 quando
+o total passa do orçamento, para ser usado como verificação de CI.
+
+Uso:
+    python -m benchmarks.import_time [--orcamento-ms 1500] [--top 15]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+def medir_importacao(modulo: str = "main") -> list[tuple[str, int, int]]:
+    """
+    Mede o tempo de importação de um módulo em um interpretador novo.
+
+    Args:
+        modulo (str): Módulo a ser importado.
+
+    Returns:
+        list[tuple[str, int, int]]: (módulo, tempo próprio em µs, tempo acumulado em µs).
+    """
+    ambiente = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    ambiente.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./banco-livraria.bd")
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True, text=True, env=ambiente, check=True,
+    )
+    medidas = []
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, acumulado, nome = linha.removeprefix("import time:").split("|")
+        medidas.append((nome.strip(), int(proprio), int(acumulado)))
+    return medidas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orcamento-ms", type=float,
+                        default=float(os.getenv("ORCAMENTO_IMPORTACAO_MS", 1500)))
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    medidas = medir_importacao()
+    total_ms = sum(proprio for _, proprio, _ in medidas) / 1000
+
+    print(f"{'módulo':<50}{'próprio (ms)':>14}{'acumulado (ms)':>16}")
+    for nome, proprio, acumulado in sorted(medidas, key=lambda m: m[1], reverse=True)[:args.top]:
+        print(f"{nome:<50}{proprio / 1000:>14.1f}{acumulado / 1000:>16.1f}")
+    print(f"\nTotal: {total_ms:.1f} ms (orçamento: {args.orcamento_ms:.0f} ms)")
+
+    if total_ms > args.orcamento_ms:
+        print("Orçamento de importação excedido", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Orçamento de latência da série temporal de vendas (/compras/metrics/serie).
+
+Cria um banco SQLite descartável com as migrations, insere compras
+sintéticas espalhadas por dois anos e mede a consulta da série diária de um
+ano (geral e filtrada por livro), com o mesmo SQL montado pela rota. Termina
+com código 1 quando o p95 passa do orçamento, para ser usado em CI.
+
+Uso:
+    python -m benchmarks.serie_vendas [--compras 2000000] [--orcamento-ms 800] [--repeticoes 10]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine, text
+from scripts.verificar_planos import migrar, _url_sincrona
+from services.series import agregar, consulta_serie_vendas
+
+LOTE = 100_000
+
+
+def popular(engine, compras: int, livros: int = 20_000, usuarios: int = 50_000) -> None:
+    """
+    Insere livros, usuários e compras sintéticos (dois anos a partir de 2024).
+    """
+    random.seed(11)
+    inicio = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO usuarios (id, nome, email, endereco, telefone, total_compras, total_gasto, "
+                          "updated_at) VALUES (:id, 'U', 'u' || :id || '@x', 'r', '0', 0, 0, :agora)"),
+                     [{"id": i, "agora": inicio} for i in range(1, usuarios + 1)])
+        conn.execute(text("INSERT INTO generos (id, nome) VALUES (1, 'G')"))
+        conn.execute(text("INSERT INTO editoras (id, nome) VALUES (1, 'E')"))
+        conn.execute(text("INSERT INTO livros (id, titulo, autor, quantidade_paginas, editora_id, genero_id, "
+                          "quantidade_estoque, preco_uni, total_vendido, receita_total, updated_at, "
+                          "estoque_fragmentado) VALUES (:id, 'L', 'A', 100, 1, 1, 10, 30, 0, 0, :agora, 0)"),
+                     [{"id": i, "agora": inicio} for i in range(1, livros + 1)])
+        for base in range(0, compras, LOTE):
+            conn.execute(text("INSERT INTO livroscompras (usuario_id, livro_id, data_compra, preco_pago, "
+                              "quantidade_comprados, updated_at) VALUES (:u, :l, :d, :p, :q, :d)"), [
+                {
+                    "u": random.randint(1, usuarios), "l": random.randint(1, livros),
+                    "d": inicio + timedelta(seconds=random.randint(0, 2 * 31_536_000)),
+                    "p": round(random.uniform(5, 900), 2), "q": random.randint(1, 3),
+                }
+                for _ in range(min(LOTE, compras - base))
+            ])
+        conn.exec_driver_sql("ANALYZE")
+
+
+def medir(engine, consulta, repeticoes: int) -> list[float]:
+    tempos = []
+    with engine.connect() as conn:
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            agregar(conn.execute(consulta), date(2024, 1, 1), date(2024, 12, 31), "day")
+            tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--compras", type=int, default=2_000_000, help="Quantidade de compras sintéticas")
+    parser.add_argument("--orcamento-ms", type=float, default=800, help="p95 máximo da série diária de um ano")
+    parser.add_argument("--repeticoes", type=int, default=10)
+    args = parser.parse_args()
+
+    casos = {
+        "1 ano por dia": consulta_serie_vendas(date(2024, 1, 1), date(2024, 12, 31)),
+        "1 ano por dia, um livro": consulta_serie_vendas(date(2024, 1, 1), date(2024, 12, 31), livro_id=42),
+    }
+    estouros = 0
+    with tempfile.TemporaryDirectory() as diretorio:
+        url = f"sqlite+aiosqlite:///{os.path.join(diretorio, 'serie.bd')}"
+        migrar(url)
+        engine = create_engine(_url_sincrona(url))
+        try:
+            inicio = time.perf_counter()
+            popular(engine, args.compras)
+            print(f"{args.compras} compras inseridas em {time.perf_counter() - inicio:.1f} s")
+            for nome, consulta in casos.items():
+                tempos = medir(engine, consulta, args.repeticoes)
+                p95 = statistics.quantiles(tempos, n=20)[-1] if len(tempos) > 1 else tempos[0]
+                estourou = p95 > args.orcamento_ms
+                estouros += estourou
+                print(f"[{'ESTOUROU' if estourou else 'ok'}] {nome}: "
+                      f"p50 {statistics.median(tempos):.1f} ms, p95 {p95:.1f} ms")
+        finally:
+            engine.dispose()
+
+    if estouros:
+        print(f"\np95 acima do orçamento de {args.orcamento_ms:.0f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,159 @@
-import sqlite3
+import asyncio
 from sqlmodel import SQLModel
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy import event, Engine
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy import event, text
 from dotenv import load_dotenv
 import logging
 import ssl
 import os
+from middlewares.deadline import instrumentar
 
 load_dotenv()
 
-logging.basicConfig()
-logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+_engine: AsyncEngine | None = None
+_session_factory: async_sessionmaker[AsyncSession] | None = None
+pronto = False
 
-DATABASE_URL = os.getenv("DATABASE_URL")
 
-if DATABASE_URL.startswith("postgresql"):
-    ssl_ctx = ssl.create_default_context()
-    connect_args = {"ssl": ssl_ctx}
-else:
-    connect_args = {}
+def configurar_logging() -> None:
+    """
+    Configura o logging da aplicação.
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=True,
-    connect_args=connect_args
-)
+    O log de SQL do SQLAlchemy só é ligado quando SQL_ECHO=true, pois o
+    custo de formatar cada instrução pesa nas rotas mais acessadas.
+    """
+    logging.basicConfig()
+    if os.getenv("SQL_ECHO", "false").lower() == "true":
+        logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+
+
+def get_engine() -> AsyncEngine:
+    """
+    Retorna o engine assíncrono, criando-o na primeira chamada.
+
+    A URL é lida de DATABASE_URL somente quando o engine é necessário, o que
+    mantém a importação dos módulos barata (inclusive para o Alembic e scripts).
+
+    Returns:
+        AsyncEngine: Engine compartilhado pela aplicação.
+    """
+    global _engine, _session_factory
+    if _engine is None:
+        _engine = criar_engine(os.getenv("DATABASE_URL"))
+        _session_factory = async_sessionmaker(
+            _engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+        )
+    return _engine
+
+
+def criar_engine(database_url: str, chaves_estrangeiras: bool = True) -> AsyncEngine:
+    """
+    Cria um engine assíncrono com as opções de conexão de cada banco e o prazo
+    das requisições aplicado às instruções (ver middlewares.deadline).
+
+    Args:
+        database_url (str): URL assíncrona (postgresql+asyncpg ou sqlite+aiosqlite).
+        chaves_estrangeiras (bool): Liga as chaves estrangeiras no SQLite.
+
+    Returns:
+        AsyncEngine: Engine novo.
+    """
+    if database_url.startswith("postgresql"):
+        ssl_ctx = ssl.create_default_context()
+        connect_args = {"ssl": ssl_ctx}
+    else:
+        connect_args = {}
+
+    engine = create_async_engine(
+        database_url,
+        connect_args=connect_args
+    )
+    if database_url.startswith("sqlite") and chaves_estrangeiras:
+        event.listen(engine.sync_engine, "connect", set_sqlite_pragma)
+    instrumentar(engine)
+    return engine
+
+
+def async_session() -> AsyncSession:
+    """
+    Cria uma nova sessão assíncrona ligada ao engine da aplicação.
+
+    Returns:
+        AsyncSession: Sessão nova (usar com `async with`).
+    """
+    get_engine()
+    return _session_factory()
 
-async_session = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
 
 async def get_session() -> AsyncSession:
     async with async_session() as session:
         yield session
 
-@event.listens_for(Engine, "connect")
+
+async def aquecer(consultas: list, conexoes: int | None = None) -> None:
+    """
+    Pré-conecta o pool e prepara as consultas mais usadas.
+
+    Abre várias conexões ao mesmo tempo (preenchendo o pool) e executa em cada
+    uma as consultas informadas. Isso popula o cache de compilação do SQLAlchemy
+    e, no asyncpg, o cache de prepared statements de cada conexão.
+
+    Args:
+        consultas (list): Instruções (select) representativas das rotas quentes.
+        conexoes (int | None): Quantidade de conexões a abrir (padrão: tamanho do pool).
+    """
+    engine = get_engine()
+    if conexoes is None:
+        conexoes = getattr(engine.pool, "size", lambda: 1)()
+
+    async def preparar_conexao():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            session = AsyncSession(bind=conn)
+            for consulta in consultas:
+                await session.execute(consulta)
+            await session.close()
+
+    await asyncio.gather(*(preparar_conexao() for _ in range(conexoes)))
+
+
+async def verificar_prontidao() -> bool:
+    """
+    Verifica se o banco responde.
+
+    Returns:
+        bool: True se um SELECT simples foi executado com sucesso.
+    """
+    try:
+        async with get_engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+
+
+async def encerrar() -> None:
+    """
+    Fecha as conexões do pool e descarta o engine.
+    """
+    global _engine, _session_factory, pronto
+    pronto = False
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+        _session_factory = None
+
+
 def set_sqlite_pragma(dbapi_connection, connection_record):
-    if isinstance(dbapi_connection, sqlite3.Connection):
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
-        cursor.close()
+    """
+    Liga a verificação de chaves estrangeiras (e as políticas ON DELETE) no SQLite.
+
+    Registrado apenas no engine da aplicação: o adaptador do aiosqlite não é um
+    sqlite3.Connection, e as migrações em lote do Alembic precisam das chaves
+    estrangeiras desligadas para recriar as tabelas.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
@@ -1,17 +1,78 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
-from sqlalchemy.exc import IntegrityError, NoResultFound
+from sqlalchemy.exc import DBAPIError, IntegrityError, NoResultFound
 from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
 
-from models import Admin, Usuario, Livro, LivrosCompras
-from routes import livro, admin, usuario, compras
+import database
+from metrics import metricas
+from routes import livro, admin, usuario, compras, sistema, relatorios, alteracoes, analytics
+from services import catalogo
+from services.relatorios import gerenciador as gerenciador_relatorios
+from services.invalidacao import barramento
+from services.autocomplete import indice as indice_autocomplete
+from services.shards import shards
+from middlewares.admission import AdmissionControlMiddleware
+from middlewares.coalescing import RequestCoalescingMiddleware
+from middlewares.encoding import ContentNegotiationMiddleware
+from middlewares.sql_counter import SQLCounterMiddleware
+from middlewares.deadline import DeadlineMiddleware, consulta_interrompida
+from middlewares import profiler
 
-app = FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida da aplicação.
+
+    Na inicialização cria o engine, pré-conecta o pool, prepara as consultas
+    das rotas mais acessadas e só então marca a aplicação como pronta.
+    Também carrega o mapeamento de gêneros e editoras, constrói o índice de
+    autocomplete e inicia os workers de relatórios e a escuta de invalidações
+    de cache.
+    No encerramento, para essas tarefas e descarta o pool de conexões.
+    """
+    database.configurar_logging()
+    await database.aquecer([
+        livro.consulta_listar_livros(),
+        livro.consulta_obter_livro(0),
+        usuario.consulta_obter_usuario(0),
+    ])
+    async with database.async_session() as session:
+        await catalogo.carregar(session)
+    await indice_autocomplete.construir()
+    await gerenciador_relatorios.iniciar()
+    await barramento.iniciar()
+    database.pronto = await database.verificar_prontidao() and await shards.verificar()
+    yield
+    await barramento.parar()
+    await gerenciador_relatorios.parar()
+    await shards.encerrar()
+    await database.encerrar()
+
+
+app = FastAPI(lifespan=lifespan)
+
+if os.getenv("SQL_DEBUG", "false").lower() == "true":
+    app.add_middleware(SQLCounterMiddleware)
+app.add_middleware(AdmissionControlMiddleware)
+app.add_middleware(RequestCoalescingMiddleware)
+app.add_middleware(ContentNegotiationMiddleware)
+if profiler.ATIVO:
+    app.add_middleware(profiler.ProfilerMiddleware)
+# O mais externo: os demais rodam na tarefa que ele cancela.
+app.add_middleware(DeadlineMiddleware)
 
 app.include_router(livro.router)
 app.include_router(admin.router)
 app.include_router(usuario.router)
 app.include_router(compras.router)
+app.include_router(sistema.router)
+app.include_router(relatorios.router)
+app.include_router(alteracoes.router)
+app.include_router(analytics.router)
 
 @app.exception_handler(IntegrityError)
 async def integrity_error_handler(request: Request, exc: IntegrityError):
@@ -20,6 +81,16 @@ async def integrity_error_handler(request: Request, exc: IntegrityError):
         content={"erro": "Violação de integridade referencial", "detalhes": str(exc.orig)}
     )
 
+@app.exception_handler(DBAPIError)
+async def dbapi_error_handler(request: Request, exc: DBAPIError):
+    if not consulta_interrompida(exc):
+        raise exc
+    metricas.incrementar("prazo.consultas_interrompidas")
+    return JSONResponse(
+        status_code=504,
+        content={"erro": "Tempo limite excedido", "detalhes": "Consulta interrompida pelo prazo da requisição"}
+    )
+
 @app.exception_handler(NoResultFound)
 async def no_result_handler(request: Request, exc: NoResultFound):
     return JSONResponse(
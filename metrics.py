@@ -0,0 +1,58 @@
+from collections import defaultdict
+from typing import Callable
+import threading
+
+
+class Metricas:
+    """
+    Registro simples de métricas em memória do processo.
+
+    Mantém contadores incrementais e coletores (funções chamadas no momento
+    da leitura) para valores instantâneos, como profundidade de filas.
+
+    Atributos:
+        _contadores (dict[str, float]): Contadores acumulados por nome.
+        _coletores (dict[str, Callable[[], dict]]): Funções que retornam métricas instantâneas.
+    """
+
+    def __init__(self):
+        self._contadores: dict[str, float] = defaultdict(float)
+        self._coletores: dict[str, Callable[[], dict]] = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, nome: str, valor: float = 1) -> None:
+        """
+        Incrementa um contador.
+
+        Args:
+            nome (str): Nome do contador.
+            valor (float): Valor a ser somado.
+        """
+        with self._lock:
+            self._contadores[nome] += valor
+
+    def registrar_coletor(self, nome: str, coletor: Callable[[], dict]) -> None:
+        """
+        Registra uma função que fornece métricas instantâneas.
+
+        Args:
+            nome (str): Nome do grupo de métricas.
+            coletor (Callable[[], dict]): Função chamada a cada leitura.
+        """
+        self._coletores[nome] = coletor
+
+    def snapshot(self) -> dict:
+        """
+        Retorna uma cópia de todas as métricas registradas.
+
+        Returns:
+            dict: Contadores e métricas dos coletores.
+        """
+        with self._lock:
+            dados = {"contadores": dict(self._contadores)}
+        for nome, coletor in self._coletores.items():
+            dados[nome] = coletor()
+        return dados
+
+
+metricas = Metricas()
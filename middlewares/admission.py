@@ -0,0 +1,210 @@
+import asyncio
+import os
+from collections import deque
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from metrics import metricas
+
+
+class LimiteSaturado(Exception):
+    """
+    Indica que a classe de rota está no limite de concorrência e com a fila cheia
+    (ou que o tempo máximo de espera na fila foi excedido).
+    """
+
+
+class Limitador:
+    """
+    Limitador de concorrência com fila de espera curta e limitada.
+
+    Diferente de um asyncio.Semaphore, permite alterar o limite e o tamanho
+    da fila em tempo de execução.
+
+    Atributos:
+        limite (int): Quantidade máxima de requisições executando ao mesmo tempo.
+        fila_max (int): Quantidade máxima de requisições aguardando vaga.
+        espera_max (float): Tempo máximo (segundos) de espera na fila.
+        ativos (int): Requisições executando no momento.
+    """
+
+    def __init__(self, limite: int, fila_max: int, espera_max: float):
+        self.limite = limite
+        self.fila_max = fila_max
+        self.espera_max = espera_max
+        self.ativos = 0
+        self._fila: deque[asyncio.Future] = deque()
+        self.rejeitadas = 0
+        self.admitidas = 0
+
+    @property
+    def profundidade_fila(self) -> int:
+        return len(self._fila)
+
+    async def adquirir(self) -> None:
+        """
+        Reserva uma vaga, aguardando na fila se necessário.
+
+        Raises:
+            LimiteSaturado: Se a fila estiver cheia ou a espera exceder espera_max.
+        """
+        if self.ativos < self.limite and not self._fila:
+            self.ativos += 1
+            self.admitidas += 1
+            return
+
+        if len(self._fila) >= self.fila_max:
+            self.rejeitadas += 1
+            raise LimiteSaturado()
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._fila.append(futuro)
+        try:
+            await asyncio.wait_for(asyncio.shield(futuro), timeout=self.espera_max)
+        except asyncio.TimeoutError:
+            if futuro.done() and not futuro.cancelled():
+                # A vaga foi concedida no mesmo instante do timeout.
+                self.admitidas += 1
+                return
+            futuro.cancel()
+            self.rejeitadas += 1
+            raise LimiteSaturado()
+        except asyncio.CancelledError:
+            if futuro.done() and not futuro.cancelled():
+                self.liberar()
+            else:
+                futuro.cancel()
+            raise
+        finally:
+            if futuro in self._fila:
+                self._fila.remove(futuro)
+        self.admitidas += 1
+
+    def liberar(self) -> None:
+        """
+        Libera uma vaga e repassa para as requisições na fila, se houver.
+        """
+        self.ativos -= 1
+        self._acordar()
+
+    def configurar(self, limite: int | None = None, fila_max: int | None = None,
+                   espera_max: float | None = None) -> None:
+        """
+        Altera os parâmetros do limitador em tempo de execução.
+
+        Args:
+            limite (int | None): Novo limite de concorrência.
+            fila_max (int | None): Novo tamanho máximo da fila.
+            espera_max (float | None): Novo tempo máximo de espera.
+        """
+        if limite is not None:
+            self.limite = limite
+        if fila_max is not None:
+            self.fila_max = fila_max
+        if espera_max is not None:
+            self.espera_max = espera_max
+        self._acordar()
+
+    def _acordar(self) -> None:
+        while self._fila and self.ativos < self.limite:
+            futuro = self._fila.popleft()
+            if futuro.done():
+                continue
+            self.ativos += 1
+            futuro.set_result(None)
+
+    def estado(self) -> dict:
+        return {
+            "limite": self.limite,
+            "fila_max": self.fila_max,
+            "espera_max": self.espera_max,
+            "ativos": self.ativos,
+            "profundidade_fila": self.profundidade_fila,
+            "admitidas": self.admitidas,
+            "rejeitadas": self.rejeitadas,
+        }
+
+
+def classificar_rota(metodo: str, caminho: str) -> str | None:
+    """
+    Define a classe de rota usada no controle de admissão.
+
+    Args:
+        metodo (str): Método HTTP.
+        caminho (str): Caminho da requisição.
+
+    Returns:
+        str | None: "compras", "busca", "leitura" ou None (sem limite).
+    """
+    if caminho.startswith("/sistema"):
+        return None
+    if caminho.endswith("/batch-get"):
+        return "leitura"
+    if caminho.startswith("/compras") and metodo not in ("GET", "HEAD"):
+        return "compras"
+    if caminho.endswith("/search"):
+        return "busca"
+    if metodo in ("GET", "HEAD"):
+        return "leitura"
+    return None
+
+
+def _limitador_do_ambiente(classe: str, limite: int, fila_max: int) -> Limitador:
+    prefixo = f"ADMISSAO_{classe.upper()}"
+    return Limitador(
+        limite=int(os.getenv(f"{prefixo}_LIMITE", limite)),
+        fila_max=int(os.getenv(f"{prefixo}_FILA", fila_max)),
+        espera_max=float(os.getenv("ADMISSAO_ESPERA_MAX", 1.0)),
+    )
+
+
+limitadores: dict[str, Limitador] = {
+    "compras": _limitador_do_ambiente("compras", limite=20, fila_max=40),
+    "busca": _limitador_do_ambiente("busca", limite=8, fila_max=8),
+    "leitura": _limitador_do_ambiente("leitura", limite=30, fila_max=30),
+}
+
+RETRY_AFTER = os.getenv("ADMISSAO_RETRY_AFTER", "1")
+
+metricas.registrar_coletor(
+    "admissao", lambda: {classe: lim.estado() for classe, lim in limitadores.items()}
+)
+
+
+class AdmissionControlMiddleware:
+    """
+    Middleware ASGI de controle de admissão por classe de rota.
+
+    Cada classe (compras, busca, leitura) tem o seu próprio limite de
+    concorrência e fila. Quando a classe está saturada, a requisição falha
+    imediatamente com 503 e o cabeçalho Retry-After, sem ocupar o pool do banco.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        classe = classificar_rota(scope["method"], scope["path"])
+        limitador = limitadores.get(classe)
+        if limitador is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limitador.adquirir()
+        except LimiteSaturado:
+            resposta = JSONResponse(
+                status_code=503,
+                content={"erro": "Servidor sobrecarregado", "detalhes": f"Limite da classe '{classe}' atingido"},
+                headers={"Retry-After": RETRY_AFTER},
+            )
+            await resposta(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limitador.liberar()
@@ -0,0 +1,101 @@
+import asyncio
+from urllib.parse import parse_qsl, urlencode
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from metrics import metricas
+
+
+def chave_requisicao(scope: Scope) -> str:
+    """
+    Monta a chave normalizada de uma requisição GET.
+
+    Os parâmetros de query são ordenados, de modo que `?a=1&b=2` e `?b=2&a=1`
+    compartilham a mesma chave.
+
+    Args:
+        scope (Scope): Escopo ASGI da requisição.
+
+    Returns:
+        str: Chave composta pelo caminho e pelos parâmetros normalizados.
+    """
+    query = scope.get("query_string", b"").decode("latin-1")
+    parametros = sorted(parse_qsl(query, keep_blank_values=True))
+    return f"{scope['path']}?{urlencode(parametros)}"
+
+
+class SingleFlight:
+    """
+    Registro das requisições em andamento, indexadas pela chave normalizada.
+
+    A primeira requisição de uma chave (líder) executa o handler; as que chegam
+    enquanto ela está em andamento (seguidoras) aguardam e reaproveitam a mesma
+    resposta já serializada.
+    """
+
+    def __init__(self):
+        self.em_voo: dict[str, asyncio.Future] = {}
+        self.lideres = 0
+        self.seguidoras = 0
+
+    def estado(self) -> dict:
+        total = self.lideres + self.seguidoras
+        return {
+            "lideres": self.lideres,
+            "seguidoras": self.seguidoras,
+            "em_voo": len(self.em_voo),
+            "taxa_coalescencia": self.seguidoras / total if total else 0.0,
+        }
+
+
+single_flight = SingleFlight()
+
+metricas.registrar_coletor("coalescencia", single_flight.estado)
+
+
+class RequestCoalescingMiddleware:
+    """
+    Middleware ASGI que coalesce requisições GET idênticas e simultâneas.
+
+    Apenas uma consulta ao banco é feita por chave em andamento; a resposta
+    (status, cabeçalhos e corpo) é capturada e repetida para as seguidoras.
+    Se a líder falhar ou for cancelada, as seguidoras executam normalmente.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"].startswith("/sistema"):
+            await self.app(scope, receive, send)
+            return
+
+        chave = chave_requisicao(scope)
+        futuro = single_flight.em_voo.get(chave)
+        if futuro is not None:
+            mensagens = await asyncio.shield(futuro)
+            if mensagens is not None:
+                single_flight.seguidoras += 1
+                for mensagem in mensagens:
+                    await send(dict(mensagem))
+                return
+            await self.app(scope, receive, send)
+            return
+
+        futuro = asyncio.get_running_loop().create_future()
+        single_flight.em_voo[chave] = futuro
+        single_flight.lideres += 1
+        mensagens: list[Message] = []
+
+        async def capturar(mensagem: Message) -> None:
+            mensagens.append(mensagem)
+
+        try:
+            await self.app(scope, receive, capturar)
+        except BaseException:
+            futuro.set_result(None)
+            raise
+        finally:
+            single_flight.em_voo.pop(chave, None)
+
+        futuro.set_result(mensagens)
+        for mensagem in mensagens:
+            await send(mensagem)
@@ -0,0 +1,204 @@
+import asyncio
+import math
+import os
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from metrics import metricas
+from middlewares.admission import classificar_rota
+
+# Tempo extra (segundos) dado ao banco além do prazo da requisição. O middleware
+# cancela a requisição no prazo; o limite do banco só garante que a instrução
+# pare mesmo se o cancelamento não chegar até ele.
+MARGEM_BANCO = 0.25
+
+# A cada quantas instruções da VM do SQLite o prazo é conferido.
+PASSOS_SQLITE = 10_000
+
+
+def _prazo_do_ambiente(classe: str, padrao: float) -> float:
+    return float(os.getenv(f"PRAZO_{classe.upper()}", padrao))
+
+
+# Prazo (segundos) por classe de rota (ver middlewares.admission.classificar_rota); 0 desliga.
+prazos: dict[str | None, float] = {
+    # Acima de IDEMPOTENCIA_ESPERA, para a repetição receber o 409 dela.
+    "compras": _prazo_do_ambiente("compras", 15),
+    "busca": _prazo_do_ambiente("busca", 5),
+    "leitura": _prazo_do_ambiente("leitura", 5),
+    None: _prazo_do_ambiente("padrao", 30),
+}
+
+_prazo_atual: ContextVar["Prazo | None"] = ContextVar("prazo_requisicao", default=None)
+
+
+class Prazo:
+    """
+    Prazo de uma requisição, compartilhado com as conexões que ela usa.
+
+    Atributos:
+        limite (float): Instante (time.monotonic) em que a requisição expira.
+        cancelado (bool): True quando a requisição foi abandonada (prazo
+            estourado ou cliente desconectado); as instruções em andamento
+            no SQLite são interrompidas.
+    """
+
+    def __init__(self, segundos: float):
+        self.limite = time.monotonic() + segundos if segundos > 0 else math.inf
+        self.cancelado = False
+
+    def restante(self) -> float:
+        return self.limite - time.monotonic()
+
+    def esgotado(self) -> bool:
+        return self.cancelado or self.restante() < -MARGEM_BANCO
+
+    def cancelar(self) -> None:
+        self.cancelado = True
+
+
+def consulta_interrompida(erro: BaseException) -> bool:
+    """
+    Indica se o erro é de uma instrução interrompida pelo prazo.
+
+    Postgres: statement_timeout (SQLSTATE 57014). SQLite: interrupção feita
+    pelo progress handler instalado em `instrumentar`.
+    """
+    if not isinstance(erro, DBAPIError):
+        return False
+    original = erro.orig
+    return getattr(original, "sqlstate", None) == "57014" or "interrupted" in str(original)
+
+
+def instrumentar(engine: AsyncEngine) -> None:
+    """
+    Aplica o prazo da requisição atual às instruções do engine.
+
+    No Postgres, cada transação começa com SET LOCAL statement_timeout igual ao
+    tempo restante (mais MARGEM_BANCO). No SQLite, um progress handler em cada
+    conexão interrompe a instrução quando o prazo da requisição que está com a
+    conexão se esgota ou é cancelado. Fora de uma requisição não há limite.
+
+    Args:
+        engine (AsyncEngine): Engine da aplicação ou de um shard.
+    """
+    motor = engine.sync_engine
+    if motor.dialect.name == "postgresql":
+        @event.listens_for(motor, "begin")
+        def _limitar_transacao(conn):
+            prazo = _prazo_atual.get()
+            if prazo is not None and prazo.limite != math.inf:
+                milissegundos = max(1, int((prazo.restante() + MARGEM_BANCO) * 1000))
+                conn.exec_driver_sql(f"SET LOCAL statement_timeout = {milissegundos}")
+
+    elif motor.dialect.name == "sqlite":
+        @event.listens_for(motor, "connect")
+        def _instalar_interrupcao(dbapi_connection, connection_record):
+            def verificar() -> int:
+                # Roda na thread do aiosqlite, durante a execução da instrução.
+                prazo = connection_record.info.get("prazo")
+                return 1 if prazo is not None and prazo.esgotado() else 0
+
+            dbapi_connection.await_(dbapi_connection.driver_connection.set_progress_handler(verificar, PASSOS_SQLITE))
+
+        @event.listens_for(motor, "checkout")
+        def _associar_prazo(dbapi_connection, connection_record, connection_proxy):
+            connection_record.info["prazo"] = _prazo_atual.get()
+
+        @event.listens_for(motor, "reset")
+        def _liberar_prazo(dbapi_connection, connection_record, reset_state):
+            # Antes do rollback de devolução, que não pode ser interrompido.
+            connection_record.info.pop("prazo", None)
+
+
+class DeadlineMiddleware:
+    """
+    Middleware ASGI de prazo por requisição e cancelamento na desconexão.
+
+    O handler roda numa tarefa separada, com o prazo da classe da rota
+    (PRAZO_COMPRAS, PRAZO_BUSCA, PRAZO_LEITURA, PRAZO_PADRAO) visível às
+    conexões com o banco (ver `instrumentar`). Enquanto isso, o middleware
+    escuta o cliente: se ele desconectar antes da resposta terminar, ou se o
+    prazo estourar, a tarefa é cancelada, a instrução em andamento é
+    interrompida e a conexão volta ao pool. Prazo estourado antes de a
+    resposta começar vira 504.
+
+    Deve ser o middleware mais externo: quem está dentro dele roda na tarefa
+    do handler (o profiler amostra essa tarefa, e o coalescing libera as
+    seguidoras quando a líder é cancelada).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith("/sistema"):
+            await self.app(scope, receive, send)
+            return
+
+        classe = classificar_rota(scope["method"], scope["path"])
+        prazo = Prazo(prazos[classe])
+        mensagens: asyncio.Queue[Message] = asyncio.Queue()
+        iniciada = concluida = False
+
+        async def enviar(mensagem: Message) -> None:
+            nonlocal iniciada, concluida
+            if mensagem["type"] == "http.response.start":
+                iniciada = True
+            elif mensagem["type"] == "http.response.body" and not mensagem.get("more_body", False):
+                concluida = True
+            await send(mensagem)
+
+        async def escutar() -> None:
+            # Repassa o corpo ao handler e termina quando o cliente desconecta.
+            while True:
+                mensagem = await receive()
+                await mensagens.put(mensagem)
+                if mensagem["type"] == "http.disconnect":
+                    return
+
+        token = _prazo_atual.set(prazo)
+        try:
+            tarefa = asyncio.create_task(self.app(scope, mensagens.get, enviar))
+        finally:
+            _prazo_atual.reset(token)
+        escuta = asyncio.create_task(escutar())
+        try:
+            restante = None if prazo.limite == math.inf else max(prazo.restante(), 0)
+            await asyncio.wait({tarefa, escuta}, timeout=restante, return_when=asyncio.FIRST_COMPLETED)
+            if not tarefa.done() and escuta.done():
+                if not concluida:
+                    metricas.incrementar(f"prazo.desconexoes.{classe}")
+                    await self._cancelar(tarefa, prazo)
+                    return
+                # Desconexão depois da resposta completa: só falta o handler terminar.
+                restante = None if prazo.limite == math.inf else max(prazo.restante(), 0)
+                await asyncio.wait({tarefa}, timeout=restante)
+            if not tarefa.done():
+                metricas.incrementar(f"prazo.estourados.{classe}")
+                await self._cancelar(tarefa, prazo)
+                if not iniciada:
+                    resposta = JSONResponse(
+                        status_code=504,
+                        content={"erro": "Tempo limite excedido",
+                                 "detalhes": f"A requisição passou do prazo de {prazos[classe]:g} s"},
+                    )
+                    await resposta(scope, receive, send)
+                return
+            tarefa.result()
+        finally:
+            escuta.cancel()
+            if not tarefa.done():
+                # O próprio middleware foi cancelado (ex.: servidor encerrando).
+                prazo.cancelar()
+                tarefa.cancel()
+
+    @staticmethod
+    async def _cancelar(tarefa: asyncio.Task, prazo: Prazo) -> None:
+        prazo.cancelar()
+        tarefa.cancel()
+        await asyncio.gather(tarefa, return_exceptions=True)
@@ -0,0 +1,230 @@
+import gzip
+import json
+import os
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import msgpack
+except ImportError:  # dependência opcional
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # dependência opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # dependência opcional
+    zstandard = None
+
+TAMANHO_MINIMO = int(os.getenv("COMPRESSAO_TAMANHO_MINIMO", 1024))
+
+TIPOS_MSGPACK = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+_zstd_compressor = zstandard.ZstdCompressor(level=3) if zstandard else None
+
+
+def _comprimir_gzip(corpo: bytes) -> bytes:
+    return gzip.compress(corpo, compresslevel=5)
+
+
+def _comprimir_br(corpo: bytes) -> bytes:
+    return brotli.compress(corpo, quality=4)
+
+
+def _comprimir_zstd(corpo: bytes) -> bytes:
+    return _zstd_compressor.compress(corpo)
+
+
+# Em ordem de preferência do servidor, usada para desempatar valores de q iguais.
+COMPRESSORES = {
+    nome: funcao
+    for nome, funcao, disponivel in (
+        ("zstd", _comprimir_zstd, zstandard is not None),
+        ("br", _comprimir_br, brotli is not None),
+        ("gzip", _comprimir_gzip, True),
+    )
+    if disponivel
+}
+
+
+def _pesos(cabecalho: str) -> dict[str, float]:
+    """
+    Interpreta um cabeçalho do tipo Accept/Accept-Encoding com valores de q.
+
+    Args:
+        cabecalho (str): Valor bruto do cabeçalho.
+
+    Returns:
+        dict[str, float]: Mapa de valor (em minúsculas) para peso q.
+    """
+    pesos = {}
+    for parte in cabecalho.split(","):
+        item, *parametros = parte.strip().split(";")
+        if not item:
+            continue
+        q = 1.0
+        for parametro in parametros:
+            nome, _, valor = parametro.strip().partition("=")
+            if nome == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        pesos[item.strip().lower()] = q
+    return pesos
+
+
+def escolher_formato(accept: str) -> str:
+    """
+    Escolhe o formato do corpo da resposta a partir do cabeçalho Accept.
+
+    Args:
+        accept (str): Cabeçalho Accept da requisição.
+
+    Returns:
+        str: "msgpack" se preferido pelo cliente e disponível, senão "json".
+    """
+    if msgpack is None or not accept:
+        return "json"
+    pesos = _pesos(accept)
+    q_msgpack = max((pesos.get(tipo, 0.0) for tipo in TIPOS_MSGPACK), default=0.0)
+    q_json = pesos.get("application/json", pesos.get("application/*", pesos.get("*/*", 0.0)))
+    return "msgpack" if q_msgpack > 0 and q_msgpack > q_json else "json"
+
+
+def escolher_compressao(accept_encoding: str) -> str | None:
+    """
+    Escolhe a compressão a partir do cabeçalho Accept-Encoding.
+
+    Args:
+        accept_encoding (str): Cabeçalho Accept-Encoding da requisição.
+
+    Returns:
+        str | None: Nome da codificação (zstd, br, gzip) ou None.
+    """
+    if not accept_encoding:
+        return None
+    pesos = _pesos(accept_encoding)
+    melhor, melhor_q = None, 0.0
+    for nome in COMPRESSORES:
+        q = pesos.get(nome, pesos.get("*", 0.0))
+        if q > melhor_q:
+            melhor, melhor_q = nome, q
+    return melhor
+
+
+def serializar(corpo_json: bytes, formato: str) -> bytes:
+    """
+    Converte um corpo JSON para o formato negociado.
+
+    Args:
+        corpo_json (bytes): Corpo JSON produzido pelo FastAPI.
+        formato (str): "json" ou "msgpack".
+
+    Returns:
+        bytes: Corpo no formato pedido.
+    """
+    if formato == "msgpack":
+        return msgpack.packb(json.loads(corpo_json), use_bin_type=True)
+    return corpo_json
+
+
+def comprimir(corpo: bytes, codificacao: str) -> bytes:
+    """
+    Comprime o corpo com a codificação informada.
+
+    Args:
+        corpo (bytes): Corpo da resposta.
+        codificacao (str): Nome da codificação (zstd, br, gzip).
+
+    Returns:
+        bytes: Corpo comprimido.
+    """
+    return COMPRESSORES[codificacao](corpo)
+
+
+def _com_vary(inicio: Message) -> Message:
+    """
+    Acrescenta Accept e Accept-Encoding ao Vary do início da resposta.
+
+    Vai em toda resposta que passa pela negociação, inclusive as não
+    convertidas: o mesmo recurso pode voltar em outro formato ou comprimido
+    para outro cliente, e um cache compartilhado não pode reaproveitá-lo.
+    """
+    cabecalhos = MutableHeaders(raw=list(inicio["headers"]))
+    cabecalhos.add_vary_header("Accept")
+    cabecalhos.add_vary_header("Accept-Encoding")
+    return {**inicio, "headers": cabecalhos.raw}
+
+
+class ContentNegotiationMiddleware:
+    """
+    Middleware ASGI que negocia o formato e a compressão das respostas JSON.
+
+    Respostas `application/json` podem ser convertidas para MessagePack
+    (cabeçalho Accept) e comprimidas com zstd, brotli ou gzip
+    (cabeçalho Accept-Encoding) quando o corpo passa de TAMANHO_MINIMO bytes.
+    As demais respostas passam sem alteração, exceto pelo cabeçalho Vary,
+    presente em todas.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cabecalhos = Headers(scope=scope)
+        formato = escolher_formato(cabecalhos.get("accept", ""))
+        codificacao = escolher_compressao(cabecalhos.get("accept-encoding", ""))
+        if formato == "json" and codificacao is None:
+            async def repassar_com_vary(mensagem: Message) -> None:
+                if mensagem["type"] == "http.response.start":
+                    mensagem = _com_vary(mensagem)
+                await send(mensagem)
+
+            await self.app(scope, receive, repassar_com_vary)
+            return
+
+        inicio: Message | None = None
+        partes: list[bytes] = []
+        repassar = False
+
+        async def enviar(mensagem: Message) -> None:
+            nonlocal inicio, repassar
+            if mensagem["type"] == "http.response.start":
+                resposta = Headers(raw=mensagem["headers"])
+                tipo = resposta.get("content-type", "")
+                if not tipo.startswith("application/json") or "content-encoding" in resposta:
+                    repassar = True
+                    await send(_com_vary(mensagem))
+                else:
+                    inicio = mensagem
+                return
+
+            if repassar:
+                await send(mensagem)
+                return
+
+            partes.append(mensagem.get("body", b""))
+            if mensagem.get("more_body", False):
+                return
+
+            corpo = serializar(b"".join(partes), formato)
+            novos = MutableHeaders(raw=list(inicio["headers"]))
+            if formato == "msgpack":
+                novos["content-type"] = "application/msgpack"
+            if codificacao is not None and len(corpo) >= TAMANHO_MINIMO:
+                corpo = comprimir(corpo, codificacao)
+                novos["content-encoding"] = codificacao
+            novos["content-length"] = str(len(corpo))
+
+            await send(_com_vary({**inicio, "headers": novos.raw}))
+            await send({"type": "http.response.body", "body": corpo})
+
+        await self.app(scope, receive, enviar)
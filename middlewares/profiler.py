@@ -0,0 +1,165 @@
+import asyncio
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from metrics import metricas
+
+logger = logging.getLogger(__name__)
+
+# Token exigido no cabeçalho X-Profile para perfilar uma requisição sob demanda.
+TOKEN = os.getenv("PROFILER_TOKEN", "")
+
+# Fração das requisições perfiladas em segundo plano (0 desliga).
+TAXA = float(os.getenv("PROFILER_TAXA", 0))
+
+# Intervalo (segundos) entre amostras da pilha.
+INTERVALO = float(os.getenv("PROFILER_INTERVALO", 0.005))
+
+# Diretório onde os perfis são gravados.
+DIRETORIO = Path(os.getenv("PROFILER_DIR", "perfis"))
+
+ATIVO = bool(TOKEN) or TAXA > 0
+
+
+def formatar_quadro(quadro) -> str:
+    codigo = quadro.f_code
+    return f"{codigo.co_qualname} ({Path(codigo.co_filename).name}:{codigo.co_firstlineno})"
+
+
+class Amostrador(threading.Thread):
+    """
+    Thread que amostra periodicamente a pilha da thread do event loop.
+
+    Quando a tarefa asyncio da requisição está executando, amostra a pilha da
+    thread; quando está suspensa (esperando o banco, por exemplo), amostra a
+    cadeia de corrotinas até o ponto de espera, terminando em "[aguardando]".
+    Assim o perfil mostra o tempo de parede da requisição sem misturar o de
+    outras requisições concorrentes. O resultado são pilhas colapsadas
+    ("a;b;c quantidade"), o formato lido por flamegraph.pl e pelo speedscope.
+
+    Atributos:
+        pilhas (Counter[str]): Quantidade de amostras por pilha colapsada.
+        amostras (int): Total de amostras contadas.
+    """
+
+    def __init__(self, tarefa: asyncio.Task, intervalo: float = INTERVALO):
+        super().__init__(daemon=True, name="profiler")
+        self.tarefa = tarefa
+        self.loop = tarefa.get_loop()
+        self.thread_id = threading.get_ident()
+        self.intervalo = intervalo
+        self.pilhas: Counter[str] = Counter()
+        self.amostras = 0
+        self._parar = threading.Event()
+
+    def _pilha_em_execucao(self) -> list[str]:
+        quadro = sys._current_frames().get(self.thread_id)
+        pilha = []
+        while quadro is not None:
+            pilha.append(formatar_quadro(quadro))
+            quadro = quadro.f_back
+        return pilha[::-1]
+
+    def _pilha_suspensa(self) -> list[str]:
+        pilha = []
+        corrotina = self.tarefa.get_coro()
+        while corrotina is not None:
+            quadro = getattr(corrotina, "cr_frame", None) or getattr(corrotina, "ag_frame", None)
+            if quadro is None:
+                break
+            pilha.append(formatar_quadro(quadro))
+            corrotina = getattr(corrotina, "cr_await", None) or getattr(corrotina, "ag_await", None)
+        pilha.append("[aguardando]")
+        return pilha
+
+    def run(self) -> None:
+        while not self._parar.wait(self.intervalo):
+            if self.tarefa.done():
+                continue
+            if asyncio.current_task(self.loop) is self.tarefa:
+                pilha = self._pilha_em_execucao()
+            else:
+                pilha = self._pilha_suspensa()
+            if pilha:
+                self.pilhas[";".join(pilha)] += 1
+                self.amostras += 1
+
+    def parar(self) -> None:
+        self._parar.set()
+        self.join()
+
+    def gravar(self, caminho: Path) -> None:
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        with open(caminho, "w") as arquivo:
+            for pilha, quantidade in self.pilhas.most_common():
+                arquivo.write(f"{pilha} {quantidade}\n")
+
+
+class ProfilerMiddleware:
+    """
+    Middleware ASGI que perfila requisições por amostragem da pilha.
+
+    Uma requisição é perfilada quando traz o cabeçalho X-Profile com o valor de
+    PROFILER_TOKEN, ou por sorteio com probabilidade PROFILER_TAXA (no máximo
+    uma de cada vez nesse modo). O perfil é gravado em PROFILER_DIR como pilhas
+    colapsadas e o nome do arquivo volta no cabeçalho X-Profile-Arquivo.
+
+    Só é adicionado à aplicação quando PROFILER_TOKEN ou PROFILER_TAXA estão
+    configurados; desligado, não custa nada.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._em_segundo_plano = False
+
+    def _autorizado(self, scope: Scope) -> bool:
+        valor = Headers(scope=scope).get("x-profile")
+        return bool(TOKEN) and valor is not None and hmac.compare_digest(valor.encode(), TOKEN.encode())
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        sob_demanda = self._autorizado(scope)
+        sorteada = not sob_demanda and not self._em_segundo_plano and TAXA > 0 and random.random() < TAXA
+        if not (sob_demanda or sorteada):
+            await self.app(scope, receive, send)
+            return
+
+        rota = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "raiz"
+        caminho = DIRETORIO / f"{time.strftime('%Y%m%d-%H%M%S')}_{scope['method']}_{rota}_{os.urandom(3).hex()}.collapsed"
+
+        async def enviar(mensagem: Message) -> None:
+            if mensagem["type"] == "http.response.start" and sob_demanda:
+                MutableHeaders(scope=mensagem)["X-Profile-Arquivo"] = caminho.name
+            await send(mensagem)
+
+        if sorteada:
+            self._em_segundo_plano = True
+        amostrador = Amostrador(asyncio.current_task())
+        inicio = time.perf_counter()
+        amostrador.start()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            amostrador.parar()
+            if sorteada:
+                self._em_segundo_plano = False
+            duracao = time.perf_counter() - inicio
+            try:
+                await asyncio.to_thread(amostrador.gravar, caminho)
+                metricas.incrementar("profiler.perfis")
+                logger.info("Perfil de %s %s (%.1f ms, %d amostras) gravado em %s",
+                            scope["method"], scope["path"], duracao * 1000, amostrador.amostras, caminho)
+            except OSError:
+                logger.exception("Falha ao gravar perfil em %s", caminho)
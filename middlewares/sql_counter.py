@@ -0,0 +1,151 @@
+import logging
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event, Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from metrics import metricas
+
+logger = logging.getLogger(__name__)
+
+# Quantas vezes a mesma forma de instrução pode se repetir antes de ser tratada como N+1.
+LIMIAR_N1 = int(os.getenv("SQL_LIMIAR_N1", 3))
+
+# Contadores ativos no contexto atual; blocos aninhados contam todos ao mesmo tempo.
+_contadores_ativos: ContextVar[tuple["ContadorConsultas", ...]] = ContextVar("contadores_consultas", default=())
+
+
+def forma_instrucao(instrucao: str) -> str:
+    """
+    Normaliza uma instrução SQL para comparar a sua "forma".
+
+    Listas IN de tamanhos diferentes e espaços extras são colapsados, de modo
+    que a mesma consulta executada em laço gere sempre a mesma forma.
+
+    Args:
+        instrucao (str): SQL enviado ao driver.
+
+    Returns:
+        str: Forma normalizada da instrução.
+    """
+    forma = re.sub(r"\s+", " ", instrucao).strip()
+    return re.sub(r"IN \((?:[?$%:\w()]+(?:, )?)+\)", "IN (...)", forma)
+
+
+class ContadorConsultas:
+    """
+    Contador das instruções SQL executadas em um escopo (normalmente uma requisição).
+
+    Atributos:
+        total (int): Quantidade de instruções executadas.
+        formas (Counter[str]): Quantidade de execuções por forma de instrução.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.formas: Counter[str] = Counter()
+
+    def registrar(self, instrucao: str) -> None:
+        self.total += 1
+        self.formas[forma_instrucao(instrucao)] += 1
+
+    def suspeitas_n1(self, limiar: int = LIMIAR_N1) -> list[tuple[str, int]]:
+        """
+        Lista as formas repetidas a partir do limiar, prováveis N+1.
+
+        Args:
+            limiar (int): Quantidade mínima de repetições.
+
+        Returns:
+            list[tuple[str, int]]: (forma, repetições), da mais repetida para a menos.
+        """
+        return [(forma, vezes) for forma, vezes in self.formas.most_common() if vezes >= limiar]
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _registrar_instrucao(conn, cursor, statement, parameters, context, executemany):
+    for contador in _contadores_ativos.get():
+        contador.registrar(statement)
+
+
+@contextmanager
+def contar_consultas():
+    """
+    Conta as instruções SQL executadas dentro do bloco.
+
+    Exemplo:
+        with contar_consultas() as contador:
+            await client.get("/livros/1")
+        assert contador.total <= 2
+
+    Yields:
+        ContadorConsultas: Contador preenchido durante o bloco.
+    """
+    contador = ContadorConsultas()
+    token = _contadores_ativos.set(_contadores_ativos.get() + (contador,))
+    try:
+        yield contador
+    finally:
+        _contadores_ativos.reset(token)
+
+
+@contextmanager
+def limite_consultas(maximo: int, permitir_n1: bool = False):
+    """
+    Falha se o bloco executar mais de `maximo` instruções SQL.
+
+    Pensado para testes: pode envolver uma chamada ao app (por exemplo,
+    httpx.AsyncClient com ASGITransport, que roda na mesma tarefa).
+
+    Args:
+        maximo (int): Quantidade máxima de instruções permitidas.
+        permitir_n1 (bool): Se False, também falha quando há formas repetidas.
+
+    Raises:
+        AssertionError: Se o limite for excedido ou houver suspeita de N+1.
+    """
+    with contar_consultas() as contador:
+        yield contador
+    assert contador.total <= maximo, f"{contador.total} instruções SQL executadas (máximo: {maximo})"
+    if not permitir_n1:
+        suspeitas = contador.suspeitas_n1()
+        assert not suspeitas, f"Possível N+1: {suspeitas[0][1]}x {suspeitas[0][0]}"
+
+
+class SQLCounterMiddleware:
+    """
+    Middleware ASGI de depuração que conta as instruções SQL de cada requisição.
+
+    Adiciona os cabeçalhos X-SQL-Consultas (total de instruções) e, quando a
+    mesma forma de instrução se repete LIMIAR_N1 vezes ou mais,
+    X-SQL-N1-Suspeito com a quantidade de repetições. As suspeitas também são
+    registradas em log e nas métricas.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with contar_consultas() as contador:
+            async def enviar(mensagem: Message) -> None:
+                if mensagem["type"] == "http.response.start":
+                    cabecalhos = MutableHeaders(scope=mensagem)
+                    cabecalhos["X-SQL-Consultas"] = str(contador.total)
+                    suspeitas = contador.suspeitas_n1()
+                    if suspeitas:
+                        forma, vezes = suspeitas[0]
+                        cabecalhos["X-SQL-N1-Suspeito"] = str(vezes)
+                        metricas.incrementar("sql.suspeitas_n1")
+                        logger.warning("Possível N+1 em %s %s: %dx %s",
+                                       scope["method"], scope["path"], vezes, forma)
+                    metricas.incrementar("sql.instrucoes", contador.total)
+                await send(mensagem)
+
+            await self.app(scope, receive, enviar)
@@ -2,6 +2,7 @@ from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy.engine import make_url
 
 from alembic import context
 from sqlmodel import SQLModel
@@ -12,6 +13,13 @@ from models.livro import Livro
 from models.usuario import Usuario
 from models.admin import Admin
 from models.livroCompras import LivrosCompras
+from models.alteracao import Exclusao
+from models.estoque import LivroEstoqueSlot
+from models.invalidacao import Invalidacao
+from models.recomendacao import LivroRecomendacao
+from models.idempotencia import ChaveIdempotencia
+from models.sequencia import Sequencia
+from models.catalogo import Genero, Editora
 
 load_dotenv()
 
@@ -40,11 +48,26 @@ if config.config_file_name is not None:
 target_metadata = SQLModel.metadata
 
 
+DIALETO = make_url(sync_db_url).get_backend_name()
+
+
+def incluir_objeto(objeto, nome, tipo, refletido, comparar_com):
+    # Tabelas FTS5 do SQLite (e as internas delas) são criadas pelas migrations, fora dos modelos.
+    if tipo == "table" and refletido and comparar_com is None and "_fts" in nome:
+        return False
+    # Índices restritos a outro banco com ddl_if (ex.: trigramas do Postgres).
+    condicao = getattr(objeto, "_ddl_if", None)
+    if tipo == "index" and condicao is not None and condicao.dialect not in (None, DIALETO):
+        return False
+    return True
+
+
 def run_migrations_offline() -> None:
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=incluir_objeto,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -64,7 +87,8 @@ def run_migrations_online() -> None:
     with connectable.connect() as connection:
         context.configure(
             connection=connection,
-            target_metadata=target_metadata
+            target_metadata=target_metadata,
+            include_object=incluir_objeto,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,87 @@
+"""busca usuarios admins
+
+Revision ID: 3c9e6f2a7d14
+Revises: af8bdaec3284
+Create Date: 2026-10-19 00:05:12.731904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e6f2a7d14'
+down_revision: Union[str, Sequence[str], None] = 'af8bdaec3284'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Colunas com busca parcial por trigramas em cada tabela.
+COLUNAS_TRIGRAMAS = {'usuarios': ['nome'], 'admins': ['nome', 'email']}
+
+
+def _verificar_emails_duplicados(tabela: str) -> None:
+    duplicados = op.get_bind().execute(sa.text(
+        f"SELECT lower(email) FROM {tabela} GROUP BY lower(email) HAVING count(*) > 1 LIMIT 10"
+    )).scalars().all()
+    if duplicados:
+        raise RuntimeError(
+            f"{tabela} tem e-mails repetidos (sem diferenciar maiúsculas): {', '.join(duplicados)}. "
+            "Unifique os cadastros antes de aplicar esta migration."
+        )
+
+
+def _criar_fts(tabela: str, colunas: list[str]) -> None:
+    fts = f"{tabela}_fts"
+    lista = ", ".join(colunas)
+    novos = ", ".join(f"new.{c}" for c in colunas)
+    antigos = ", ".join(f"old.{c}" for c in colunas)
+    op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({lista}, content='{tabela}', content_rowid='id', "
+               f"tokenize='trigram')")
+    op.execute(f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {tabela} BEGIN "
+               f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos}); END")
+    op.execute(f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {tabela} BEGIN "
+               f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {antigos}); END")
+    op.execute(f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {lista} ON {tabela} BEGIN "
+               f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {antigos}); "
+               f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos}); END")
+    op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for tabela in COLUNAS_TRIGRAMAS:
+        _verificar_emails_duplicados(tabela)
+        op.create_index(f'ix_{tabela}_email_lower', tabela, [sa.text('lower(email)')], unique=True)
+
+    if op.get_bind().dialect.name == 'postgresql':
+        # Exige permissão para criar extensões (ou a extensão já instalada pelo DBA).
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for tabela, colunas in COLUNAS_TRIGRAMAS.items():
+            for coluna in colunas:
+                op.create_index(f'ix_{tabela}_{coluna}_trgm', tabela, [coluna], unique=False,
+                                postgresql_using='gin', postgresql_ops={coluna: 'gin_trgm_ops'})
+    else:
+        # As triggers somem se a tabela for recriada (batch_alter_table no SQLite);
+        # migrations futuras que recriem usuarios ou admins devem recriá-las.
+        for tabela, colunas in COLUNAS_TRIGRAMAS.items():
+            _criar_fts(tabela, colunas)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        for tabela, colunas in COLUNAS_TRIGRAMAS.items():
+            for coluna in colunas:
+                op.drop_index(f'ix_{tabela}_{coluna}_trgm', table_name=tabela)
+    else:
+        for tabela in COLUNAS_TRIGRAMAS:
+            fts = f"{tabela}_fts"
+            for sufixo in ("ai", "ad", "au"):
+                op.execute(f"DROP TRIGGER {fts}_{sufixo}")
+            op.execute(f"DROP TABLE {fts}")
+
+    for tabela in COLUNAS_TRIGRAMAS:
+        op.drop_index(f'ix_{tabela}_email_lower', table_name=tabela)
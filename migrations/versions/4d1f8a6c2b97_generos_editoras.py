@@ -0,0 +1,89 @@
+"""generos editoras
+
+Revision ID: 4d1f8a6c2b97
+Revises: 7e3b1d9c4a52
+Create Date: 2026-10-19 03:12:26.407531
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d1f8a6c2b97'
+down_revision: Union[str, Sequence[str], None] = '7e3b1d9c4a52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Livros preenchidos por instrução (faixa de IDs), para não montar um UPDATE único na tabela inteira.
+LOTE = 10_000
+
+# (coluna de texto, coluna de ID, tabela de domínio)
+DOMINIOS = [
+    ('genero', 'genero_id', 'generos'),
+    ('editora', 'editora_id', 'editoras'),
+]
+
+
+def _preencher_em_lotes(atribuicoes: str) -> None:
+    conn = op.get_bind()
+    maior_id = conn.scalar(sa.text("SELECT coalesce(max(id), 0) FROM livros"))
+    for inicio in range(0, maior_id, LOTE):
+        conn.execute(sa.text(f"UPDATE livros SET {atribuicoes} WHERE id > :inicio AND id <= :fim"),
+                     {"inicio": inicio, "fim": inicio + LOTE})
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for texto, coluna_id, tabela in DOMINIOS:
+        op.create_table(tabela,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nome', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f(f'ix_{tabela}_nome'), tabela, ['nome'], unique=True)
+        op.execute(f"INSERT INTO {tabela} (nome) SELECT DISTINCT {texto} FROM livros ORDER BY {texto}")
+        op.add_column('livros', sa.Column(coluna_id, sa.Integer(), nullable=True))
+
+    _preencher_em_lotes(", ".join(
+        f"{coluna_id} = (SELECT id FROM {tabela} WHERE {tabela}.nome = livros.{texto})"
+        for texto, coluna_id, tabela in DOMINIOS
+    ))
+
+    op.drop_index('ix_livros_genero_preco_uni', table_name='livros')
+    op.drop_index('ix_livros_editora_preco_uni', table_name='livros')
+    with op.batch_alter_table('livros') as batch_op:
+        for texto, coluna_id, tabela in DOMINIOS:
+            batch_op.alter_column(coluna_id, existing_type=sa.Integer(), nullable=False)
+            batch_op.create_foreign_key(f'fk_livros_{coluna_id}_{tabela}', tabela, [coluna_id], ['id'],
+                                        ondelete='RESTRICT')
+            batch_op.drop_column(texto)
+    op.create_index('ix_livros_genero_id_preco_uni', 'livros', ['genero_id', 'preco_uni'], unique=False)
+    op.create_index('ix_livros_editora_id_preco_uni', 'livros', ['editora_id', 'preco_uni'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_livros_editora_id_preco_uni', table_name='livros')
+    op.drop_index('ix_livros_genero_id_preco_uni', table_name='livros')
+    for texto, _, _ in DOMINIOS:
+        op.add_column('livros', sa.Column(texto, sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+
+    _preencher_em_lotes(", ".join(
+        f"{texto} = (SELECT nome FROM {tabela} WHERE {tabela}.id = livros.{coluna_id})"
+        for texto, coluna_id, tabela in DOMINIOS
+    ))
+
+    with op.batch_alter_table('livros') as batch_op:
+        for texto, coluna_id, tabela in DOMINIOS:
+            batch_op.alter_column(texto, existing_type=sqlmodel.sql.sqltypes.AutoString(), nullable=False)
+            batch_op.drop_constraint(f'fk_livros_{coluna_id}_{tabela}', type_='foreignkey')
+            batch_op.drop_column(coluna_id)
+    op.create_index('ix_livros_genero_preco_uni', 'livros', ['genero', 'preco_uni'], unique=False)
+    op.create_index('ix_livros_editora_preco_uni', 'livros', ['editora', 'preco_uni'], unique=False)
+    for _, _, tabela in DOMINIOS:
+        op.drop_index(op.f(f'ix_{tabela}_nome'), table_name=tabela)
+        op.drop_table(tabela)
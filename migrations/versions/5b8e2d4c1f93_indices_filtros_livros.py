@@ -0,0 +1,41 @@
+"""indices filtros livros
+
+Revision ID: 5b8e2d4c1f93
+Revises: a3f1c9d27e40
+Create Date: 2026-10-18 23:58:41.532870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e2d4c1f93'
+down_revision: Union[str, Sequence[str], None] = 'a3f1c9d27e40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_livros_genero_preco_uni', 'livros', ['genero', 'preco_uni'], unique=False)
+    op.create_index('ix_livros_editora_preco_uni', 'livros', ['editora', 'preco_uni'], unique=False)
+    op.create_index('ix_livros_preco_uni', 'livros', ['preco_uni'], unique=False)
+    op.create_index('ix_livros_quantidade_paginas', 'livros', ['quantidade_paginas'], unique=False)
+    op.create_index('ix_livros_admin_id', 'livros', ['admin_id'], unique=False)
+    op.create_index('ix_livros_em_estoque_preco_uni', 'livros', ['preco_uni'], unique=False,
+                    sqlite_where=sa.text('quantidade_estoque > 0'),
+                    postgresql_where=sa.text('quantidade_estoque > 0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_livros_em_estoque_preco_uni', table_name='livros')
+    op.drop_index('ix_livros_admin_id', table_name='livros')
+    op.drop_index('ix_livros_quantidade_paginas', table_name='livros')
+    op.drop_index('ix_livros_preco_uni', table_name='livros')
+    op.drop_index('ix_livros_editora_preco_uni', table_name='livros')
+    op.drop_index('ix_livros_genero_preco_uni', table_name='livros')
@@ -0,0 +1,37 @@
+"""remove indices em estoque
+
+Revision ID: 6c2a9e4b7d18
+Revises: 4d1f8a6c2b97
+Create Date: 2026-10-19 04:05:12.602318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c2a9e4b7d18'
+down_revision: Union[str, Sequence[str], None] = '4d1f8a6c2b97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Com o estoque fragmentado, o filtro "em estoque" virou um OR que nenhum
+    # dos dois índices parciais atende; o planner usa ix_livros_preco_uni.
+    op.drop_index('ix_livros_estoque_fragmentado', table_name='livros')
+    op.drop_index('ix_livros_em_estoque_preco_uni', table_name='livros')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_livros_em_estoque_preco_uni', 'livros', ['preco_uni'], unique=False,
+                    sqlite_where=sa.text('quantidade_estoque > 0'),
+                    postgresql_where=sa.text('quantidade_estoque > 0'))
+    op.create_index('ix_livros_estoque_fragmentado', 'livros', ['id'], unique=False,
+                    sqlite_where=sa.text('estoque_fragmentado = 1'),
+                    postgresql_where=sa.text('estoque_fragmentado'))
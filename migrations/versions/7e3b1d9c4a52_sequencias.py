@@ -0,0 +1,36 @@
+"""sequencias
+
+Revision ID: 7e3b1d9c4a52
+Revises: ba4aa0957517
+Create Date: 2026-10-19 00:41:37.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e3b1d9c4a52'
+down_revision: Union[str, Sequence[str], None] = 'ba4aa0957517'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sequencias',
+    sa.Column('nome', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+    sa.Column('valor', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('nome')
+    )
+    # Começa depois das compras já gravadas no banco principal.
+    op.execute("INSERT INTO sequencias (nome, valor) "
+               "SELECT 'livroscompras', coalesce(max(id), 0) FROM livroscompras")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('sequencias')
@@ -0,0 +1,55 @@
+"""estoque fragmentado
+
+Revision ID: 9d3e7b1f5a20
+Revises: f4b9d2e6a1c8
+Create Date: 2026-10-19 03:27:10.402871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3e7b1f5a20'
+down_revision: Union[str, Sequence[str], None] = 'f4b9d2e6a1c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('livros', sa.Column('estoque_fragmentado', sa.Boolean(), nullable=False,
+                                      server_default=sa.false()))
+    op.create_index('ix_livros_estoque_fragmentado', 'livros', ['id'], unique=False,
+                    sqlite_where=sa.text('estoque_fragmentado = 1'),
+                    postgresql_where=sa.text('estoque_fragmentado'))
+    op.create_table('livros_estoque_slots',
+    sa.Column('livro_id', sa.Integer(), nullable=False),
+    sa.Column('slot', sa.Integer(), nullable=False),
+    sa.Column('quantidade', sa.Integer(), nullable=False),
+    sa.Column('vendido', sa.Integer(), nullable=False),
+    sa.Column('receita', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['livro_id'], ['livros.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('livro_id', 'slot')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Devolve o estoque e as vendas das fatias para a linha do livro.
+    op.execute("""
+        UPDATE livros SET
+            quantidade_estoque = quantidade_estoque + COALESCE((SELECT SUM(s.quantidade) FROM livros_estoque_slots s
+                                                                WHERE s.livro_id = livros.id), 0),
+            total_vendido = total_vendido + COALESCE((SELECT SUM(s.vendido) FROM livros_estoque_slots s
+                                                      WHERE s.livro_id = livros.id), 0),
+            receita_total = receita_total + COALESCE((SELECT SUM(s.receita) FROM livros_estoque_slots s
+                                                      WHERE s.livro_id = livros.id), 0)
+        WHERE estoque_fragmentado
+    """)
+    op.drop_table('livros_estoque_slots')
+    op.drop_index('ix_livros_estoque_fragmentado', table_name='livros')
+    op.drop_column('livros', 'estoque_fragmentado')
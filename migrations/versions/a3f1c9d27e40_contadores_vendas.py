@@ -0,0 +1,53 @@
+"""contadores de vendas
+
+Revision ID: a3f1c9d27e40
+Revises: 365b469f8f8e
+Create Date: 2026-10-18 23:40:12.104311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f1c9d27e40'
+down_revision: Union[str, Sequence[str], None] = '365b469f8f8e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('livros', sa.Column('total_vendido', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('livros', sa.Column('receita_total', sa.Float(), nullable=False, server_default='0'))
+    op.create_index(op.f('ix_livros_total_vendido'), 'livros', ['total_vendido'], unique=False)
+    op.add_column('usuarios', sa.Column('total_compras', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('usuarios', sa.Column('total_gasto', sa.Float(), nullable=False, server_default='0'))
+
+    # Preenche os contadores com o histórico já existente.
+    op.execute("""
+        UPDATE livros SET
+            total_vendido = COALESCE((SELECT SUM(lc.quantidade_comprados) FROM livroscompras lc
+                                      WHERE lc.livro_id = livros.id), 0),
+            receita_total = COALESCE((SELECT SUM(lc.preco_pago) FROM livroscompras lc
+                                      WHERE lc.livro_id = livros.id), 0)
+    """)
+    op.execute("""
+        UPDATE usuarios SET
+            total_compras = (SELECT COUNT(lc.id) FROM livroscompras lc
+                             WHERE lc.usuario_id = usuarios.id),
+            total_gasto = COALESCE((SELECT SUM(lc.preco_pago) FROM livroscompras lc
+                                    WHERE lc.usuario_id = usuarios.id), 0)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('usuarios', 'total_gasto')
+    op.drop_column('usuarios', 'total_compras')
+    op.drop_index(op.f('ix_livros_total_vendido'), table_name='livros')
+    op.drop_column('livros', 'receita_total')
+    op.drop_column('livros', 'total_vendido')
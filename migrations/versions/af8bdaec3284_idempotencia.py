@@ -0,0 +1,40 @@
+"""idempotencia
+
+Revision ID: af8bdaec3284
+Revises: d8c2f5a7e913
+Create Date: 2026-10-18 23:47:29.260729
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'af8bdaec3284'
+down_revision: Union[str, Sequence[str], None] = 'd8c2f5a7e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('idempotencia',
+    sa.Column('escopo', sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False),
+    sa.Column('chave', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+    sa.Column('impressao', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+    sa.Column('status', sa.Integer(), nullable=True),
+    sa.Column('resposta', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('reservado_em', sa.DateTime(), nullable=False),
+    sa.Column('expira_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('escopo', 'chave')
+    )
+    op.create_index(op.f('ix_idempotencia_expira_em'), 'idempotencia', ['expira_em'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_idempotencia_expira_em'), table_name='idempotencia')
+    op.drop_table('idempotencia')
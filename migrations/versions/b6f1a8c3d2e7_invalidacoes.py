@@ -0,0 +1,38 @@
+"""invalidacoes
+
+Revision ID: b6f1a8c3d2e7
+Revises: 9d3e7b1f5a20
+Create Date: 2026-10-19 04:40:18.772301
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6f1a8c3d2e7'
+down_revision: Union[str, Sequence[str], None] = '9d3e7b1f5a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('invalidacoes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('origem', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('entidade', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('ids', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_invalidacoes_criado_em'), 'invalidacoes', ['criado_em'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_invalidacoes_criado_em'), table_name='invalidacoes')
+    op.drop_table('invalidacoes')
@@ -0,0 +1,38 @@
+"""serie vendas
+
+Revision ID: ba4aa0957517
+Revises: 3c9e6f2a7d14
+Create Date: 2026-10-18 23:52:04.785332
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ba4aa0957517'
+down_revision: Union[str, Sequence[str], None] = '3c9e6f2a7d14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        hora = sa.text("date_trunc('hour', data_compra)")
+    else:
+        hora = sa.text('substr(data_compra, 1, 13)')
+    op.create_index('ix_livroscompras_hora', 'livroscompras', [hora, 'quantidade_comprados', 'preco_pago'], unique=False)
+    # Começa por livro_id, então o índice antigo fica redundante.
+    op.create_index('ix_livroscompras_livro_id_data_compra', 'livroscompras', ['livro_id', 'data_compra', 'quantidade_comprados', 'preco_pago'], unique=False)
+    op.drop_index(op.f('ix_livroscompras_livro_id'), table_name='livroscompras')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_livroscompras_livro_id'), 'livroscompras', ['livro_id'], unique=False)
+    op.drop_index('ix_livroscompras_livro_id_data_compra', table_name='livroscompras')
+    op.drop_index('ix_livroscompras_hora', table_name='livroscompras')
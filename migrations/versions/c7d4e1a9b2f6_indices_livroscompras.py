@@ -0,0 +1,33 @@
+"""indices livroscompras
+
+Revision ID: c7d4e1a9b2f6
+Revises: 5b8e2d4c1f93
+Create Date: 2026-10-19 00:21:07.918452
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d4e1a9b2f6'
+down_revision: Union[str, Sequence[str], None] = '5b8e2d4c1f93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_livroscompras_usuario_id'), 'livroscompras', ['usuario_id'], unique=False)
+    op.create_index(op.f('ix_livroscompras_livro_id'), 'livroscompras', ['livro_id'], unique=False)
+    op.create_index(op.f('ix_livroscompras_data_compra'), 'livroscompras', ['data_compra'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_livroscompras_data_compra'), table_name='livroscompras')
+    op.drop_index(op.f('ix_livroscompras_livro_id'), table_name='livroscompras')
+    op.drop_index(op.f('ix_livroscompras_usuario_id'), table_name='livroscompras')
@@ -0,0 +1,39 @@
+"""recomendacoes
+
+Revision ID: d8c2f5a7e913
+Revises: b6f1a8c3d2e7
+Create Date: 2026-10-19 05:52:36.218540
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8c2f5a7e913'
+down_revision: Union[str, Sequence[str], None] = 'b6f1a8c3d2e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('livros_recomendacoes',
+    sa.Column('livro_id', sa.Integer(), nullable=False),
+    sa.Column('posicao', sa.Integer(), nullable=False),
+    sa.Column('recomendado_id', sa.Integer(), nullable=False),
+    sa.Column('pontuacao', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['livro_id'], ['livros.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['recomendado_id'], ['livros.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('livro_id', 'posicao')
+    )
+    op.create_index(op.f('ix_livros_recomendacoes_recomendado_id'), 'livros_recomendacoes', ['recomendado_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_livros_recomendacoes_recomendado_id'), table_name='livros_recomendacoes')
+    op.drop_table('livros_recomendacoes')
@@ -0,0 +1,57 @@
+"""feed alteracoes
+
+Revision ID: e2a7c5f3b8d1
+Revises: c7d4e1a9b2f6
+Create Date: 2026-10-19 01:12:44.530218
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7c5f3b8d1'
+down_revision: Union[str, Sequence[str], None] = 'c7d4e1a9b2f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for tabela in ('livros', 'usuarios', 'livroscompras'):
+        op.add_column(tabela, sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    # Registros existentes entram no feed pela data de criação (compras) ou pela migração.
+    # O instante vem do mesmo relógio da aplicação (datetime.now(), local e sem fuso);
+    # CURRENT_TIMESTAMP é UTC no SQLite e deixaria as linhas no futuro.
+    agora = sa.bindparam('agora', datetime.now(), type_=sa.DateTime())
+    for tabela in ('livros', 'usuarios'):
+        op.execute(sa.text(f"UPDATE {tabela} SET updated_at = :agora").bindparams(agora))
+    op.execute("UPDATE livroscompras SET updated_at = data_compra")
+
+    for tabela in ('livros', 'usuarios', 'livroscompras'):
+        with op.batch_alter_table(tabela) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+        op.create_index(op.f(f'ix_{tabela}_updated_at'), tabela, ['updated_at'], unique=False)
+
+    op.create_table('exclusoes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entidade', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('entidade_id', sa.Integer(), nullable=False),
+    sa.Column('excluido_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_exclusoes_excluido_em'), 'exclusoes', ['excluido_em'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_exclusoes_excluido_em'), table_name='exclusoes')
+    op.drop_table('exclusoes')
+    for tabela in ('livroscompras', 'usuarios', 'livros'):
+        op.drop_index(op.f(f'ix_{tabela}_updated_at'), table_name=tabela)
+        op.drop_column(tabela, 'updated_at')
@@ -0,0 +1,74 @@
+"""politicas exclusao
+
+Revision ID: f4b9d2e6a1c8
+Revises: e2a7c5f3b8d1
+Create Date: 2026-10-19 02:03:51.114907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b9d2e6a1c8'
+down_revision: Union[str, Sequence[str], None] = 'e2a7c5f3b8d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# No SQLite as chaves da migração inicial não têm nome; a convenção permite
+# identificá-las no modo batch (que recria a tabela).
+CONVENCAO = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+# (tabela, coluna, tabela referenciada, política ON DELETE)
+CHAVES = [
+    ('livros', 'admin_id', 'admins', 'SET NULL'),
+    ('livroscompras', 'usuario_id', 'usuarios', 'CASCADE'),
+    ('livroscompras', 'livro_id', 'livros', 'RESTRICT'),
+]
+
+
+def _nome_original(tabela: str, coluna: str, referida: str) -> str:
+    if op.get_bind().dialect.name == 'sqlite':
+        return f'fk_{tabela}_{coluna}_{referida}'
+    return f'{tabela}_{coluna}_fkey'
+
+
+def _trocar_chaves(tabela: str, nomes_atuais, com_politica: bool) -> None:
+    with op.batch_alter_table(tabela, naming_convention=CONVENCAO) as batch_op:
+        for (t, coluna, referida, politica), nome in zip(CHAVES, nomes_atuais):
+            if t != tabela:
+                continue
+            batch_op.drop_constraint(nome, type_='foreignkey')
+            if tabela == 'livros':
+                batch_op.alter_column('admin_id', existing_type=sa.Integer(), nullable=com_politica)
+            batch_op.create_foreign_key(f'fk_{tabela}_{coluna}_{referida}', referida, [coluna], ['id'],
+                                        ondelete=politica if com_politica else None)
+
+
+def _verificar_livros_sem_admin() -> None:
+    sem_admin = op.get_bind().execute(sa.text(
+        "SELECT id FROM livros WHERE admin_id IS NULL ORDER BY id LIMIT 10"
+    )).scalars().all()
+    if sem_admin:
+        raise RuntimeError(
+            f"livros sem admin não cabem na coluna admin_id NOT NULL original (ex.: IDs "
+            f"{', '.join(map(str, sem_admin))}). Atribua um admin a esses livros antes de reverter esta migration."
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    nomes = [_nome_original(t, c, r) for t, c, r, _ in CHAVES]
+    _trocar_chaves('livros', nomes, com_politica=True)
+    _trocar_chaves('livroscompras', nomes, com_politica=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _verificar_livros_sem_admin()
+    nomes = [f'fk_{t}_{c}_{r}' for t, c, r, _ in CHAVES]
+    _trocar_chaves('livroscompras', nomes, com_politica=False)
+    _trocar_chaves('livros', nomes, com_politica=False)
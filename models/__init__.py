@@ -2,6 +2,13 @@ from models.admin import Admin, AdminBase, AdminPost
 from models.usuario import Usuario, UsuarioBase
 from models.livro import Livro, LivroBase, LivroPost, LivroUpdate
 from models.livroCompras import LivrosCompras
+from models.alteracao import Exclusao
+from models.estoque import LivroEstoqueSlot
+from models.invalidacao import Invalidacao
+from models.recomendacao import LivroRecomendacao
+from models.idempotencia import ChaveIdempotencia
+from models.sequencia import Sequencia
+from models.catalogo import Genero, Editora
 
 __all__ = [
     "Admin",
@@ -14,4 +21,12 @@ __all__ = [
     "LivroPost",
     "LivroUpdate",
     "LivrosCompras",
+    "Exclusao",
+    "LivroEstoqueSlot",
+    "Invalidacao",
+    "LivroRecomendacao",
+    "ChaveIdempotencia",
+    "Sequencia",
+    "Genero",
+    "Editora",
 ]
\ No newline at end of file
@@ -1,4 +1,5 @@
 from sqlmodel import Relationship, SQLModel, Field
+from sqlalchemy import Index, text
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -27,14 +28,26 @@ class Admin(AdminBase, table=True):
 
     Representa um administrador que pode adicionar livros ao sistema.
 
+    O e-mail é único sem diferenciar maiúsculas (índice sobre lower(email)).
+    A busca parcial por nome e e-mail usa trigramas: índices GIN pg_trgm no
+    Postgres e a tabela FTS5 `admins_fts` (mantida por triggers) no SQLite.
+
     Relações:
         livros_adicionados (list[Livro] | None):
             Lista de livros adicionados por este admin.
     """
     __tablename__ = "admins"
+    __table_args__ = (
+        Index("ix_admins_email_lower", text("lower(email)"), unique=True),
+        Index("ix_admins_nome_trgm", "nome", postgresql_using="gin",
+              postgresql_ops={"nome": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_admins_email_trgm", "email", postgresql_using="gin",
+              postgresql_ops={"email": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+    )
 
     livros_adicionados: list["Livro"] | None = Relationship(
-        back_populates="admin_criador"
+        back_populates="admin_criador",
+        sa_relationship_kwargs={"passive_deletes": True}
     )
 
 
@@ -0,0 +1,56 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from typing import Literal
+
+
+class Exclusao(SQLModel, table=True):
+    """
+    Modelo da tabela 'exclusoes' (tombstones).
+
+    Registra a remoção de livros, usuários e compras, para que o feed de
+    alterações consiga informar exclusões aos consumidores incrementais.
+
+    Atributos:
+        id (int | None): ID do registro (gerado automaticamente no banco).
+        entidade (str): Tipo da entidade removida ("livro", "usuario" ou "compra").
+        entidade_id (int): ID da entidade removida.
+        excluido_em (datetime): Momento da remoção.
+    """
+    __tablename__ = "exclusoes"
+
+    id: int | None = Field(default=None, primary_key=True)
+    entidade: str
+    entidade_id: int
+    excluido_em: datetime = Field(default_factory=datetime.now, index=True)
+
+
+class Alteracao(SQLModel):
+    """
+    Item do feed de alterações.
+
+    Atributos:
+        entidade (str): "livro", "usuario" ou "compra".
+        id (int): ID da entidade.
+        operacao (str): "upsert" (criado ou alterado) ou "delete".
+        atualizado_em (datetime): Momento da alteração.
+        dados (dict | None): Estado atual da entidade (None em exclusões).
+    """
+    entidade: str
+    id: int
+    operacao: Literal["upsert", "delete"]
+    atualizado_em: datetime
+    dados: dict | None = None
+
+
+class PaginaAlteracoes(SQLModel):
+    """
+    Resposta do feed de alterações.
+
+    Atributos:
+        alteracoes (list[Alteracao]): Alterações em ordem de ocorrência.
+        cursor (str | None): Cursor para buscar a próxima página (enviar em `since`).
+        tem_mais (bool): Indica se há mais alterações após esta página.
+    """
+    alteracoes: list[Alteracao]
+    cursor: str | None
+    tem_mais: bool
@@ -0,0 +1,41 @@
+from typing import ClassVar
+from sqlmodel import SQLModel, Field
+
+
+class Dominio(SQLModel):
+    """
+    Base das tabelas de domínio dos livros (gêneros e editoras).
+
+    Cada valor é gravado uma vez e `livros` guarda só o ID. A API continua
+    recebendo e devolvendo os nomes: na leitura, o nome vem junto com o livro;
+    na escrita e nos filtros, a tradução nome → ID usa o mapeamento em memória
+    de cada tabela (`ids` e `nomes`), preenchido por services.catalogo. Os
+    valores nunca são renomeados nem removidos, então o mapeamento não precisa
+    ser invalidado, só completado.
+
+    Atributos:
+        id (int | None): ID do valor (gerado automaticamente no banco).
+        nome (str): Nome do valor (único).
+    """
+    id: int | None = Field(default=None, primary_key=True)
+    nome: str = Field(index=True, unique=True)
+
+
+class Genero(Dominio, table=True):
+    """
+    Modelo da tabela 'generos'.
+    """
+    __tablename__ = "generos"
+
+    ids: ClassVar[dict[str, int]] = {}
+    nomes: ClassVar[dict[int, str]] = {}
+
+
+class Editora(Dominio, table=True):
+    """
+    Modelo da tabela 'editoras'.
+    """
+    __tablename__ = "editoras"
+
+    ids: ClassVar[dict[str, int]] = {}
+    nomes: ClassVar[dict[int, str]] = {}
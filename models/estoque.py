@@ -0,0 +1,25 @@
+from sqlmodel import SQLModel, Field
+
+
+class LivroEstoqueSlot(SQLModel, table=True):
+    """
+    Modelo da tabela 'livros_estoque_slots'.
+
+    Fatia do estoque de um livro com estoque fragmentado. Cada compra debita
+    uma única fatia, de modo que compras simultâneas do mesmo título disputam
+    linhas diferentes em vez da linha do livro.
+
+    Atributos:
+        livro_id (int): ID do livro.
+        slot (int): Número da fatia (0 a N-1).
+        quantidade (int): Unidades disponíveis na fatia.
+        vendido (int): Unidades vendidas pela fatia ainda não somadas em livros.total_vendido.
+        receita (float): Receita da fatia ainda não somada em livros.receita_total.
+    """
+    __tablename__ = "livros_estoque_slots"
+
+    livro_id: int = Field(foreign_key="livros.id", primary_key=True, ondelete="CASCADE")
+    slot: int = Field(primary_key=True)
+    quantidade: int = Field(default=0)
+    vendido: int = Field(default=0)
+    receita: float = Field(default=0)
@@ -0,0 +1,30 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+
+class ChaveIdempotencia(SQLModel, table=True):
+    """
+    Modelo da tabela 'idempotencia'.
+
+    Guarda as chaves enviadas no cabeçalho Idempotency-Key e a resposta da
+    primeira execução, para que novas tentativas do cliente recebam a mesma
+    resposta sem repetir a operação.
+
+    Atributos:
+        escopo (str): Operação protegida (ex: "compras").
+        chave (str): Valor do cabeçalho Idempotency-Key.
+        impressao (str): Hash do corpo da requisição (detecta reuso da chave com outro corpo).
+        status (int | None): Status HTTP da resposta; None enquanto a primeira execução está em andamento.
+        resposta (str | None): Corpo JSON da resposta.
+        reservado_em (datetime): Início da execução que reservou a chave.
+        expira_em (datetime): Momento a partir do qual a chave pode ser apagada.
+    """
+    __tablename__ = "idempotencia"
+
+    escopo: str = Field(primary_key=True, max_length=32)
+    chave: str = Field(primary_key=True, max_length=255)
+    impressao: str = Field(max_length=64)
+    status: int | None = None
+    resposta: str | None = None
+    reservado_em: datetime = Field(default_factory=datetime.now)
+    expira_em: datetime = Field(index=True)
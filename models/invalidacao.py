@@ -0,0 +1,26 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+
+class Invalidacao(SQLModel, table=True):
+    """
+    Modelo da tabela 'invalidacoes'.
+
+    Fila de eventos de invalidação de cache usada quando o banco não tem
+    LISTEN/NOTIFY (SQLite): cada worker consulta periodicamente as linhas
+    com ID maior que o último evento lido.
+
+    Atributos:
+        id (int | None): ID do evento (gerado automaticamente no banco).
+        origem (str): Identificador do worker que publicou o evento.
+        entidade (str): Tipo da entidade alterada (ex: "livro").
+        ids (str): IDs alterados, separados por vírgula.
+        criado_em (datetime): Momento da publicação.
+    """
+    __tablename__ = "invalidacoes"
+
+    id: int | None = Field(default=None, primary_key=True)
+    origem: str
+    entidade: str
+    ids: str
+    criado_em: datetime = Field(default_factory=datetime.now, index=True)
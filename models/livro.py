@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from datetime import datetime
 from typing import TYPE_CHECKING, List
 
@@ -6,6 +7,7 @@ if TYPE_CHECKING:
     from models.admin import Admin
     from models.livroCompras import LivrosCompras
 
+from models.catalogo import Editora, Genero
 from models.livroCompras import LivrosComprasRead
 
 
@@ -33,22 +35,100 @@ class LivroBase(SQLModel):
     preco_uni: float
 
 
-class Livro(LivroBase, table=True):
+class Livro(SQLModel, table=True):
     """
     Modelo principal da tabela 'livros'.
 
-    Representa um livro completo armazenado no banco e suas relações.
+    Representa um livro completo armazenado no banco e suas relações. Gênero
+    e editora ficam nas tabelas 'generos' e 'editoras', carregadas logo após
+    os livros (selectin pela chave primária de tabelas pequenas); as
+    propriedades `genero` e `editora` dão os nomes.
 
     Atributos:
-        admin_id (int): ID do administrador responsável pelo cadastro.
+        id (int | None): ID do livro (gerado automaticamente no banco).
+        titulo (str): Título do livro.
+        autor (str): Nome do autor.
+        quantidade_paginas (int): Quantidade total de páginas.
+        genero_id (int): ID do gênero literário.
+        editora_id (int): ID da editora responsável.
+        quantidade_estoque (int): Quantidade disponível em estoque.
+        preco_uni (float): Preço unitário do livro.
+        admin_id (int | None): ID do administrador responsável pelo cadastro
+            (fica nulo se o admin for removido).
+        total_vendido (int): Unidades vendidas (contador mantido pelas rotas de compra).
+        receita_total (float): Receita acumulada das vendas (contador mantido pelas rotas de compra).
+        updated_at (datetime): Data da última alteração (usada no feed de alterações).
+        estoque_fragmentado (bool): Indica se o estoque está dividido em fatias
+            (livros_estoque_slots); nesse caso quantidade_estoque guarda só o que
+            não foi distribuído.
         admin_criador (Admin): Relação com o Admin que cadastrou o livro.
         compras (list[LivrosCompras] | None): Lista de compras realizadas deste livro.
     """
     __tablename__ = "livros"
+    __table_args__ = (
+        # Combinações de filtro + ordenação/faixa mais usadas em /livros/search.
+        # Também atendem as chaves estrangeiras (gênero/editora em uso não é removido).
+        Index("ix_livros_genero_id_preco_uni", "genero_id", "preco_uni"),
+        Index("ix_livros_editora_id_preco_uni", "editora_id", "preco_uni"),
+        Index("ix_livros_preco_uni", "preco_uni"),
+        Index("ix_livros_quantidade_paginas", "quantidade_paginas"),
+        Index("ix_livros_admin_id", "admin_id"),
+        # Sem índice parcial para "em estoque": o filtro inclui os livros com
+        # estoque fragmentado (OR), que um índice com WHERE quantidade_estoque > 0
+        # não cobre. A busca usa a faixa de preço (ix_livros_preco_uni).
+    )
 
-    admin_id: int = Field(default=None, foreign_key="admins.id")
+    id: int | None = Field(default=None, primary_key=True)
+    titulo: str
+    autor: str
+    quantidade_paginas: int
+    genero_id: int = Field(foreign_key="generos.id", ondelete="RESTRICT")
+    editora_id: int = Field(foreign_key="editoras.id", ondelete="RESTRICT")
+    quantidade_estoque: int
+    preco_uni: float
+    admin_id: int | None = Field(default=None, foreign_key="admins.id", ondelete="SET NULL")
+    total_vendido: int = Field(default=0, index=True)
+    receita_total: float = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.now, index=True,
+                                 sa_column_kwargs={"onupdate": datetime.now})
+    estoque_fragmentado: bool = Field(default=False)
     admin_criador: "Admin" = Relationship(back_populates="livros_adicionados")
-    compras: list["LivrosCompras"] | None = Relationship(back_populates="livro")
+    # Livros com compras não podem ser removidos (ON DELETE RESTRICT no banco).
+    compras: list["LivrosCompras"] | None = Relationship(
+        back_populates="livro",
+        sa_relationship_kwargs={"passive_deletes": "all"}
+    )
+    # Carregados num SELECT ... WHERE id IN (...) à parte, pela chave primária.
+    # Um JOIN aqui ficaria aninhado nos joinedload de outras entidades (ex.:
+    # Admin.livros_adicionados) e o SQLite materializaria a junção inteira.
+    registro_genero: Genero = Relationship(sa_relationship_kwargs={"lazy": "selectin"})
+    registro_editora: Editora = Relationship(sa_relationship_kwargs={"lazy": "selectin"})
+
+    @property
+    def genero(self) -> str:
+        return self.registro_genero.nome
+
+    @property
+    def editora(self) -> str:
+        return self.registro_editora.nome
+
+
+class LivroRead(LivroBase):
+    """
+    Modelo de resposta de um livro, com os contadores e sem as compras.
+
+    Atributos:
+        admin_id (int | None): ID do admin que cadastrou o livro.
+        total_vendido (int): Unidades vendidas.
+        receita_total (float): Receita acumulada das vendas.
+        updated_at (datetime): Data da última alteração.
+        estoque_fragmentado (bool): Indica se o estoque está dividido em fatias.
+    """
+    admin_id: int | None
+    total_vendido: int = 0
+    receita_total: float = 0
+    updated_at: datetime
+    estoque_fragmentado: bool = False
 
 
 class LivroUpdate(SQLModel):
@@ -75,6 +155,43 @@ class LivroUpdate(SQLModel):
     preco_uni: float | None = None
 
 
+class LivroBulkItem(LivroUpdate):
+    """
+    Item da atualização em lote de livros (PATCH /livros/bulk).
+
+    Atributos:
+        id (int): ID do livro a ser atualizado.
+        (demais campos): Mesmos campos opcionais de LivroUpdate.
+    """
+    id: int
+
+
+class LivroBulkResultado(SQLModel):
+    """
+    Resultado da atualização em lote de livros.
+
+    Atributos:
+        atualizados (list[int]): IDs dos livros atualizados.
+        nao_encontrados (list[int]): IDs informados que não existem.
+    """
+    atualizados: list[int]
+    nao_encontrados: list[int]
+
+
+class LivroSugestao(SQLModel):
+    """
+    Sugestão retornada pelo autocomplete de livros.
+
+    Atributos:
+        id (int): ID do livro.
+        titulo (str): Título do livro.
+        autor (str): Nome do autor.
+    """
+    id: int
+    titulo: str
+    autor: str
+
+
 class LivroPost(SQLModel):
     """
     Modelo utilizado para criação de um novo livro (POST).
@@ -106,8 +223,26 @@ class LivroComCompras(LivroBase):
     Usado para endpoints GET que retornam o livro com informações relacionadas.
 
     Atributos:
-        admin_id (int): ID do admin que cadastrou o livro.
+        admin_id (int | None): ID do admin que cadastrou o livro.
+        total_vendido (int): Unidades vendidas.
+        receita_total (float): Receita acumulada das vendas.
+        estoque_fragmentado (bool): Indica se o estoque está dividido em fatias.
         compras (list[LivrosComprasRead]): Lista de compras deste livro.
     """
-    admin_id: int
+    admin_id: int | None
+    total_vendido: int = 0
+    receita_total: float = 0
+    estoque_fragmentado: bool = False
     compras: list[LivrosComprasRead] = []
+
+
+class LivroLoteResultado(SQLModel):
+    """
+    Resultado da busca de livros em lote (POST /livros/batch-get).
+
+    Atributos:
+        itens (list[LivroComCompras]): Livros encontrados, na ordem dos IDs pedidos.
+        nao_encontrados (list[int]): IDs informados que não existem.
+    """
+    itens: list[LivroComCompras]
+    nao_encontrados: list[int]
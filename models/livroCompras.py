@@ -1,6 +1,6 @@
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, Integer
-from datetime import datetime
+from sqlalchemy import Column, Integer, Index, text
+from datetime import date, datetime
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -18,25 +18,39 @@ class LivrosCompras(SQLModel, table=True):
 
     Atributos:
         id (int | None): Identificador único da compra (auto-incremento).
-        usuario_id (int): ID do usuário que realizou a compra.
-        livro_id (int): ID do livro comprado.
+        usuario_id (int): ID do usuário que realizou a compra (removida junto com o usuário).
+        livro_id (int): ID do livro comprado (impede a remoção do livro).
         data_compra (datetime): Data e hora da compra (gerada automaticamente).
         preco_pago (float): Valor total pago na compra.
         quantidade_comprados (int): Quantidade de livros comprados.
+        updated_at (datetime): Data da última alteração (usada no feed de alterações).
         usuario (Usuario): Relacionamento com o usuário que fez a compra.
         livro (Livro): Relacionamento com o livro comprado.
     """
     __tablename__ = "livroscompras"
+    __table_args__ = (
+        # Índices de cobertura da série de vendas (/compras/metrics/serie). A
+        # expressão da hora é a mesma de services.series.hora em cada banco.
+        Index("ix_livroscompras_hora", text("substr(data_compra, 1, 13)"),
+              "quantidade_comprados", "preco_pago").ddl_if(dialect="sqlite"),
+        Index("ix_livroscompras_hora", text("date_trunc('hour', data_compra)"),
+              "quantidade_comprados", "preco_pago").ddl_if(dialect="postgresql"),
+        # Também atende os filtros por livro (substitui o índice de livro_id).
+        Index("ix_livroscompras_livro_id_data_compra", "livro_id", "data_compra",
+              "quantidade_comprados", "preco_pago"),
+    )
 
     id: int | None = Field(
         default=None,
         sa_column=Column(Integer, primary_key=True, autoincrement=True)
     )
-    usuario_id: int = Field(foreign_key="usuarios.id")
-    livro_id: int = Field(foreign_key="livros.id")
-    data_compra: datetime = Field(default_factory=datetime.now)
+    usuario_id: int = Field(foreign_key="usuarios.id", index=True, ondelete="CASCADE")
+    livro_id: int = Field(foreign_key="livros.id", ondelete="RESTRICT")
+    data_compra: datetime = Field(default_factory=datetime.now, index=True)
     preco_pago: float
     quantidade_comprados: int
+    updated_at: datetime = Field(default_factory=datetime.now, index=True,
+                                 sa_column_kwargs={"onupdate": datetime.now})
 
     usuario: "Usuario" = Relationship(
         back_populates="livros_comprados",
@@ -106,4 +120,49 @@ class LivrosComprasResponse(SQLModel):
     livro_id: int
     data_compra: datetime
     preco_pago: float
-    quantidade_comprados: int
\ No newline at end of file
+    quantidade_comprados: int
+
+class PontoSerieVendas(SQLModel):
+    """
+    Ponto da série temporal de vendas.
+
+    Atributos:
+        inicio (datetime): Início do período (hora, dia ou semana).
+        compras (int): Quantidade de compras no período.
+        unidades (int): Unidades vendidas no período.
+        receita (float): Receita do período.
+    """
+    inicio: datetime
+    compras: int
+    unidades: int
+    receita: float
+
+
+class SerieVendas(SQLModel):
+    """
+    Série temporal de vendas com um ponto por período, inclusive os sem vendas.
+
+    Atributos:
+        bucket (str): Tamanho do período ("hour", "day" ou "week").
+        inicio (date): Primeiro dia pedido.
+        fim (date): Último dia pedido (inclusivo).
+        livro_id (int | None): Livro filtrado, se houver.
+        pontos (list[PontoSerieVendas]): Pontos em ordem cronológica.
+    """
+    bucket: str
+    inicio: date
+    fim: date
+    livro_id: int | None = None
+    pontos: list[PontoSerieVendas]
+
+
+class ComprasLoteResultado(SQLModel):
+    """
+    Resultado da busca de compras em lote (POST /compras/batch-get).
+
+    Atributos:
+        itens (list[LivrosComprasResponse]): Compras encontradas, na ordem dos IDs pedidos.
+        nao_encontrados (list[int]): IDs informados que não existem.
+    """
+    itens: list[LivrosComprasResponse]
+    nao_encontrados: list[int]
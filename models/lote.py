@@ -0,0 +1,34 @@
+from sqlmodel import SQLModel, Field
+
+# Máximo de IDs por requisição de busca em lote (cabe num único IN, inclusive no SQLite).
+MAX_IDS_LOTE = 500
+
+
+class LoteIds(SQLModel):
+    """
+    Corpo das buscas em lote por ID (POST /<recurso>/batch-get).
+
+    Atributos:
+        ids (list[int]): IDs procurados, na ordem desejada na resposta.
+    """
+    ids: list[int] = Field(min_length=1, max_length=MAX_IDS_LOTE)
+
+    def unicos(self) -> list[int]:
+        """
+        IDs sem repetição, na ordem da primeira ocorrência.
+        """
+        return list(dict.fromkeys(self.ids))
+
+    def ordenar(self, encontrados: dict) -> tuple[list, list[int]]:
+        """
+        Põe os registros encontrados na ordem dos IDs pedidos.
+
+        Args:
+            encontrados (dict): Registros encontrados, por ID.
+
+        Returns:
+            tuple: Registros na ordem pedida (um por ID) e IDs não encontrados.
+        """
+        ids = self.unicos()
+        return ([encontrados[i] for i in ids if i in encontrados],
+                [i for i in ids if i not in encontrados])
@@ -0,0 +1,38 @@
+from sqlmodel import SQLModel, Field
+
+
+class LivroRecomendacao(SQLModel, table=True):
+    """
+    Modelo da tabela 'livros_recomendacoes'.
+
+    Vizinhos mais comprados junto com cada livro ("quem comprou também comprou"),
+    pré-calculados por `scripts.recomendacoes` a partir de livroscompras.
+
+    Atributos:
+        livro_id (int): ID do livro de referência.
+        posicao (int): Posição da recomendação (0 é a mais forte).
+        recomendado_id (int): ID do livro recomendado.
+        pontuacao (float): Quantidade de usuários que compraram os dois livros.
+    """
+    __tablename__ = "livros_recomendacoes"
+
+    livro_id: int = Field(foreign_key="livros.id", primary_key=True, ondelete="CASCADE")
+    posicao: int = Field(primary_key=True)
+    recomendado_id: int = Field(foreign_key="livros.id", index=True, ondelete="CASCADE")
+    pontuacao: float
+
+
+class RecomendacaoLivro(SQLModel):
+    """
+    Livro recomendado retornado pela API.
+
+    Atributos:
+        id (int): ID do livro recomendado.
+        titulo (str): Título do livro.
+        autor (str): Nome do autor.
+        pontuacao (float): Quantidade de usuários que compraram os dois livros.
+    """
+    id: int
+    titulo: str
+    autor: str
+    pontuacao: float
@@ -0,0 +1,43 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from typing import Any, Literal
+
+
+class RelatorioPost(SQLModel):
+    """
+    Modelo utilizado para solicitar a geração de um relatório (POST).
+
+    Atributos:
+        tipo (str): Tipo do relatório ("receita_anual" ou "por_editora").
+        ano (int | None): Ano de referência (obrigatório para "receita_anual").
+    """
+    tipo: Literal["receita_anual", "por_editora"]
+    ano: int | None = Field(default=None, ge=1900, le=9999)
+
+
+class RelatorioStatus(SQLModel):
+    """
+    Modelo de resposta com a situação de um relatório.
+
+    Atributos:
+        id (str): Identificador do relatório.
+        tipo (str): Tipo do relatório.
+        parametros (dict): Parâmetros usados na geração.
+        status (str): pendente, executando, concluido, falhou ou cancelado.
+        criado_em (datetime): Momento da solicitação.
+        iniciado_em (datetime | None): Início da execução.
+        concluido_em (datetime | None): Fim da execução.
+        expira_em (datetime | None): Momento em que o resultado deixa de ficar disponível.
+        resultado (Any | None): Dados do relatório, quando concluído.
+        erro (str | None): Mensagem de erro, quando falhou.
+    """
+    id: str
+    tipo: str
+    parametros: dict
+    status: str
+    criado_em: datetime
+    iniciado_em: datetime | None = None
+    concluido_em: datetime | None = None
+    expira_em: datetime | None = None
+    resultado: Any | None = None
+    erro: str | None = None
@@ -0,0 +1,19 @@
+from sqlmodel import SQLModel, Field
+
+
+class Sequencia(SQLModel, table=True):
+    """
+    Modelo da tabela 'sequencias'.
+
+    Contadores de IDs distribuídos em blocos pela aplicação, para tabelas
+    cujas linhas ficam em mais de um banco (ex.: compras com shards), onde o
+    autoincremento de cada banco geraria IDs repetidos.
+
+    Atributos:
+        nome (str): Tabela numerada (ex: "livroscompras").
+        valor (int): Último ID já entregue.
+    """
+    __tablename__ = "sequencias"
+
+    nome: str = Field(primary_key=True, max_length=64)
+    valor: int = 0
@@ -0,0 +1,17 @@
+from sqlmodel import SQLModel, Field
+
+
+class AdmissaoUpdate(SQLModel):
+    """
+    Modelo para alteração em tempo de execução de uma classe do controle de admissão.
+
+    Todos os campos são opcionais; apenas os informados são alterados.
+
+    Atributos:
+        limite (int | None): Quantidade máxima de requisições simultâneas.
+        fila_max (int | None): Tamanho máximo da fila de espera.
+        espera_max (float | None): Tempo máximo de espera na fila, em segundos.
+    """
+    limite: int | None = Field(default=None, ge=1)
+    fila_max: int | None = Field(default=None, ge=0)
+    espera_max: float | None = Field(default=None, gt=0)
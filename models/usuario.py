@@ -1,4 +1,6 @@
 from sqlmodel import Relationship, SQLModel, Field
+from sqlalchemy import Index, text
+from datetime import datetime
 from typing import TYPE_CHECKING, List
 from models.livroCompras import LivrosComprasRead
 
@@ -31,13 +33,29 @@ class Usuario(UsuarioBase, table=True):
     Representa um usuário completo armazenado no banco e suas relações.
 
     Atributos:
+        total_compras (int): Quantidade de compras realizadas (contador mantido pelas rotas de compra).
+        total_gasto (float): Valor total gasto (contador mantido pelas rotas de compra).
+        updated_at (datetime): Data da última alteração (usada no feed de alterações).
         livros_comprados (list[LivrosCompras]): Lista de compras realizadas pelo usuário.
+
+    O e-mail é único sem diferenciar maiúsculas (índice sobre lower(email)).
+    A busca parcial por nome usa trigramas: índice GIN pg_trgm no Postgres e a
+    tabela FTS5 `usuarios_fts` (mantida por triggers) no SQLite.
     """
     __tablename__ = "usuarios"
+    __table_args__ = (
+        Index("ix_usuarios_email_lower", text("lower(email)"), unique=True),
+        Index("ix_usuarios_nome_trgm", "nome", postgresql_using="gin",
+              postgresql_ops={"nome": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+    )
 
+    total_compras: int = Field(default=0)
+    total_gasto: float = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.now, index=True,
+                                 sa_column_kwargs={"onupdate": datetime.now})
     livros_comprados: list["LivrosCompras"] = Relationship(
         back_populates="usuario",
-        sa_relationship_kwargs={"lazy": "noload"}
+        sa_relationship_kwargs={"lazy": "noload", "passive_deletes": True}
     )
 
 
@@ -64,8 +82,12 @@ class UsuarioComCompras(UsuarioBase):
     Usado para endpoints GET que retornam o usuário com informações de compras.
 
     Atributos:
+        total_compras (int): Quantidade de compras realizadas.
+        total_gasto (float): Valor total gasto.
         livros_comprados (list[LivrosComprasRead]): Lista de compras realizadas.
     """
+    total_compras: int = 0
+    total_gasto: float = 0
     livros_comprados: list[LivrosComprasRead] = []
 
 
@@ -84,4 +106,16 @@ class UsuarioUpdate(SQLModel):
     nome: str | None = None
     email: str | None = None
     endereco: str | None = None
-    telefone: str | None = None
\ No newline at end of file
+    telefone: str | None = None
+
+
+class UsuarioLoteResultado(SQLModel):
+    """
+    Resultado da busca de usuários em lote (POST /usuarios/batch-get).
+
+    Atributos:
+        itens (list[UsuarioComCompras]): Usuários encontrados, na ordem dos IDs pedidos.
+        nao_encontrados (list[int]): IDs informados que não existem.
+    """
+    itens: list[UsuarioComCompras]
+    nao_encontrados: list[int]
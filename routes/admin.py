@@ -1,9 +1,16 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Query
 from sqlmodel import select, or_
 from sqlalchemy.orm import joinedload
+from datetime import datetime
+from sqlalchemy import delete, func, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_session
+from middlewares.deadline import consulta_interrompida
 from models.admin import Admin, AdminPost, AdminComLivrosAdicionados
+from models.livro import Livro
+from services.busca_texto import contem
+from services.invalidacao import barramento
 
 router = APIRouter(
     prefix="/admin",
@@ -11,6 +18,44 @@ router = APIRouter(
 )
 
 
+def consulta_obter_admin(admin_id: int):
+    """
+    Monta a consulta de um admin pelo ID com os livros adicionados carregados.
+    """
+    return select(Admin).where(Admin.id == admin_id).options(joinedload(Admin.livros_adicionados))
+
+
+def consulta_admin_por_email(email: str):
+    """
+    Monta a consulta de um admin pelo e-mail exato, sem diferenciar maiúsculas.
+
+    A comparação é feita sobre lower(email), a mesma expressão do índice único.
+    """
+    return (select(Admin).where(func.lower(Admin.email) == func.lower(email))
+            .options(joinedload(Admin.livros_adicionados)))
+
+
+def consulta_buscar_admins(nome: str | None = None, email: str | None = None,
+                           ordernar_por: str = "id", ordem: str = "asc"):
+    """
+    Monta a consulta de busca de admins por nome e e-mail parciais (índice de trigramas).
+    """
+    stmt = select(Admin).options(joinedload(Admin.livros_adicionados))
+
+    if nome:
+        stmt = stmt.where(contem(Admin.nome, nome))
+    if email:
+        stmt = stmt.where(contem(Admin.email, email))
+
+    if ordernar_por in ["id", "nome", "email"]:
+        coluna = getattr(Admin, ordernar_por)
+        if ordem.lower() == "desc":
+            stmt = stmt.order_by(coluna.desc())
+        else:
+            stmt = stmt.order_by(coluna.asc())
+    return stmt
+
+
 @router.post("/", response_model=Admin)
 async def criar_admin(admin: AdminPost, session: AsyncSession = Depends(get_session)):
     """
@@ -24,6 +69,7 @@ async def criar_admin(admin: AdminPost, session: AsyncSession = Depends(get_sess
         Admin: Objeto do administrador criado.
 
     Raises:
+        HTTPException 409: Caso o e-mail já esteja cadastrado.
         HTTPException 500: Caso algum erro ocorra ao salvar no banco.
     """
     db_admin = Admin.model_validate(admin)
@@ -32,8 +78,13 @@ async def criar_admin(admin: AdminPost, session: AsyncSession = Depends(get_sess
         await session.commit()
         await session.refresh(db_admin)
         return db_admin
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="E-mail já cadastrado")
     except Exception as e:
         await session.rollback()
+        if consulta_interrompida(e):
+            raise
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
@@ -53,7 +104,8 @@ async def listar_admins(offset: int = 0, limit: int = Query(default=10, le=100),
     stmt = (select(Admin).offset(offset).limit(limit)
             .options(joinedload(Admin.livros_adicionados)))
     result = await session.execute(stmt)
-    return result.scalars().unique().all()
+    admins = result.scalars().unique().all()
+    return admins
 
 
 @router.get("/search", response_model=list[AdminComLivrosAdicionados], summary="Filtrar e Ordenar Admins")
@@ -71,28 +123,42 @@ async def buscar_e_filtrar_admins(
         session (AsyncSession): Sessão assíncrona do banco.
         nome (str | None): Nome parcial para filtragem.
         email (str | None): Email parcial para filtragem.
+            Nome e e-mail com 3 caracteres ou mais usam o índice de trigramas.
         ordernar_por (str): Campo usado para ordenação.
         ordem (str): Direção da ordenação ("asc" ou "desc").
 
     Returns:
         list[AdminComLivrosAdicionados]: Lista de admins filtrados e ordenados.
     """
-    stmt = select(Admin).options(joinedload(Admin.livros_adicionados))
+    stmt = consulta_buscar_admins(nome, email, ordernar_por, ordem)
+    result = await session.execute(stmt)
+    admins = result.scalars().unique().all()
+    return admins
 
-    if nome:
-        stmt = stmt.where(Admin.nome.ilike(f"%{nome}%"))
-    if email:
-        stmt = stmt.where(Admin.email.ilike(f"%{email}%"))
 
-    if ordernar_por in ["id", "nome", "email"]:
-        coluna = getattr(Admin, ordernar_por)
-        if ordem.lower() == "desc":
-            stmt = stmt.order_by(coluna.desc())
-        else:
-            stmt = stmt.order_by(coluna.asc())
+@router.get("/por-email", response_model=AdminComLivrosAdicionados, summary="Buscar Admin por E-mail")
+async def obter_admin_por_email(
+    email: str = Query(..., description="E-mail exato (sem diferenciar maiúsculas)"),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Obter um administrador pelo e-mail, usando o índice único sobre lower(email).
 
-    result = await session.execute(stmt)
-    return result.scalars().unique().all()
+    Args:
+        email (str): E-mail do administrador.
+        session (AsyncSession): Sessão assíncrona do banco.
+
+    Returns:
+        AdminComLivrosAdicionados: Admin encontrado com seus livros.
+
+    Raises:
+        HTTPException 404: Se nenhum admin tiver o e-mail.
+    """
+    result = await session.execute(consulta_admin_por_email(email))
+    admin = result.scalars().first()
+    if not admin:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Admin não encontrado")
+    return admin
 
 
 @router.get("/{admin_id}", response_model=AdminComLivrosAdicionados)
@@ -110,7 +176,7 @@ async def obter_admin(admin_id: int, session: AsyncSession = Depends(get_session
     Raises:
         HTTPException 404: Se o admin não existir.
     """
-    stmt = select(Admin).where(Admin.id == admin_id).options(joinedload(Admin.livros_adicionados))
+    stmt = consulta_obter_admin(admin_id)
     result = await session.execute(stmt)
     admin = result.scalars().first()
     if not admin:
@@ -133,6 +199,7 @@ async def atualizar_admin(admin_id: int, dados: AdminPost, session: AsyncSession
 
     Raises:
         HTTPException 404: Caso o admin não exista.
+        HTTPException 409: Caso o novo e-mail já pertença a outro admin.
         HTTPException 500: Caso ocorra erro ao salvar.
     """
     admin = await session.get(Admin, admin_id)
@@ -147,8 +214,13 @@ async def atualizar_admin(admin_id: int, dados: AdminPost, session: AsyncSession
         await session.commit()
         await session.refresh(admin)
         return admin
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="E-mail já cadastrado")
     except Exception as e:
         await session.rollback()
+        if consulta_interrompida(e):
+            raise
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
@@ -157,6 +229,11 @@ async def deletar_admin(admin_id: int, session: AsyncSession = Depends(get_sessi
     """
     Remover um administrador pelo ID.
 
+    Os livros cadastrados pelo admin são mantidos, com admin_id nulo. A
+    desvinculação é feita aqui (e não só pelo ON DELETE SET NULL do banco)
+    para avançar o updated_at dos livros e publicar a invalidação deles, senão
+    o feed de alterações e os caches não veriam a mudança.
+
     Args:
         admin_id (int): ID do admin a ser removido.
         session (AsyncSession): Sessão assíncrona do banco.
@@ -168,14 +245,20 @@ async def deletar_admin(admin_id: int, session: AsyncSession = Depends(get_sessi
         HTTPException 404: Caso o admin não exista.
         HTTPException 500: Caso ocorra erro ao remover.
     """
-    admin = await session.get(Admin, admin_id)
-    if not admin:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Admin não encontrado")
-
     try:
-        await session.delete(admin)
+        livros = await session.execute(
+            update(Livro).where(Livro.admin_id == admin_id)
+            .values(admin_id=None, updated_at=datetime.now()).returning(Livro.id)
+        )
+        await barramento.publicar(session, "livro", livros.scalars().all())
+        result = await session.execute(delete(Admin).where(Admin.id == admin_id))
         await session.commit()
-        return {"detail": "Admin removido"}
     except Exception as e:
         await session.rollback()
+        if consulta_interrompida(e):
+            raise
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+    if result.rowcount == 0:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Admin não encontrado")
+    return {"detail": "Admin removido"}
@@ -0,0 +1,141 @@
+import base64
+import heapq
+import os
+from datetime import datetime, timedelta
+from fastapi import APIRouter, HTTPException, Depends, status, Query
+from sqlmodel import select, and_, or_, true, false
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_session
+from models.alteracao import Exclusao, Alteracao, PaginaAlteracoes
+from models.livro import Livro, LivroRead
+from models.livroCompras import LivrosCompras
+from models.usuario import Usuario
+from services import estoque
+from services.shards import shards
+
+router = APIRouter(
+    prefix="/changes",
+    tags=["Alterações"]
+)
+
+# Alterações mais recentes que isso não são entregues: o updated_at é gerado
+# antes do commit, então uma transação ainda em andamento pode gravar um
+# instante anterior a alterações já visíveis.
+ATRASO = float(os.getenv("ALTERACOES_ATRASO", 2))
+
+# (ordem, entidade, modelo, coluna de ordenação). A ordem desempata alterações
+# de tabelas diferentes com o mesmo instante.
+FONTES = [
+    (0, "livro", Livro, Livro.updated_at),
+    (1, "usuario", Usuario, Usuario.updated_at),
+    (2, "compra", LivrosCompras, LivrosCompras.updated_at),
+    (3, None, Exclusao, Exclusao.excluido_em),
+]
+
+
+def codificar_cursor(instante: datetime, ordem: int, id: int) -> str:
+    """
+    Gera o cursor opaco da posição (instante, fonte, id) no feed.
+    """
+    bruto = f"{instante.isoformat()}|{ordem}|{id}".encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> tuple[datetime, int, int]:
+    """
+    Interpreta um cursor gerado por `codificar_cursor`.
+
+    Raises:
+        ValueError: Se o cursor estiver malformado.
+    """
+    bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    instante, ordem, id = bruto.split("|")
+    return datetime.fromisoformat(instante), int(ordem), int(id)
+
+
+def consulta_alteracoes(ordem: int, modelo, coluna, posicao: tuple[datetime, int, int] | None,
+                        ate: datetime, limit: int):
+    """
+    Monta a consulta das alterações de uma tabela após a posição do cursor.
+
+    Percorre o índice de `coluna` a partir do instante do cursor, de modo que o
+    custo depende da quantidade de alterações e não do tamanho da tabela.
+    """
+    stmt = select(modelo).where(coluna < ate)
+    if posicao is not None:
+        instante, ordem_cursor, id_cursor = posicao
+        if ordem > ordem_cursor:
+            desempate = true()
+        elif ordem == ordem_cursor:
+            desempate = modelo.id > id_cursor
+        else:
+            desempate = false()
+        stmt = stmt.where(coluna >= instante, or_(coluna > instante, and_(coluna == instante, desempate)))
+    return stmt.order_by(coluna, modelo.id).limit(limit)
+
+
+async def _listar(session: AsyncSession, stmt) -> list:
+    return (await session.execute(stmt)).scalars().all()
+
+
+@router.get("/", response_model=PaginaAlteracoes)
+async def listar_alteracoes(
+    since: str | None = Query(None, description="Cursor retornado pela página anterior (vazio para começar do início)"),
+    limit: int = Query(default=100, ge=1, le=1000),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Lista, em ordem, as alterações de livros, usuários e compras após um cursor.
+
+    Criações e atualizações são retornadas como "upsert" com o estado atual da
+    entidade; remoções são retornadas como "delete". Uma entidade alterada várias
+    vezes aparece apenas na posição da sua alteração mais recente.
+
+    Args:
+        since (str | None): Cursor da página anterior.
+        limit (int): Quantidade máxima de alterações na página.
+        session (AsyncSession): Sessão do banco de dados.
+
+    Returns:
+        PaginaAlteracoes: Alterações, cursor para a próxima página e se há mais alterações.
+
+    Raises:
+        HTTPException 400: Caso o cursor seja inválido.
+    """
+    posicao = None
+    if since:
+        try:
+            posicao = decodificar_cursor(since)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+
+    ate = datetime.now() - timedelta(seconds=ATRASO)
+    fontes = []
+    for ordem, entidade, modelo, coluna in FONTES:
+        stmt = consulta_alteracoes(ordem, modelo, coluna, posicao, ate, limit + 1)
+        if modelo is LivrosCompras:
+            # Com shards, cada shard devolve suas primeiras alterações; a intercalação dá as do feed.
+            partes = await shards.ler_compras(session, lambda sessao: _listar(sessao, stmt))
+            linhas = list(heapq.merge(*partes, key=lambda compra: (compra.updated_at, compra.id)))[:limit + 1]
+        else:
+            linhas = await _listar(session, stmt)
+        if modelo is Livro:
+            await estoque.aplicar(session, linhas)
+        fontes.append([(getattr(linha, coluna.key), ordem, linha.id, entidade, linha) for linha in linhas])
+
+    mescladas = list(heapq.merge(*fontes, key=lambda item: item[:3]))
+    pagina = mescladas[:limit]
+
+    alteracoes = []
+    for instante, ordem, id, entidade, linha in pagina:
+        if entidade is None:
+            alteracoes.append(Alteracao(entidade=linha.entidade, id=linha.entidade_id,
+                                        operacao="delete", atualizado_em=instante))
+        else:
+            # Livros vão com os nomes de gênero e editora, como na API.
+            dados = LivroRead.model_validate(linha).model_dump() if entidade == "livro" else linha.model_dump()
+            alteracoes.append(Alteracao(entidade=entidade, id=id, operacao="upsert",
+                                        atualizado_em=instante, dados=dados))
+
+    cursor = codificar_cursor(*pagina[-1][:3]) if pagina else since
+    return PaginaAlteracoes(alteracoes=alteracoes, cursor=cursor, tem_mais=len(mescladas) > limit)
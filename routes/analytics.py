@@ -0,0 +1,139 @@
+from datetime import date, datetime, time, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from services import analytics
+from services.analytics import snapshot
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["Analytics"]
+)
+
+
+class FiltrosCompras:
+    """
+    Filtros comuns às consultas analíticas de compras.
+    """
+
+    def __init__(
+            self,
+            data_inicial: date | None = Query(None, description="Compras a partir desta data (YYYY-MM-DD)"),
+            data_final: date | None = Query(None, description="Compras até esta data, inclusive (YYYY-MM-DD)"),
+            genero: str | None = Query(None, description="Gênero do livro comprado"),
+            livro_id: int | None = Query(None, description="ID do livro comprado"),
+    ):
+        self.inicio = datetime.combine(data_inicial, time.min) if data_inicial else None
+        self.fim = datetime.combine(data_final + timedelta(days=1), time.min) if data_final else None
+        self.genero = genero
+        self.livro_id = livro_id
+
+
+async def snapshot_atualizado():
+    """
+    Dependência que garante o snapshot carregado e dentro de ANALYTICS_IDADE_MAX.
+
+    Raises:
+        HTTPException 503: Caso o NumPy (extra "analytics") não esteja instalado.
+    """
+    if analytics.np is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Analytics indisponível: instale o extra 'analytics' (numpy)")
+    await snapshot.garantir_atualizado()
+    return snapshot
+
+
+@router.get("/compras/preco", summary="Percentis do preço pago")
+async def percentis_preco(
+        percentis: str = Query("50,90,95,99", description="Percentis separados por vírgula (0 a 100)"),
+        filtros: FiltrosCompras = Depends(),
+        dados: analytics.Snapshot = Depends(snapshot_atualizado),
+):
+    """
+    Calcula percentis, média, mínimo e máximo de preco_pago sobre o snapshot colunar.
+
+    Args:
+        percentis (str): Percentis desejados (ex: "50,90,99").
+        filtros (FiltrosCompras): Período, gênero e livro.
+
+    Returns:
+        dict: Quantidade de compras e estatísticas do preço pago.
+
+    Raises:
+        HTTPException 422: Caso algum percentil seja inválido.
+    """
+    try:
+        valores = [float(p) for p in percentis.split(",")]
+    except ValueError:
+        valores = []
+    if not valores or any(not 0 <= p <= 100 for p in valores):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail="Percentis devem ser números entre 0 e 100 separados por vírgula")
+
+    mascara = dados.selecionar(filtros.inicio, filtros.fim, filtros.genero, filtros.livro_id)
+    return dados.percentis_preco(mascara, valores)
+
+
+@router.get("/compras/por-hora", summary="Histograma de compras por hora")
+async def compras_por_hora(filtros: FiltrosCompras = Depends(),
+                           dados: analytics.Snapshot = Depends(snapshot_atualizado)):
+    """
+    Distribui compras, unidades e receita pelas 24 horas do dia.
+
+    Args:
+        filtros (FiltrosCompras): Período, gênero e livro.
+
+    Returns:
+        list[dict]: Uma entrada por hora (0 a 23), inclusive as sem compras.
+    """
+    mascara = dados.selecionar(filtros.inicio, filtros.fim, filtros.genero, filtros.livro_id)
+    return dados.histograma_horas(mascara)
+
+
+@router.get("/compras/cestas", summary="Distribuição do tamanho das cestas")
+async def distribuicao_cestas(filtros: FiltrosCompras = Depends(),
+                              dados: analytics.Snapshot = Depends(snapshot_atualizado)):
+    """
+    Distribuição do tamanho das cestas, isto é, das unidades compradas por um
+    usuário num mesmo dia.
+
+    Args:
+        filtros (FiltrosCompras): Período, gênero e livro.
+
+    Returns:
+        dict: Quantidade de cestas, média, p50, p90, máximo e a contagem por tamanho.
+    """
+    mascara = dados.selecionar(filtros.inicio, filtros.fim, filtros.genero, filtros.livro_id)
+    return dados.distribuicao_cestas(mascara)
+
+
+@router.get("/snapshot", summary="Estado do snapshot analítico")
+async def estado_snapshot():
+    """
+    Informa linhas carregadas, memória por coluna e custo da última atualização.
+
+    Returns:
+        dict: Estado do snapshot (carregado=False antes da primeira consulta).
+    """
+    if analytics.np is None:
+        return {"carregado": False, "disponivel": False}
+    return snapshot.estado()
+
+
+@router.post("/snapshot/atualizar", summary="Atualizar o snapshot analítico")
+async def atualizar_snapshot(completa: bool = Query(False, description="Recarregar tudo do banco")):
+    """
+    Força a atualização do snapshot (incremental por padrão).
+
+    Args:
+        completa (bool): Recarrega as tabelas inteiras em vez de aplicar só as diferenças.
+
+    Returns:
+        dict: Estado do snapshot após a atualização.
+
+    Raises:
+        HTTPException 503: Caso o NumPy (extra "analytics") não esteja instalado.
+    """
+    if analytics.np is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Analytics indisponível: instale o extra 'analytics' (numpy)")
+    await snapshot.atualizar(completa=completa)
+    return snapshot.estado()
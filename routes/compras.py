@@ -1,11 +1,22 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Query
+import heapq
+from itertools import chain, islice
+from operator import attrgetter
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Header
+from sqlalchemy import delete, insert
 from sqlalchemy.orm import joinedload
 from sqlmodel import select, and_, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_session
-from models.livroCompras import LivrosCompras, LivrosComprasPost
-from datetime import date
+from middlewares.deadline import consulta_interrompida
+from models.livroCompras import LivrosCompras, LivrosComprasPost, SerieVendas, ComprasLoteResultado
+from models.lote import LoteIds
+from models.alteracao import Exclusao
+from datetime import date, datetime, time, timedelta
 from models.livro import Livro
+from models.usuario import Usuario
+from services import contadores, estoque, series
+from services.shards import shards
+from services.idempotencia import idempotencia, impressao, Reserva
 
 router = APIRouter(
     prefix="/compras",
@@ -13,14 +24,67 @@ router = APIRouter(
 )
 
 
+def consulta_buscar_compras(data_inicial: date | None = None, data_final: date | None = None):
+    """
+    Monta a consulta de compras dentro de um intervalo de datas.
+
+    As datas viram limites de datetime sobre a própria coluna (em vez de
+    aplicar `date()` na coluna), para a busca usar o índice de data_compra.
+    """
+    stmt = select(LivrosCompras)
+
+    filtros = []
+
+    if data_inicial:
+        filtros.append(LivrosCompras.data_compra >= datetime.combine(data_inicial, time.min))
+
+    if data_final:
+        filtros.append(LivrosCompras.data_compra < datetime.combine(data_final + timedelta(days=1), time.min))
+
+    if filtros:
+        stmt = stmt.where(and_(*filtros))
+
+    return stmt
+
+
+def _inserir(compra: LivrosCompras):
+    return insert(LivrosCompras).values(**compra.model_dump())
+
+
+def _remover(compra_id: int):
+    return delete(LivrosCompras).where(LivrosCompras.id == compra_id)
+
+
+async def _listar(session: AsyncSession, stmt) -> list:
+    return (await session.execute(stmt)).scalars().all()
+
+
+async def _verificar_usuario(session: AsyncSession, usuario_id: int) -> None:
+    # Com shards não há chave estrangeira entre compras e usuarios.
+    if await session.get(Usuario, usuario_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado")
+
+
 @router.post("/", response_model=LivrosCompras)
-async def realizar_compra(compra: LivrosComprasPost, session: AsyncSession = Depends(get_session)):
+async def realizar_compra(
+        compra: LivrosComprasPost,
+        session: AsyncSession = Depends(get_session),
+        idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255,
+                                             description="Chave que torna seguro repetir a requisição")
+):
     """
     Realiza a compra de um livro, reduzindo o estoque e registrando a compra no banco.
 
+    Com o cabeçalho Idempotency-Key, repetições da mesma requisição (por
+    exemplo, após um timeout no cliente) recebem a resposta da primeira
+    execução, com o cabeçalho Idempotent-Replayed, sem repetir a compra.
+    Repetições simultâneas esperam a execução original. Erros não são
+    guardados: após uma falha, a mesma chave pode ser usada de novo.
+
     Args:
         compra (LivrosComprasPost): Dados da compra enviados pelo usuário.
         session (AsyncSession): Sessão assíncrona com o banco de dados.
+        idempotency_key (str | None): Chave de idempotência escolhida pelo cliente.
 
     Returns:
         LivrosCompras: Registro da compra criada.
@@ -28,40 +92,94 @@ async def realizar_compra(compra: LivrosComprasPost, session: AsyncSession = Dep
     Raises:
         HTTPException 404: Caso o livro informado não exista.
         HTTPException 400: Caso o estoque seja insuficiente.
+        HTTPException 409: Caso a requisição original com a mesma chave ainda esteja em processamento.
+        HTTPException 422: Caso a chave já tenha sido usada com outro corpo.
         HTTPException 500: Qualquer erro inesperado durante a operação.
     """
+    if idempotency_key is None:
+        return await registrar_compra(compra, session)
+
+    reserva = await idempotencia.reservar("compras", idempotency_key, impressao(compra.model_dump()))
+    if reserva.concluida:
+        return reserva.repetir()
     try:
+        return await registrar_compra(compra, session, reserva)
+    finally:
+        await idempotencia.finalizar(reserva)
+
+
+async def registrar_compra(compra: LivrosComprasPost, session: AsyncSession,
+                           reserva: Reserva | None = None) -> LivrosCompras:
+    """
+    Debita o estoque e grava a compra (e a resposta da chave de idempotência, se houver)
+    numa única transação.
+
+    Com shards, a compra é gravada no shard do usuário antes do commit do banco
+    principal e removida de lá se esse commit falhar (ver `Shards.gravar`).
+    """
+    try:
+        compra_id = None
+        if shards.ativo:
+            # O ID é reservado antes de qualquer escrita na sessão (no SQLite, a
+            # reserva usa outra conexão e esperaria a trava desta transação).
+            compra_id = await shards.proximo_id()
+            await _verificar_usuario(session, compra.usuario_id)
+
         livro = await session.get(Livro, compra.livro_id)
         if not livro:
             raise HTTPException(status_code=404, detail="Livro não encontrado")
 
-        if livro.quantidade_estoque < compra.quantidade_comprados:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Estoque insuficiente. Disponível: {livro.quantidade_estoque}"
-            )
-
-        livro.quantidade_estoque -= compra.quantidade_comprados
-
         preco_pago = livro.preco_uni * compra.quantidade_comprados
 
+        if livro.estoque_fragmentado:
+            # Título quente: debita uma fatia do estoque, sem travar a linha do livro.
+            if not await estoque.debitar(session, livro.id, compra.quantidade_comprados, preco_pago):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Estoque insuficiente. Disponível: {await estoque.disponivel(session, livro.id)}"
+                )
+        else:
+            if livro.quantidade_estoque < compra.quantidade_comprados:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Estoque insuficiente. Disponível: {livro.quantidade_estoque}"
+                )
+
+            livro.quantidade_estoque -= compra.quantidade_comprados
+
         compra_bd = LivrosCompras(
+            id=compra_id,
             usuario_id=compra.usuario_id,
             livro_id=compra.livro_id,
             quantidade_comprados=compra.quantidade_comprados,
             preco_pago=preco_pago
         )
 
-        session.add(compra_bd)
-
-        await session.commit()
-        await session.refresh(compra_bd)
-        await session.refresh(livro)
+        if not shards.ativo:
+            session.add(compra_bd)
+        await contadores.registrar_venda(session, compra.livro_id, compra.usuario_id,
+                                         compra.quantidade_comprados, preco_pago,
+                                         contar_livro=not livro.estoque_fragmentado)
+        if reserva is not None:
+            await session.flush()
+            await idempotencia.concluir(session, reserva, status.HTTP_200_OK, compra_bd)
+
+        if shards.ativo:
+            await shards.gravar(session, [(shards.indice(compra.usuario_id), _inserir(compra_bd),
+                                           _remover(compra_bd.id))])
+        else:
+            await session.commit()
+            await session.refresh(compra_bd)
 
         return compra_bd
 
+    except HTTPException:
+        await session.rollback()
+        raise
     except Exception as e:
         await session.rollback()
+        if consulta_interrompida(e):
+            raise
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -71,6 +189,9 @@ async def listar_compras(offset: int = 0, limit: int = Query(default=10, le=100)
     """
     Lista todas as compras registradas.
 
+    Com shards, cada shard devolve as primeiras `offset + limit` compras por ID
+    e as listas são intercaladas; sem shards, a ordem é a do banco.
+
     Args:
         offset (int): Número de registros a pular.
         limit (int): Quantidade máxima de registros retornados.
@@ -79,6 +200,11 @@ async def listar_compras(offset: int = 0, limit: int = Query(default=10, le=100)
     Returns:
         list[LivrosCompras]: Lista de compras.
     """
+    if shards.ativo:
+        stmt = select(LivrosCompras).order_by(LivrosCompras.id).limit(offset + limit)
+        partes = await shards.espalhar(lambda shard: _listar(shard, stmt))
+        return list(islice(heapq.merge(*partes, key=attrgetter("id")), offset, offset + limit))
+
     stmt = select(LivrosCompras).offset(offset).limit(limit)
     result = await session.execute(stmt)
     return result.scalars().unique().all()
@@ -103,18 +229,10 @@ async def buscar_e_filtrar_compras(
     Returns:
         list[LivrosCompras]: Lista de compras filtradas.
     """
-    stmt = select(LivrosCompras)
-
-    filtros = []
-
-    if data_inicial:
-        filtros.append(func.date(LivrosCompras.data_compra) >= data_inicial)
-
-    if data_final:
-        filtros.append(func.date(LivrosCompras.data_compra) <= data_final)
-
-    if filtros:
-        stmt = stmt.where(and_(*filtros))
+    stmt = consulta_buscar_compras(data_inicial, data_final)
+    if shards.ativo:
+        partes = await shards.espalhar(lambda shard: _listar(shard, stmt))
+        return sorted(chain.from_iterable(partes), key=attrgetter("id"))
 
     result = await session.execute(stmt)
     return result.scalars().unique().all()
@@ -136,14 +254,69 @@ async def total_itens_comprados(session: AsyncSession = Depends(get_session)):
     """
     try:
         stmt = select(func.sum(LivrosCompras.quantidade_comprados))
-        result = await session.execute(stmt)
-        total = result.scalar_one_or_none()
+        if shards.ativo:
+            async def somar(shard: AsyncSession):
+                return (await shard.execute(stmt)).scalar_one_or_none() or 0
+            total = sum(await shards.espalhar(somar))
+        else:
+            result = await session.execute(stmt)
+            total = result.scalar_one_or_none()
         return {"total_itens_comprados": total if total is not None else 0}
     except Exception as e:
+        if consulta_interrompida(e):
+            raise
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail=f"Erro ao calcular a agregação: {str(e)}")
 
 
+@router.get("/metrics/serie", response_model=SerieVendas, summary="Série Temporal de Vendas")
+async def serie_vendas(
+        inicio: date = Query(..., description="Primeiro dia (YYYY-MM-DD)"),
+        fim: date = Query(..., description="Último dia, inclusive (YYYY-MM-DD)"),
+        bucket: series.Bucket = Query("day", description="Tamanho do período: hour, day ou week"),
+        livro_id: int | None = Query(None, description="Filtrar por livro"),
+        session: AsyncSession = Depends(get_session)
+):
+    """
+    Compras, unidades e receita por hora, dia ou semana num intervalo de datas.
+
+    O banco soma por hora lendo só os índices de cobertura; as horas são
+    somadas em dias ou semanas e os períodos sem vendas preenchidos com zero. Semanas
+    começam na segunda-feira (a primeira pode começar antes de `inicio`, mas
+    só conta as vendas a partir dele).
+
+    Args:
+        inicio (date): Primeiro dia.
+        fim (date): Último dia (inclusivo).
+        bucket (str): "hour", "day" ou "week".
+        livro_id (int | None): Livro filtrado.
+        session (AsyncSession): Sessão assíncrona com o banco.
+
+    Returns:
+        SerieVendas: Um ponto por período, em ordem cronológica.
+
+    Raises:
+        HTTPException 422: Caso o intervalo seja invertido ou gere pontos demais.
+    """
+    if fim < inicio:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail="A data final deve ser igual ou posterior à inicial")
+    if series.quantidade_pontos(inicio, fim, bucket) > series.MAX_PONTOS:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"Intervalo gera mais de {series.MAX_PONTOS} pontos; use um bucket maior")
+
+    stmt = series.consulta_serie_vendas(inicio, fim, livro_id)
+    if shards.ativo:
+        # As horas de cada shard são somadas juntas em `agregar`.
+        async def horas(shard: AsyncSession):
+            return (await shard.execute(stmt)).all()
+        result = chain.from_iterable(await shards.espalhar(horas))
+    else:
+        result = await session.execute(stmt)
+    pontos = series.agregar(result, inicio, fim, bucket)
+    return SerieVendas(bucket=bucket, inicio=inicio, fim=fim, livro_id=livro_id, pontos=pontos)
+
+
 @router.get("/{compra_id}", response_model=LivrosCompras)
 async def obter_compra(compra_id: int, session: AsyncSession = Depends(get_session)):
     """
@@ -159,17 +332,46 @@ async def obter_compra(compra_id: int, session: AsyncSession = Depends(get_sessi
     Raises:
         HTTPException 404: Caso a compra não exista.
     """
-    compra = await session.get(LivrosCompras, compra_id)
+    if shards.ativo:
+        _, compra = await shards.localizar(compra_id)
+    else:
+        compra = await session.get(LivrosCompras, compra_id)
     if not compra:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Compra não encontrada")
     return compra
 
 
+@router.post("/batch-get", response_model=ComprasLoteResultado, summary="Buscar Compras por IDs")
+async def obter_compras_em_lote(lote: LoteIds, session: AsyncSession = Depends(get_session)):
+    """
+    Obtém várias compras pelos IDs numa única consulta (com shards, uma por shard, em paralelo).
+
+    IDs repetidos aparecem uma vez só.
+
+    Args:
+        lote (LoteIds): IDs procurados (até 500).
+        session (AsyncSession): Sessão assíncrona do banco.
+
+    Returns:
+        ComprasLoteResultado: Compras na ordem dos IDs pedidos e os IDs não encontrados.
+    """
+    stmt = select(LivrosCompras).where(LivrosCompras.id.in_(lote.unicos()))
+    if shards.ativo:
+        compras = chain.from_iterable(await shards.espalhar(lambda shard: _listar(shard, stmt)))
+    else:
+        compras = await _listar(session, stmt)
+    itens, nao_encontrados = lote.ordenar({compra.id: compra for compra in compras})
+    return ComprasLoteResultado(itens=itens, nao_encontrados=nao_encontrados)
+
+
 @router.put("/{compra_id}", response_model=LivrosCompras)
 async def atualizar_compra(compra_id: int, dados: LivrosComprasPost, session: AsyncSession = Depends(get_session)):
     """
     Atualiza uma compra existente, recalculando estoque e preço pago.
 
+    Com shards, a compra é regravada no shard do novo usuário (a mesma, se o
+    usuário não mudar), mantendo o ID.
+
     Args:
         compra_id (int): ID da compra a ser atualizada.
         dados (LivrosComprasPost): Dados atualizados enviados pelo usuário.
@@ -179,14 +381,20 @@ async def atualizar_compra(compra_id: int, dados: LivrosComprasPost, session: As
         LivrosCompras: Compra atualizada.
 
     Raises:
-        HTTPException 404: Caso a compra ou livro não existam.
+        HTTPException 404: Caso a compra, o livro ou (com shards) o usuário não existam.
         HTTPException 400: Caso o estoque do novo livro seja insuficiente.
         HTTPException 500: Outros erros inesperados.
     """
-    compra = await session.get(LivrosCompras, compra_id)
+    if shards.ativo:
+        indice, compra = await shards.localizar(compra_id)
+    else:
+        compra = await session.get(LivrosCompras, compra_id)
     if not compra:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Compra não encontrada")
     try:
+        if shards.ativo:
+            await _verificar_usuario(session, dados.usuario_id)
+            anterior = LivrosCompras(**compra.model_dump())
         livro_antigo = await session.get(Livro, compra.livro_id)
         livro_novo = await session.get(Livro, dados.livro_id)
 
@@ -194,23 +402,49 @@ async def atualizar_compra(compra_id: int, dados: LivrosComprasPost, session: As
             raise HTTPException(status_code=404, detail="Livro não encontrado")
 
         if livro_antigo:
-            livro_antigo.quantidade_estoque += compra.quantidade_comprados
-
-        if livro_novo.quantidade_estoque < dados.quantidade_comprados:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Estoque insuficiente. Disponível: {livro_novo.quantidade_estoque}"
-            )
-
-        livro_novo.quantidade_estoque -= dados.quantidade_comprados
+            if livro_antigo.estoque_fragmentado:
+                await estoque.creditar(session, livro_antigo.id, compra.quantidade_comprados)
+            else:
+                livro_antigo.quantidade_estoque += compra.quantidade_comprados
+
+        preco_pago = livro_novo.preco_uni * dados.quantidade_comprados
+
+        if livro_novo.estoque_fragmentado:
+            if not await estoque.debitar(session, livro_novo.id, dados.quantidade_comprados, preco_pago):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Estoque insuficiente. Disponível: {await estoque.disponivel(session, livro_novo.id)}"
+                )
+        else:
+            if livro_novo.quantidade_estoque < dados.quantidade_comprados:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Estoque insuficiente. Disponível: {livro_novo.quantidade_estoque}"
+                )
+
+            livro_novo.quantidade_estoque -= dados.quantidade_comprados
+
+        await contadores.registrar_venda(session, compra.livro_id, compra.usuario_id,
+                                         -compra.quantidade_comprados, -compra.preco_pago, compras=-1)
 
         compra.usuario_id = dados.usuario_id
         compra.livro_id = dados.livro_id
         compra.quantidade_comprados = dados.quantidade_comprados
-        compra.preco_pago = livro_novo.preco_uni * dados.quantidade_comprados
-
-        await session.commit()
-        await session.refresh(compra)
+        compra.preco_pago = preco_pago
+
+        await contadores.registrar_venda(session, compra.livro_id, compra.usuario_id,
+                                         compra.quantidade_comprados, compra.preco_pago,
+                                         contar_livro=not livro_novo.estoque_fragmentado)
+
+        if shards.ativo:
+            compra.updated_at = datetime.now()
+            await shards.gravar(session, [
+                (indice, _remover(compra_id), _inserir(anterior)),
+                (shards.indice(compra.usuario_id), _inserir(compra), _remover(compra_id)),
+            ])
+        else:
+            await session.commit()
+            await session.refresh(compra)
 
         return compra
 
@@ -219,6 +453,8 @@ async def atualizar_compra(compra_id: int, dados: LivrosComprasPost, session: As
         raise
     except Exception as e:
         await session.rollback()
+        if consulta_interrompida(e):
+            raise
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
@@ -238,7 +474,10 @@ async def deletar_compra(compra_id: int, session: AsyncSession = Depends(get_ses
         HTTPException 404: Caso a compra não exista.
         HTTPException 500: Caso ocorra erro ao deletar.
     """
-    compra = await session.get(LivrosCompras, compra_id)
+    if shards.ativo:
+        indice, compra = await shards.localizar(compra_id)
+    else:
+        compra = await session.get(LivrosCompras, compra_id)
     if not compra:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Compra não encontrada")
 
@@ -246,13 +485,25 @@ async def deletar_compra(compra_id: int, session: AsyncSession = Depends(get_ses
         livro = await session.get(Livro, compra.livro_id)
 
         if livro:
-            livro.quantidade_estoque += compra.quantidade_comprados
+            if livro.estoque_fragmentado:
+                await estoque.creditar(session, livro.id, compra.quantidade_comprados)
+            else:
+                livro.quantidade_estoque += compra.quantidade_comprados
+
+        await contadores.registrar_venda(session, compra.livro_id, compra.usuario_id,
+                                         -compra.quantidade_comprados, -compra.preco_pago, compras=-1)
 
-        await session.delete(compra)
-        await session.commit()
+        session.add(Exclusao(entidade="compra", entidade_id=compra_id))
+        if shards.ativo:
+            await shards.gravar(session, [(indice, _remover(compra_id), _inserir(compra))])
+        else:
+            await session.delete(compra)
+            await session.commit()
 
         return {"detail": "Compra removida e estoque atualizado"}
 
     except Exception as e:
         await session.rollback()
+        if consulta_interrompida(e):
+            raise
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
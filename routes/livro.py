@@ -1,18 +1,131 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Query
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Body
 from sqlalchemy.orm import joinedload
-from sqlmodel import select, and_, or_
+from sqlmodel import select, and_, or_, true
+from sqlalchemy import case, update, delete
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_session
-from models.livro import Livro, LivroPost, LivroUpdate, LivroComCompras
+from middlewares.deadline import consulta_interrompida
+from models.livro import Livro, LivroPost, LivroUpdate, LivroRead, LivroComCompras, LivroBulkItem, LivroBulkResultado, LivroSugestao, LivroLoteResultado
+from models.catalogo import Editora, Genero
+from models.lote import LoteIds
 from models.livroCompras import LivrosCompras
+from models.alteracao import Exclusao
+from models.recomendacao import LivroRecomendacao, RecomendacaoLivro
 from models.usuario import Usuario
+from services import catalogo, estoque
+from services.autocomplete import indice
+from services.shards import shards
+from services.invalidacao import barramento
 
 router = APIRouter(
     prefix="/livros",
     tags=["Livros"]
 )
 
-@router.post("/", response_model=Livro)
+# Quantidade máxima de IDs por instrução na atualização em lote (limite de parâmetros do SQLite).
+TAMANHO_LOTE = 500
+
+# Máximo de itens por PATCH /livros/bulk (tudo vai numa única transação).
+MAX_ITENS_BULK = 5_000
+
+
+def _com_compras(stmt):
+    # Com shards as compras não estão no banco principal: as rotas as buscam
+    # nos shards depois (ver `Shards.anexar_compras`).
+    return stmt if shards.ativo else stmt.options(joinedload(Livro.compras))
+
+
+async def _anexar_compras(livros: list[Livro]) -> None:
+    await shards.anexar_compras(livros, LivrosCompras.livro_id, "compras")
+
+
+def consulta_listar_livros(offset: int = 0, limit: int = 10):
+    """
+    Monta a consulta paginada de livros com as compras carregadas.
+    """
+    return _com_compras(select(Livro).offset(offset).limit(limit))
+
+
+def consulta_obter_livro(id: int):
+    """
+    Monta a consulta de um livro pelo ID com as compras carregadas.
+    """
+    return _com_compras(select(Livro).where(Livro.id == id))
+
+
+def consulta_livros_por_ids(ids: list[int]):
+    """
+    Monta a consulta de vários livros pelos IDs (um único IN) com as compras carregadas.
+    """
+    return _com_compras(select(Livro).where(Livro.id.in_(ids)))
+
+
+def consulta_buscar_livros(
+    busca: str | None = None,
+    genero_id: int | None = None,
+    editora_id: int | None = None,
+    admin_id: int | None = None,
+    preco_min: float | None = None,
+    preco_max: float | None = None,
+    paginas_min: int | None = None,
+    paginas_max: int | None = None,
+    em_estoque: bool | None = None,
+    ordernar_por: str = "id",
+    ordem: str = "asc",
+):
+    """
+    Monta a consulta de busca de livros com filtros e ordenação.
+
+    Os parâmetros são os mesmos de `buscar_e_filtrar_livros`, com gênero e
+    editora já traduzidos para os IDs (ver services.catalogo).
+    """
+    stmt = _com_compras(select(Livro))
+
+    if busca:
+        stmt = stmt.where(
+            or_(
+                Livro.titulo.ilike(f"%{busca}%"),
+                Livro.autor.ilike(f"%{busca}%")
+            )
+        )
+
+    filtros = []
+    if genero_id is not None:
+        filtros.append(Livro.genero_id == genero_id)
+    if editora_id is not None:
+        filtros.append(Livro.editora_id == editora_id)
+    if admin_id is not None:
+        filtros.append(Livro.admin_id == admin_id)
+    if preco_min is not None:
+        filtros.append(Livro.preco_uni >= preco_min)
+    if preco_max is not None:
+        filtros.append(Livro.preco_uni <= preco_max)
+    if paginas_min is not None:
+        filtros.append(Livro.quantidade_paginas >= paginas_min)
+    if paginas_max is not None:
+        filtros.append(Livro.quantidade_paginas <= paginas_max)
+    # Livros com estoque fragmentado passam pelo filtro e são conferidos depois
+    # de somar as fatias (ver `buscar_e_filtrar_livros`).
+    if em_estoque is True:
+        filtros.append(or_(Livro.quantidade_estoque > 0, Livro.estoque_fragmentado == true()))
+    elif em_estoque is False:
+        filtros.append(or_(Livro.quantidade_estoque <= 0, Livro.estoque_fragmentado == true()))
+
+    if filtros:
+        stmt = stmt.where(and_(*filtros))
+
+    if ordernar_por in ["id", "titulo", "autor", "quantidade_paginas", "preco_uni", "total_vendido", "receita_total"]:
+        coluna = getattr(Livro, ordernar_por)
+        if ordem.lower() == "desc":
+            stmt = stmt.order_by(coluna.desc())
+        else:
+            stmt = stmt.order_by(coluna.asc())
+
+    return stmt
+
+
+@router.post("/", response_model=LivroRead)
 async def criar_livro(livro: LivroPost, session: AsyncSession = Depends(get_session)):
     """
     Cria um novo livro no banco de dados.
@@ -22,19 +135,23 @@ async def criar_livro(livro: LivroPost, session: AsyncSession = Depends(get_sess
         session (AsyncSession): Sessão assíncrona de banco de dados.
 
     Returns:
-        Livro: Registro do livro criado.
+        LivroRead: Registro do livro criado.
 
     Raises:
         HTTPException 500: Caso ocorra erro ao salvar no banco.
     """
-    db_livro = Livro.model_validate(livro)
     try:
+        db_livro = Livro.model_validate(await catalogo.colunas(session, livro.model_dump()))
         session.add(db_livro)
+        await session.flush()
+        await barramento.publicar(session, "livro", [db_livro.id])
         await session.commit()
         await session.refresh(db_livro)
         return db_livro
     except Exception as e:
         await session.rollback()
+        if consulta_interrompida(e):
+            raise
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 @router.get("/", response_model=list[LivroComCompras])
@@ -50,10 +167,12 @@ async def listar_livros(offset: int = 0, limit: int = Query(default=10, le=100),
     Returns:
         list[LivroComCompras]: Lista paginada de livros.
     """
-    stmt = (select(Livro).offset(offset).limit(limit)
-            .options(joinedload(Livro.compras)))
+    stmt = consulta_listar_livros(offset, limit)
     result = await session.execute(stmt)
-    return result.scalars().unique().all()
+    livros = result.scalars().unique().all()
+    await estoque.aplicar(session, livros)
+    await _anexar_compras(livros)
+    return livros
 
 
 @router.get("/search", response_model=list[LivroComCompras], summary="Buscar, Filtrar e Ordenar Livros")
@@ -63,7 +182,12 @@ async def buscar_e_filtrar_livros(
     genero: str | None = Query(None, description="Filtrar por Gênero"),
     editora: str | None = Query(None, description="Filtrar por Editora"),
     admin_id: int | None = Query(None, description="Filtrar por ID do Admin criador"),
-    ordernar_por: str = Query("id", description="Campo para ordenação (ex: id, titulo, preco_uni)"),
+    preco_min: float | None = Query(None, ge=0, description="Preço unitário mínimo"),
+    preco_max: float | None = Query(None, ge=0, description="Preço unitário máximo"),
+    paginas_min: int | None = Query(None, ge=0, description="Quantidade mínima de páginas"),
+    paginas_max: int | None = Query(None, ge=0, description="Quantidade máxima de páginas"),
+    em_estoque: bool | None = Query(None, description="Somente livros com (true) ou sem (false) estoque"),
+    ordernar_por: str = Query("id", description="Campo para ordenação (ex: id, titulo, preco_uni, total_vendido, receita_total)"),
     ordem: str = Query("asc", description="Direção da ordenação (asc ou desc)")
 ):
     """
@@ -75,42 +199,57 @@ async def buscar_e_filtrar_livros(
         genero (str | None): Filtro por gênero.
         editora (str | None): Filtro por editora.
         admin_id (int | None): Filtro pelo admin criador.
+        preco_min (float | None): Preço unitário mínimo.
+        preco_max (float | None): Preço unitário máximo.
+        paginas_min (int | None): Quantidade mínima de páginas.
+        paginas_max (int | None): Quantidade máxima de páginas.
+        em_estoque (bool | None): Filtra livros com ou sem estoque.
         ordernar_por (str): Campo de ordenação.
         ordem (str): Direção da ordenação ("asc" ou "desc").
 
     Returns:
         list[LivroComCompras]: Lista filtrada e ordenada de livros.
     """
-    stmt = select(Livro).options(joinedload(Livro.compras))
-
-    if busca:
-        stmt = stmt.where(
-            or_(
-                Livro.titulo.ilike(f"%{busca}%"),
-                Livro.autor.ilike(f"%{busca}%")
-            )
-        )
+    genero_id = await catalogo.buscar_id(session, Genero, genero) if genero else None
+    editora_id = await catalogo.buscar_id(session, Editora, editora) if editora else None
+    if (genero and genero_id is None) or (editora and editora_id is None):
+        # Nome não cadastrado: nenhum livro tem.
+        return []
+
+    stmt = consulta_buscar_livros(
+        busca=busca, genero_id=genero_id, editora_id=editora_id, admin_id=admin_id,
+        preco_min=preco_min, preco_max=preco_max,
+        paginas_min=paginas_min, paginas_max=paginas_max, em_estoque=em_estoque,
+        ordernar_por=ordernar_por, ordem=ordem,
+    )
 
-    filtros = []
-    if genero:
-        filtros.append(Livro.genero == genero)
-    if editora:
-        filtros.append(Livro.editora == editora)
-    if admin_id is not None:
-        filtros.append(Livro.admin_id == admin_id)
+    result = await session.execute(stmt)
+    livros = result.scalars().unique().all()
+    await estoque.aplicar(session, livros)
+    await _anexar_compras(livros)
+    if em_estoque is not None:
+        livros = [livro for livro in livros if (livro.quantidade_estoque > 0) == em_estoque]
+    return livros
+
+@router.get("/autocomplete", response_model=list[LivroSugestao])
+async def autocomplete_livros(
+    q: str = Query(..., min_length=1, description="Texto digitado (início de uma palavra do título ou do autor)"),
+    limit: int = Query(default=10, ge=1, le=50),
+):
+    """
+    Sugere livros pelo início de palavras do título ou do autor.
 
-    if filtros:
-        stmt = stmt.where(and_(*filtros))
+    Responde a partir de um índice em memória (sem acentos e sem diferenciar
+    maiúsculas), sem consultar o banco.
 
-    if ordernar_por in ["id", "titulo", "autor", "quantidade_paginas", "preco_uni"]:
-        coluna = getattr(Livro, ordernar_por)
-        if ordem.lower() == "desc":
-            stmt = stmt.order_by(coluna.desc())
-        else:
-            stmt = stmt.order_by(coluna.asc())
+    Args:
+        q (str): Texto digitado.
+        limit (int): Quantidade máxima de sugestões.
 
-    result = await session.execute(stmt)
-    return result.scalars().unique().all()
+    Returns:
+        list[LivroSugestao]: Livros sugeridos.
+    """
+    return indice.sugerir(q, limit)
 
 @router.get("/{id}", response_model=LivroComCompras)
 async def obter_livro(id: int, session: AsyncSession = Depends(get_session)):
@@ -127,14 +266,183 @@ async def obter_livro(id: int, session: AsyncSession = Depends(get_session)):
     Raises:
         HTTPException 404: Caso o livro não exista.
     """
-    stmt = select(Livro).where(Livro.id == id).options(joinedload(Livro.compras))
+    stmt = consulta_obter_livro(id)
     result = await session.execute(stmt)
     livro = result.scalars().first()
     if not livro:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Livro não encontrado")
+    await estoque.aplicar(session, [livro])
+    await _anexar_compras([livro])
     return livro
 
-@router.put("/{id}", response_model=Livro)
+
+@router.post("/batch-get", response_model=LivroLoteResultado, summary="Buscar Livros por IDs")
+async def obter_livros_em_lote(lote: LoteIds, session: AsyncSession = Depends(get_session)):
+    """
+    Obtém vários livros pelos IDs numa única consulta.
+
+    Substitui várias chamadas a GET /livros/{id} (ex.: montar um carrinho).
+    IDs repetidos aparecem uma vez só.
+
+    Args:
+        lote (LoteIds): IDs procurados (até 500).
+        session (AsyncSession): Sessão assíncrona do banco.
+
+    Returns:
+        LivroLoteResultado: Livros na ordem dos IDs pedidos e os IDs não encontrados.
+    """
+    result = await session.execute(consulta_livros_por_ids(lote.unicos()))
+    livros = result.scalars().unique().all()
+    await estoque.aplicar(session, livros)
+    await _anexar_compras(livros)
+    itens, nao_encontrados = lote.ordenar({livro.id: livro for livro in livros})
+    return LivroLoteResultado(itens=itens, nao_encontrados=nao_encontrados)
+
+def agrupar_atualizacoes(itens: list[tuple[int, dict]]) -> dict[tuple[str, ...], dict[int, dict]]:
+    """
+    Agrupa os itens da atualização em lote pelo conjunto de colunas alteradas.
+
+    Itens repetidos para o mesmo livro são combinados (o último valor prevalece).
+
+    Args:
+        itens (list[tuple[int, dict]]): ID do livro e colunas alteradas de cada
+            item recebido (gênero e editora já como IDs, ver services.catalogo).
+
+    Returns:
+        dict: {campos: {id: valores}} — cada grupo vira uma instrução UPDATE.
+    """
+    por_livro: dict[int, dict] = {}
+    for livro_id, valores in itens:
+        por_livro.setdefault(livro_id, {}).update(valores)
+
+    grupos: dict[tuple[str, ...], dict[int, dict]] = {}
+    for livro_id, valores in por_livro.items():
+        if valores:
+            grupos.setdefault(tuple(sorted(valores)), {})[livro_id] = valores
+    return grupos
+
+
+def consulta_atualizar_em_lote(campos: tuple[str, ...], valores: dict[int, dict]):
+    """
+    Monta um UPDATE único para vários livros, com um CASE por coluna.
+
+    Args:
+        campos (tuple[str, ...]): Campos alterados em todos os livros do grupo.
+        valores (dict[int, dict]): Novos valores por ID do livro.
+
+    Returns:
+        Update: Instrução de atualização.
+    """
+    return (
+        update(Livro)
+        .where(Livro.id.in_(list(valores)))
+        .values({
+            campo: case({livro_id: v[campo] for livro_id, v in valores.items()}, value=Livro.id)
+            for campo in campos
+        })
+        .execution_options(synchronize_session=False)
+    )
+
+
+@router.patch("/bulk", response_model=LivroBulkResultado)
+async def livro_update_em_lote(
+    itens: list[LivroBulkItem] = Body(max_length=MAX_ITENS_BULK),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Atualiza parcialmente vários livros em uma única transação.
+
+    Os itens são agrupados pelo conjunto de campos informados e cada grupo é
+    aplicado com poucas instruções UPDATE, em vez de uma leitura e escrita por livro.
+    IDs inexistentes são informados na resposta sem interromper o lote.
+
+    Args:
+        itens (list[LivroBulkItem]): Lista de {id, ...campos de LivroUpdate}
+            (até MAX_ITENS_BULK; acima disso a resposta é 422).
+        session (AsyncSession): Sessão assíncrona do banco.
+
+    Returns:
+        LivroBulkResultado: IDs atualizados e IDs não encontrados.
+
+    Raises:
+        HTTPException 500: Caso ocorra erro na atualização (nenhum livro é alterado).
+    """
+    ids = list(dict.fromkeys(item.id for item in itens))
+    existentes: set[int] = set()
+    fragmentados: set[int] = set()
+    for i in range(0, len(ids), TAMANHO_LOTE):
+        result = await session.execute(
+            select(Livro.id, Livro.estoque_fragmentado).where(Livro.id.in_(ids[i:i + TAMANHO_LOTE]))
+        )
+        for livro_id, fragmentado in result:
+            existentes.add(livro_id)
+            if fragmentado:
+                fragmentados.add(livro_id)
+
+    try:
+        grupos = agrupar_atualizacoes([
+            (item.id, await catalogo.colunas(session, item.model_dump(exclude_unset=True, exclude={"id"})))
+            for item in itens if item.id in existentes
+        ])
+        for campos, valores in grupos.items():
+            lote = list(valores.items())
+            for i in range(0, len(lote), TAMANHO_LOTE):
+                await session.execute(consulta_atualizar_em_lote(campos, dict(lote[i:i + TAMANHO_LOTE])))
+            # Novo estoque de livro fragmentado é redistribuído entre as fatias.
+            if "quantidade_estoque" in campos:
+                for livro_id in fragmentados.intersection(valores):
+                    await estoque.definir(session, livro_id, valores[livro_id]["quantidade_estoque"])
+        await barramento.publicar(session, "livro", existentes)
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        if consulta_interrompida(e):
+            raise
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+    return LivroBulkResultado(
+        atualizados=[livro_id for livro_id in ids if livro_id in existentes],
+        nao_encontrados=[livro_id for livro_id in ids if livro_id not in existentes],
+    )
+
+
+@router.get("/{id}/recomendacoes", response_model=list[RecomendacaoLivro])
+async def recomendacoes_livro(
+    id: int,
+    limit: int = Query(default=10, ge=1, le=50),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Livros mais comprados por quem comprou este livro.
+
+    As recomendações são pré-calculadas por `scripts.recomendacoes`; a rota
+    só lê as linhas do livro pela chave primária.
+
+    Args:
+        id (int): ID do livro.
+        limit (int): Quantidade máxima de recomendações.
+        session (AsyncSession): Sessão assíncrona do banco.
+
+    Returns:
+        list[RecomendacaoLivro]: Livros recomendados, do mais forte para o mais fraco.
+
+    Raises:
+        HTTPException 404: Caso o livro não exista.
+    """
+    result = await session.execute(
+        select(Livro.id, Livro.titulo, Livro.autor, LivroRecomendacao.pontuacao)
+        .join(LivroRecomendacao, LivroRecomendacao.recomendado_id == Livro.id)
+        .where(LivroRecomendacao.livro_id == id)
+        .order_by(LivroRecomendacao.posicao)
+        .limit(limit)
+    )
+    recomendacoes = [RecomendacaoLivro(**linha._mapping) for linha in result]
+    if not recomendacoes and await session.get(Livro, id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Livro não encontrado")
+    return recomendacoes
+
+
+@router.put("/{id}", response_model=LivroRead)
 async def livro_update(
     id: int,
     livro: LivroUpdate,
@@ -149,7 +457,7 @@ async def livro_update(
         session (AsyncSession): Sessão assíncrona do banco.
 
     Returns:
-        Livro: Livro atualizado.
+        LivroRead: Livro atualizado.
 
     Raises:
         HTTPException 404: Caso o livro não exista.
@@ -160,22 +468,95 @@ async def livro_update(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Livro não encontrado")
 
     update_data = livro.model_dump(exclude_unset=True) if hasattr(livro, "model_dump") else livro.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_livro, key, value)
+    novo_estoque = update_data.pop("quantidade_estoque", None) if db_livro.estoque_fragmentado else None
 
     try:
+        for key, value in (await catalogo.colunas(session, update_data)).items():
+            setattr(db_livro, key, value)
+        if novo_estoque is not None:
+            await session.flush()
+            await estoque.definir(session, id, novo_estoque)
+        await barramento.publicar(session, "livro", [id])
         await session.commit()
         await session.refresh(db_livro)
+        await estoque.aplicar(session, [db_livro])
         return db_livro
     except Exception as e:
         await session.rollback()
+        if consulta_interrompida(e):
+            raise
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
+@router.post("/{id}/estoque/fragmentar", response_model=LivroRead)
+async def fragmentar_estoque(
+    id: int,
+    slots: int = Query(estoque.SLOTS_PADRAO, ge=2, le=64, description="Quantidade de fatias do estoque"),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Divide o estoque de um livro em fatias (modo para títulos muito vendidos).
+
+    Cada compra debita uma fatia aleatória, então compras simultâneas do mesmo
+    livro não disputam a mesma linha. Chamar de novo altera a quantidade de fatias.
+
+    Args:
+        id (int): ID do livro.
+        slots (int): Quantidade de fatias.
+        session (AsyncSession): Sessão assíncrona do banco.
+
+    Returns:
+        LivroRead: Livro com o estoque total.
+
+    Raises:
+        HTTPException 404: Caso o livro não exista.
+    """
+    db_livro = await session.get(Livro, id)
+    if not db_livro:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Livro não encontrado")
+
+    await estoque.fragmentar(session, id, slots)
+    await barramento.publicar(session, "livro", [id])
+    await session.commit()
+    await session.refresh(db_livro)
+    await estoque.aplicar(session, [db_livro])
+    return db_livro
+
+
+@router.delete("/{id}/estoque/fragmentar", response_model=LivroRead)
+async def desfragmentar_estoque(id: int, session: AsyncSession = Depends(get_session)):
+    """
+    Junta as fatias de estoque de volta no próprio livro.
+
+    Args:
+        id (int): ID do livro.
+        session (AsyncSession): Sessão assíncrona do banco.
+
+    Returns:
+        LivroRead: Livro com o estoque consolidado.
+
+    Raises:
+        HTTPException 404: Caso o livro não exista.
+    """
+    db_livro = await session.get(Livro, id)
+    if not db_livro:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Livro não encontrado")
+
+    await estoque.desfragmentar(session, id)
+    await barramento.publicar(session, "livro", [id])
+    await session.commit()
+    await session.refresh(db_livro)
+    return db_livro
+
+
 @router.delete("/{id}")
 async def deletar_livro(id: int, session: AsyncSession = Depends(get_session)):
     """
     Remove um livro do banco de dados.
 
+    A remoção é uma única instrução DELETE; livros com compras registradas são
+    protegidos pelo banco (ON DELETE RESTRICT). Com shards, em que não há essa
+    chave estrangeira, as compras do livro são procuradas antes em todos os shards.
+
     Args:
         id (int): ID do livro a ser removido.
         session (AsyncSession): Sessão assíncrona do banco.
@@ -185,16 +566,33 @@ async def deletar_livro(id: int, session: AsyncSession = Depends(get_session)):
 
     Raises:
         HTTPException 404: Caso o livro não exista.
+        HTTPException 409: Caso o livro possua compras registradas.
         HTTPException 500: Caso ocorra erro ao deletar.
     """
-    db_livro = await session.get(Livro, id)
-    if not db_livro:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Livro não encontrado")
-
+    if shards.ativo:
+        stmt = select(LivrosCompras.id).where(LivrosCompras.livro_id == id).limit(1)
+        if any(await shards.espalhar(lambda shard: shard.scalar(stmt))):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                detail="Livro possui compras registradas e não pode ser removido")
     try:
-        await session.delete(db_livro)
-        await session.commit()
-        return {"detail": "Livro removido"}
+        result = await session.execute(delete(Livro).where(Livro.id == id))
+        removido = result.rowcount > 0
+        if removido:
+            session.add(Exclusao(entidade="livro", entidade_id=id))
+            await barramento.publicar(session, "livro", [id])
+            await session.commit()
+        else:
+            await session.rollback()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail="Livro possui compras registradas e não pode ser removido")
     except Exception as e:
         await session.rollback()
+        if consulta_interrompida(e):
+            raise
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+    if not removido:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Livro não encontrado")
+    return {"detail": "Livro removido"}
@@ -0,0 +1,86 @@
+from fastapi import APIRouter, HTTPException, status
+from models.relatorio import RelatorioPost, RelatorioStatus
+from services.relatorios import gerenciador, FilaCheia, Job
+
+router = APIRouter(
+    prefix="/relatorios",
+    tags=["Relatórios"]
+)
+
+
+def _status(job: Job) -> RelatorioStatus:
+    return RelatorioStatus(
+        id=job.id, tipo=job.tipo, parametros=job.parametros, status=job.status,
+        criado_em=job.criado_em, iniciado_em=job.iniciado_em, concluido_em=job.concluido_em,
+        expira_em=job.expira_em, resultado=job.resultado, erro=job.erro,
+    )
+
+
+@router.post("/", response_model=RelatorioStatus, status_code=status.HTTP_202_ACCEPTED)
+async def solicitar_relatorio(relatorio: RelatorioPost):
+    """
+    Enfileira a geração de um relatório.
+
+    O relatório é calculado em segundo plano; acompanhe por GET /relatorios/{id}.
+
+    Args:
+        relatorio (RelatorioPost): Tipo e parâmetros do relatório.
+
+    Returns:
+        RelatorioStatus: Relatório criado, com status "pendente".
+
+    Raises:
+        HTTPException 422: Caso falte o ano para "receita_anual".
+        HTTPException 503: Caso a fila de relatórios esteja cheia.
+    """
+    if relatorio.tipo == "receita_anual" and relatorio.ano is None:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail="Informe o ano para o relatório de receita anual")
+
+    parametros = {"ano": relatorio.ano} if relatorio.ano is not None else {}
+    try:
+        job = gerenciador.enfileirar(relatorio.tipo, parametros)
+    except FilaCheia:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Fila de relatórios cheia", headers={"Retry-After": "5"})
+    return _status(job)
+
+
+@router.get("/{relatorio_id}", response_model=RelatorioStatus)
+async def obter_relatorio(relatorio_id: str):
+    """
+    Obtém a situação (e o resultado, quando pronto) de um relatório.
+
+    Args:
+        relatorio_id (str): ID do relatório.
+
+    Returns:
+        RelatorioStatus: Situação do relatório.
+
+    Raises:
+        HTTPException 404: Caso o relatório não exista ou tenha expirado.
+    """
+    job = gerenciador.obter(relatorio_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Relatório não encontrado")
+    return _status(job)
+
+
+@router.delete("/{relatorio_id}", response_model=RelatorioStatus)
+async def cancelar_relatorio(relatorio_id: str):
+    """
+    Cancela um relatório pendente ou em execução.
+
+    Args:
+        relatorio_id (str): ID do relatório.
+
+    Returns:
+        RelatorioStatus: Situação do relatório após o pedido de cancelamento.
+
+    Raises:
+        HTTPException 404: Caso o relatório não exista ou tenha expirado.
+    """
+    job = gerenciador.cancelar(relatorio_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Relatório não encontrado")
+    return _status(job)
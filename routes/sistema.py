@@ -0,0 +1,61 @@
+from fastapi import APIRouter, HTTPException, status
+import database
+from metrics import metricas
+from middlewares.admission import limitadores
+from models.sistema import AdmissaoUpdate
+from services.shards import shards
+
+router = APIRouter(
+    prefix="/sistema",
+    tags=["Sistema"]
+)
+
+
+@router.get("/metricas", summary="Métricas do processo")
+async def obter_metricas():
+    """
+    Retorna as métricas em memória do processo (contadores e filas).
+
+    Returns:
+        dict: Métricas registradas.
+    """
+    return metricas.snapshot()
+
+
+@router.get("/prontidao", summary="Verificação de prontidão")
+async def verificar_prontidao():
+    """
+    Indica se a aplicação terminou o aquecimento e os bancos (principal e shards) respondem.
+
+    Returns:
+        dict: Estado de prontidão.
+
+    Raises:
+        HTTPException 503: Enquanto a aplicação não estiver pronta.
+    """
+    if not database.pronto or not await database.verificar_prontidao() or not await shards.verificar():
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Aplicação não está pronta")
+    return {"pronto": True}
+
+
+@router.put("/admissao/{classe}", summary="Configurar controle de admissão")
+async def configurar_admissao(classe: str, dados: AdmissaoUpdate):
+    """
+    Altera em tempo de execução os limites de uma classe de rota.
+
+    Args:
+        classe (str): Classe de rota (compras, busca ou leitura).
+        dados (AdmissaoUpdate): Novos parâmetros do limitador.
+
+    Returns:
+        dict: Estado atualizado do limitador.
+
+    Raises:
+        HTTPException 404: Caso a classe não exista.
+    """
+    limitador = limitadores.get(classe)
+    if limitador is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Classe de rota não encontrada")
+
+    limitador.configurar(**dados.model_dump(exclude_unset=True))
+    return limitador.estado()
@@ -1,15 +1,74 @@
+from datetime import datetime
 from fastapi import APIRouter, HTTPException, Depends, status, Query
 from sqlalchemy.orm import joinedload
 from sqlmodel import select
+from sqlalchemy import delete, insert, literal, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_session
-from models.usuario import Usuario, UsuarioBase, UsuarioPost, UsuarioComCompras
+from middlewares.deadline import consulta_interrompida
+from models.usuario import Usuario, UsuarioBase, UsuarioPost, UsuarioComCompras, UsuarioLoteResultado
+from models.lote import LoteIds
+from models.livroCompras import LivrosCompras
+from models.alteracao import Exclusao
+from services import contadores
+from services.shards import shards
+from services.busca_texto import contem
 
 router = APIRouter(
     prefix="/usuarios",
     tags=["Usuarios"]
 )
 
+
+def _com_compras(stmt):
+    # Com shards as compras não estão no banco principal: as rotas as buscam
+    # nos shards depois (ver `Shards.anexar_compras`).
+    return stmt if shards.ativo else stmt.options(joinedload(Usuario.livros_comprados))
+
+
+async def _anexar_compras(usuarios: list[Usuario]) -> None:
+    await shards.anexar_compras(usuarios, LivrosCompras.usuario_id, "livros_comprados")
+
+
+def consulta_obter_usuario(usuario_id: int):
+    """
+    Monta a consulta de um usuário pelo ID com as compras carregadas.
+    """
+    return _com_compras(select(Usuario).where(Usuario.id == usuario_id))
+
+
+def consulta_usuarios_por_ids(ids: list[int]):
+    """
+    Monta a consulta de vários usuários pelos IDs (um único IN) com as compras carregadas.
+    """
+    return _com_compras(select(Usuario).where(Usuario.id.in_(ids)))
+
+
+def consulta_usuario_por_email(email: str):
+    """
+    Monta a consulta de um usuário pelo e-mail exato, sem diferenciar maiúsculas.
+
+    A comparação é feita sobre lower(email), a mesma expressão do índice único.
+    """
+    return _com_compras(select(Usuario).where(func.lower(Usuario.email) == func.lower(email)))
+
+
+def consulta_buscar_usuarios(nome: str | None = None, ordernar_por: str = "id", ordem: str = "asc"):
+    """
+    Monta a consulta de busca de usuários por nome parcial (índice de trigramas).
+    """
+    stmt = _com_compras(select(Usuario))
+
+    if nome:
+        stmt = stmt.where(contem(Usuario.nome, nome))
+
+    if ordernar_por in ["id", "nome", "email", "endereco", "total_compras", "total_gasto"]:
+        coluna = getattr(Usuario, ordernar_por)
+        stmt = stmt.order_by(coluna.desc() if ordem.lower() == "desc" else coluna.asc())
+    return stmt
+
+
 @router.post("/", response_model=Usuario)
 async def criar_usuario(usuario: UsuarioPost, session: AsyncSession = Depends(get_session)):
     """
@@ -23,6 +82,7 @@ async def criar_usuario(usuario: UsuarioPost, session: AsyncSession = Depends(ge
         Usuario: Usuário recém-criado.
 
     Raises:
+        HTTPException 409: Caso o e-mail já esteja cadastrado.
         HTTPException 500: Caso ocorra um erro ao salvar no banco.
     """
     db_user = Usuario.model_validate(usuario)
@@ -31,8 +91,16 @@ async def criar_usuario(usuario: UsuarioPost, session: AsyncSession = Depends(ge
         await session.commit()
         await session.refresh(db_user)
         return db_user
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="E-mail já cadastrado"
+        )
     except Exception as e:
         await session.rollback()
+        if consulta_interrompida(e):
+            raise
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
@@ -52,21 +120,18 @@ async def listar_usuarios(offset: int = 0, limit: int = Query(default=10, le=100
     Returns:
         list[UsuarioComCompras]: Lista de usuários com compras relacionadas.
     """
-    stmt = (
-        select(Usuario)
-        .offset(offset)
-        .limit(limit)
-        .options(joinedload(Usuario.livros_comprados))
-    )
+    stmt = _com_compras(select(Usuario).offset(offset).limit(limit))
     result = await session.execute(stmt)
-    return result.scalars().unique().all()
+    usuarios = result.scalars().unique().all()
+    await _anexar_compras(usuarios)
+    return usuarios
 
 
 @router.get("/search", response_model=list[UsuarioComCompras], summary="Filtrar e Ordenar Usuários")
 async def buscar_e_filtrar_usuarios(
     session: AsyncSession = Depends(get_session),
     nome: str | None = Query(None, description="Filtrar por nome parcial"),
-    ordernar_por: str = Query("id", description="Campo para ordenação (ex: id, nome, email)"),
+    ordernar_por: str = Query("id", description="Campo para ordenação (ex: id, nome, email, total_compras, total_gasto)"),
     ordem: str = Query("asc", description="Direção da ordenação (asc ou desc)")
 ):
     """
@@ -74,24 +139,49 @@ async def buscar_e_filtrar_usuarios(
 
     Args:
         session (AsyncSession): Sessão do banco de dados.
-        nome (str | None): Filtro por nome parcial.
+        nome (str | None): Filtro por nome parcial (com 3 caracteres ou mais usa o índice de trigramas).
         ordernar_por (str): Campo usado na ordenação.
         ordem (str): Direção da ordenação (asc/desc).
 
     Returns:
         list[UsuarioComCompras]: Usuários filtrados e ordenados.
     """
-    stmt = select(Usuario).options(joinedload(Usuario.livros_comprados))
+    stmt = consulta_buscar_usuarios(nome, ordernar_por, ordem)
+    result = await session.execute(stmt)
+    usuarios = result.scalars().unique().all()
+    await _anexar_compras(usuarios)
+    return usuarios
 
-    if nome:
-        stmt = stmt.where(Usuario.nome.ilike(f"%{nome}%"))
 
-    if ordernar_por in ["id", "nome", "email", "endereco"]:
-        coluna = getattr(Usuario, ordernar_por)
-        stmt = stmt.order_by(coluna.desc() if ordem.lower() == "desc" else coluna.asc())
+@router.get("/por-email", response_model=UsuarioComCompras, summary="Buscar Usuário por E-mail")
+async def obter_usuario_por_email(
+    email: str = Query(..., description="E-mail exato (sem diferenciar maiúsculas)"),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Obter um usuário pelo e-mail, usando o índice único sobre lower(email).
 
-    result = await session.execute(stmt)
-    return result.scalars().unique().all()
+    Args:
+        email (str): E-mail do usuário.
+        session (AsyncSession): Sessão do banco de dados.
+
+    Returns:
+        UsuarioComCompras: Dados do usuário encontrado.
+
+    Raises:
+        HTTPException 404: Se nenhum usuário tiver o e-mail.
+    """
+    result = await session.execute(consulta_usuario_por_email(email))
+    usuario = result.scalars().first()
+
+    if not usuario:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuario não encontrado"
+        )
+
+    await _anexar_compras([usuario])
+    return usuario
 
 
 @router.get("/{usuario_id}", response_model=UsuarioComCompras)
@@ -109,11 +199,7 @@ async def obter_usuario(usuario_id: int, session: AsyncSession = Depends(get_ses
     Raises:
         HTTPException 404: Se o usuário não existir.
     """
-    stmt = (
-        select(Usuario)
-        .where(Usuario.id == usuario_id)
-        .options(joinedload(Usuario.livros_comprados))
-    )
+    stmt = consulta_obter_usuario(usuario_id)
     result = await session.execute(stmt)
     usuario = result.scalars().first()
 
@@ -123,9 +209,31 @@ async def obter_usuario(usuario_id: int, session: AsyncSession = Depends(get_ses
             detail="Usuario não encontrado"
         )
 
+    await _anexar_compras([usuario])
     return usuario
 
 
+@router.post("/batch-get", response_model=UsuarioLoteResultado, summary="Buscar Usuários por IDs")
+async def obter_usuarios_em_lote(lote: LoteIds, session: AsyncSession = Depends(get_session)):
+    """
+    Obtém vários usuários pelos IDs numa única consulta.
+
+    IDs repetidos aparecem uma vez só.
+
+    Args:
+        lote (LoteIds): IDs procurados (até 500).
+        session (AsyncSession): Sessão do banco de dados.
+
+    Returns:
+        UsuarioLoteResultado: Usuários na ordem dos IDs pedidos e os IDs não encontrados.
+    """
+    result = await session.execute(consulta_usuarios_por_ids(lote.unicos()))
+    usuarios = result.scalars().unique().all()
+    await _anexar_compras(usuarios)
+    itens, nao_encontrados = lote.ordenar({usuario.id: usuario for usuario in usuarios})
+    return UsuarioLoteResultado(itens=itens, nao_encontrados=nao_encontrados)
+
+
 @router.put("/{usuario_id}", response_model=Usuario)
 async def atualizar_usuario(usuario_id: int, dados: UsuarioBase, session: AsyncSession = Depends(get_session)):
     """
@@ -141,6 +249,7 @@ async def atualizar_usuario(usuario_id: int, dados: UsuarioBase, session: AsyncS
 
     Raises:
         HTTPException 404: Caso o usuário não exista.
+        HTTPException 409: Caso o novo e-mail já pertença a outro usuário.
         HTTPException 500: Caso ocorra erro ao atualizar.
     """
     usuario = await session.get(Usuario, usuario_id)
@@ -160,19 +269,36 @@ async def atualizar_usuario(usuario_id: int, dados: UsuarioBase, session: AsyncS
         await session.commit()
         await session.refresh(usuario)
         return usuario
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="E-mail já cadastrado"
+        )
     except Exception as e:
         await session.rollback()
+        if consulta_interrompida(e):
+            raise
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
 
 
+async def _listar_compras(session: AsyncSession, stmt) -> list[LivrosCompras]:
+    return (await session.execute(stmt)).scalars().all()
+
+
 @router.delete("/{usuario_id}")
 async def deletar_usuario(usuario_id: int, session: AsyncSession = Depends(get_session)):
     """
     Deletar um usuário específico.
 
+    As compras do usuário são removidas pelo banco (ON DELETE CASCADE), sem
+    carregá-las; antes disso, as vendas são descontadas dos contadores dos
+    livros e as exclusões são registradas para o feed de alterações. Com
+    shards, as compras são carregadas de todos os shards e removidas de cada um.
+
     Args:
         usuario_id (int): ID do usuário.
         session (AsyncSession): Sessão do banco de dados.
@@ -184,21 +310,47 @@ async def deletar_usuario(usuario_id: int, session: AsyncSession = Depends(get_s
         HTTPException 404: Caso o usuário não exista.
         HTTPException 500: Caso ocorra erro ao remover.
     """
-    usuario = await session.get(Usuario, usuario_id)
-
-    if not usuario:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Usuario não encontrado"
-        )
-
     try:
-        await session.delete(usuario)
-        await session.commit()
-        return {"detail": "Usuario removido"}
+        if shards.ativo:
+            stmt = select(LivrosCompras).where(LivrosCompras.usuario_id == usuario_id)
+            partes = await shards.espalhar(lambda shard: _listar_compras(shard, stmt))
+            await contadores.estornar_compras(session, [compra for parte in partes for compra in parte])
+            session.add_all(Exclusao(entidade="compra", entidade_id=compra.id) for parte in partes for compra in parte)
+        else:
+            await contadores.estornar_usuario(session, usuario_id)
+            await session.execute(
+                insert(Exclusao).from_select(
+                    ["entidade", "entidade_id", "excluido_em"],
+                    select(literal("compra"), LivrosCompras.id, literal(datetime.now()))
+                    .where(LivrosCompras.usuario_id == usuario_id)
+                )
+            )
+        result = await session.execute(delete(Usuario).where(Usuario.id == usuario_id))
+        removido = result.rowcount > 0
+        if removido:
+            session.add(Exclusao(entidade="usuario", entidade_id=usuario_id))
+            if shards.ativo:
+                await shards.gravar(session, [
+                    (indice, delete(LivrosCompras).where(LivrosCompras.usuario_id == usuario_id),
+                     insert(LivrosCompras).values([compra.model_dump() for compra in parte]))
+                    for indice, parte in enumerate(partes) if parte
+                ])
+            else:
+                await session.commit()
+        else:
+            await session.rollback()
     except Exception as e:
         await session.rollback()
+        if consulta_interrompida(e):
+            raise
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
+
+    if not removido:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuario não encontrado"
+        )
+    return {"detail": "Usuario removido"}
@@ -0,0 +1,36 @@
+"""
+Atualiza as recomendações "quem comprou também comprou".
+
+Por padrão soma apenas as compras novas desde a última execução (usando a
+matriz salva em RECOMENDACOES_ARQUIVO); com --completo, ou se a matriz ainda
+não existir, recalcula tudo a partir de livroscompras. Requer o extra
+`recomendacoes` (numpy e scipy).
+
+Uso:
+    python -m scripts.recomendacoes [--completo] [--k 10]
+"""
+import argparse
+import asyncio
+from database import async_session, encerrar
+from services import recomendacoes
+
+
+async def main(completo: bool, k: int) -> None:
+    async with async_session() as session:
+        if completo or not recomendacoes.ARQUIVO.exists():
+            resultado = await recomendacoes.construir(session, k)
+        else:
+            resultado = await recomendacoes.atualizar(session, k)
+        await session.commit()
+    await encerrar()
+    print(f"Compras lidas: {resultado['compras']}")
+    print(f"Livros atualizados: {resultado['livros_atualizados']}")
+    print(f"Última compra considerada: {resultado['ultimo_id']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--completo", action="store_true", help="Recalcula a partir de todo o histórico")
+    parser.add_argument("--k", type=int, default=recomendacoes.K_PADRAO, help="Vizinhos por livro")
+    args = parser.parse_args()
+    asyncio.run(main(args.completo, args.k))
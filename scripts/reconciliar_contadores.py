@@ -0,0 +1,31 @@
+"""
+Reconcilia os contadores de vendas de livros e usuários.
+
+Recalcula total_vendido/receita_total (livros) e total_compras/total_gasto
+(usuarios) a partir de livroscompras e corrige as linhas divergentes. Não
+roda com DATABASE_SHARD_URLS: as compras não estariam no banco principal.
+
+Uso:
+    python -m scripts.reconciliar_contadores
+"""
+import asyncio
+import sys
+from database import async_session, encerrar
+from services import contadores
+from services.shards import shards
+
+
+async def main() -> None:
+    if shards.ativo:
+        print("Reconciliação não suportada com shards (DATABASE_SHARD_URLS).", file=sys.stderr)
+        sys.exit(1)
+    async with async_session() as session:
+        resultado = await contadores.reconciliar(session)
+        await session.commit()
+    await encerrar()
+    print(f"Livros corrigidos: {resultado['livros_corrigidos']}")
+    print(f"Usuários corrigidos: {resultado['usuarios_corrigidos']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+"""
+Prepara os shards de compras e move cada compra para o shard do seu usuário.
+
+Cria `livroscompras` nos shards de DATABASE_SHARD_URLS que ainda não a têm,
+percorre as compras do banco principal (DATABASE_URL), de cada shard e dos
+bancos informados em --origem (shards que estão sendo desativados) e move para
+o shard certo as que estiverem em outro lugar. Por fim, avança a sequência de
+IDs de compras para depois do maior ID encontrado.
+
+Use ao ligar os shards (move as compras do banco principal) e depois de
+acrescentar ou remover shards. Cada lote é copiado para o destino (ignorando
+IDs que já estejam lá) antes de ser apagado da origem, então o script pode ser
+interrompido e executado de novo. Enquanto ele roda, a aplicação continua
+vendo as compras já nos shards atuais (as consultas vão a todos), mas não as
+que ainda estão no banco principal ou em --origem.
+
+Uso:
+    python -m scripts.shards [--origem URL ...] [--lote 1000]
+"""
+import argparse
+import os
+import sys
+from collections import defaultdict
+from sqlalchemy import create_engine, delete, func, insert, inspect, select, update
+from sqlalchemy.engine import Engine
+from models.livroCompras import LivrosCompras
+from models.sequencia import Sequencia
+from scripts.verificar_planos import _url_sincrona
+from services.shards import URLS, criar_tabela, shard_do_usuario
+
+
+def mover(origem: Engine, destinos: list[Engine], indice_origem: int | None, lote: int) -> int:
+    """
+    Move as compras de um banco para os shards dos seus usuários.
+
+    Args:
+        origem (Engine): Banco percorrido.
+        destinos (list[Engine]): Shards atuais, na ordem de DATABASE_SHARD_URLS.
+        indice_origem (int | None): Posição da origem em `destinos`, se for um shard atual.
+        lote (int): Compras lidas por vez.
+
+    Returns:
+        int: Quantidade de compras movidas.
+    """
+    if not inspect(origem).has_table(LivrosCompras.__tablename__):
+        return 0
+    tabela = LivrosCompras.__table__
+    movidas, ultimo_id = 0, 0
+    while True:
+        with origem.connect() as conn:
+            linhas = conn.execute(select(tabela).where(tabela.c.id > ultimo_id)
+                                  .order_by(tabela.c.id).limit(lote)).mappings().all()
+        if not linhas:
+            return movidas
+        ultimo_id = linhas[-1]["id"]
+
+        por_destino = defaultdict(list)
+        for linha in linhas:
+            indice = shard_do_usuario(linha["usuario_id"], len(destinos))
+            if indice != indice_origem:
+                por_destino[indice].append(dict(linha))
+
+        for indice, compras in por_destino.items():
+            ids = [compra["id"] for compra in compras]
+            with destinos[indice].begin() as conn:
+                existentes = set(conn.execute(select(tabela.c.id).where(tabela.c.id.in_(ids))).scalars())
+                novas = [compra for compra in compras if compra["id"] not in existentes]
+                if novas:
+                    conn.execute(insert(tabela), novas)
+            with origem.begin() as conn:
+                conn.execute(delete(tabela).where(tabela.c.id.in_(ids)))
+            movidas += len(compras)
+        if por_destino:
+            print(f"  até o ID {ultimo_id}: {movidas} compras movidas")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--origem", action="append", default=[],
+                        help="Banco de onde retirar compras, além do principal (ex.: shard desativado)")
+    parser.add_argument("--lote", type=int, default=1000, help="Compras movidas por vez")
+    args = parser.parse_args()
+
+    if not URLS:
+        print("DATABASE_SHARD_URLS não definida; nada a fazer.", file=sys.stderr)
+        sys.exit(1)
+
+    principal = create_engine(_url_sincrona(os.getenv("DATABASE_URL")))
+    destinos = [create_engine(_url_sincrona(url)) for url in URLS]
+    origens = [create_engine(_url_sincrona(url)) for url in args.origem]
+    try:
+        for engine in destinos:
+            with engine.begin() as conn:
+                if criar_tabela(conn):
+                    print(f"Tabela criada em {engine.url.render_as_string(hide_password=True)}")
+
+        for indice, engine in [(None, principal), *enumerate(destinos), *((None, e) for e in origens)]:
+            print(f"Movendo compras de {engine.url.render_as_string(hide_password=True)}")
+            mover(engine, destinos, indice, args.lote)
+
+        maior_id = 0
+        for engine in [principal, *destinos]:
+            with engine.connect() as conn:
+                maior_id = max(maior_id, conn.scalar(select(func.coalesce(func.max(LivrosCompras.id), 0))))
+        with principal.begin() as conn:
+            conn.execute(update(Sequencia)
+                         .where(Sequencia.nome == LivrosCompras.__tablename__, Sequencia.valor < maior_id)
+                         .values(valor=maior_id))
+            valor = conn.scalar(select(Sequencia.valor).where(Sequencia.nome == LivrosCompras.__tablename__))
+        print(f"Maior ID de compra: {maior_id}; próximos IDs a partir de {valor + 1}")
+    finally:
+        for engine in [principal, *destinos, *origens]:
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Verificação do orçamento de instruções SQL das rotas mais acessadas.
+
+Cria um banco SQLite descartável com as migrations, popula com os mesmos
+dados sintéticos de scripts.verificar_planos e chama cada rota no próprio
+processo (httpx com ASGITransport) dentro de `limite_consultas`. Termina com
+código 1 se alguma rota passar do orçamento ou repetir a mesma forma de
+instrução (provável N+1), para ser usado como etapa de CI.
+
+Os orçamentos valem para o banco principal sem shards (DATABASE_SHARD_URLS é
+ignorado). Ao mudar uma rota de propósito, ajuste o orçamento dela aqui.
+
+Uso:
+    python -m scripts.verificar_consultas [--escala 0.05]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from dataclasses import dataclass, field
+
+os.environ.pop("DATABASE_SHARD_URLS", None)
+
+from sqlalchemy import create_engine
+
+from middlewares.sql_counter import limite_consultas
+from scripts.verificar_planos import migrar, popular, _url_sincrona
+
+
+@dataclass
+class Caso:
+    """
+    Chamada verificada pelo script.
+
+    Atributos:
+        nome (str): Identificação da rota.
+        metodo (str): Método HTTP.
+        caminho (str): Caminho com a query string.
+        maximo (int): Instruções SQL permitidas na requisição.
+        corpo (dict | None): Corpo JSON da requisição.
+    """
+    nome: str
+    metodo: str
+    caminho: str
+    maximo: int
+    corpo: dict | None = field(default=None)
+
+
+CASOS = [
+    Caso("GET /livros/{id}", "GET", "/livros/1", 3),
+    Caso("GET /livros/", "GET", "/livros/?limit=50", 3),
+    Caso("GET /livros/search?genero", "GET", "/livros/search?genero=Romance&ordernar_por=preco_uni", 3),
+    Caso("POST /livros/batch-get", "POST", "/livros/batch-get", 3, {"ids": list(range(1, 301))}),
+    Caso("GET /livros/{id}/recomendacoes", "GET", "/livros/1/recomendacoes", 4),
+    Caso("GET /usuarios/{id}", "GET", "/usuarios/1", 1),
+    Caso("GET /usuarios/", "GET", "/usuarios/?limit=50", 1),
+    Caso("GET /usuarios/por-email", "GET", "/usuarios/por-email?email=U12@exemplo.com", 1),
+    Caso("POST /usuarios/batch-get", "POST", "/usuarios/batch-get", 1, {"ids": list(range(1, 301))}),
+    Caso("GET /admin/{id}", "GET", "/admin/1", 3),
+    Caso("GET /admin/", "GET", "/admin/", 3),
+    Caso("GET /compras/search", "GET", "/compras/search?data_inicial=2025-03-01&data_final=2025-03-07", 1),
+    Caso("GET /changes/", "GET", "/changes/?limit=100", 4),
+    Caso("POST /compras/", "POST", "/compras/", 8, {"usuario_id": 1, "livro_id": 2, "quantidade_comprados": 1}),
+]
+
+
+async def verificar() -> int:
+    """
+    Chama todas as rotas com o orçamento de cada uma e imprime o resultado.
+
+    Returns:
+        int: Quantidade de rotas fora do orçamento (ou que não responderam 2xx).
+    """
+    import httpx
+    from main import app
+
+    falhas = 0
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://verificacao") as cliente:
+            for caso in CASOS:
+                erro = None
+                try:
+                    with limite_consultas(caso.maximo) as contador:
+                        resposta = await cliente.request(caso.metodo, caso.caminho, json=caso.corpo)
+                    if not resposta.is_success:
+                        erro = f"resposta {resposta.status_code}: {resposta.text[:200]}"
+                except AssertionError as falha:
+                    erro = str(falha)
+                print(f"[{'FALHOU' if erro else 'ok'}] {caso.nome}: {contador.total}/{caso.maximo}")
+                if erro:
+                    print(f"      {erro}")
+                    falhas += 1
+    return falhas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escala", type=float, default=0.05, help="Multiplicador do volume de dados")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        url = f"sqlite+aiosqlite:///{os.path.join(diretorio, 'consultas.bd')}"
+        migrar(url)
+        engine = create_engine(_url_sincrona(url))
+        try:
+            popular(engine, args.escala)
+        finally:
+            engine.dispose()
+        falhas = asyncio.run(verificar())
+
+    if falhas:
+        print(f"\n{falhas} rota(s) fora do orçamento de instruções SQL", file=sys.stderr)
+        sys.exit(1)
+    print("\nNenhuma rota passou do orçamento de instruções SQL")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from sqlmodel import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import async_session
+from metrics import metricas
+from models.alteracao import Exclusao
+from models.catalogo import Editora, Genero
+from models.livro import Livro
+from models.livroCompras import LivrosCompras
+from services.shards import shards
+
+try:
+    import numpy as np
+except ImportError:  # dependência opcional
+    np = None
+
+# Idade máxima (segundos) do snapshot antes de uma consulta disparar a atualização incremental.
+IDADE_MAX = float(os.getenv("ANALYTICS_IDADE_MAX", 30))
+
+# Intervalo (segundos) entre recargas completas (corrigem o que a atualização incremental não vê).
+RECARGA_COMPLETA = float(os.getenv("ANALYTICS_RECARGA_COMPLETA", 3600))
+
+# Folga (segundos) no filtro por updated_at, para transações que confirmaram atrasadas.
+MARGEM = float(os.getenv("ANALYTICS_MARGEM", 5))
+
+# Linhas lidas do banco por lote.
+LOTE_LEITURA = 50_000
+
+COLUNAS_COMPRAS = {
+    "id": "int64",
+    "usuario_id": "int32",
+    "livro_id": "int32",
+    "data_compra": "int64",  # segundos desde 1970 no horário local (como gravado)
+    "preco_pago": "float64",
+    "quantidade": "int32",
+}
+
+COLUNAS_LIVROS = {
+    "id": "int32",
+    "preco_uni": "float64",
+    "genero": "int32",  # código em Snapshot.generos
+    "editora": "int32",  # código em Snapshot.editoras
+}
+
+
+class Colunas:
+    """
+    Conjunto de arrays NumPy de mesmo tamanho, ordenados pela coluna "id".
+
+    Os arrays têm capacidade maior que o número de linhas e dobram quando
+    enchem, para que anexar lotes pequenos não copie a tabela inteira.
+
+    Atributos:
+        tamanho (int): Quantidade de linhas válidas.
+    """
+
+    def __init__(self, tipos: dict[str, str], capacidade: int = 1024):
+        self._arrays = {nome: np.empty(capacidade, dtype=tipo) for nome, tipo in tipos.items()}
+        self.tamanho = 0
+
+    def __getitem__(self, nome: str) -> "np.ndarray":
+        return self._arrays[nome][:self.tamanho]
+
+    @property
+    def nbytes(self) -> dict[str, int]:
+        return {nome: int(array.nbytes) for nome, array in self._arrays.items()}
+
+    def anexar(self, lote: dict[str, "np.ndarray"]) -> None:
+        n = len(lote["id"])
+        if n == 0:
+            return
+        necessario = self.tamanho + n
+        capacidade = len(self._arrays["id"])
+        if necessario > capacidade:
+            while capacidade < necessario:
+                capacidade *= 2
+            for nome, array in self._arrays.items():
+                novo = np.empty(capacidade, dtype=array.dtype)
+                novo[:self.tamanho] = array[:self.tamanho]
+                self._arrays[nome] = novo
+        desordenado = self.tamanho and lote["id"][0] <= self._arrays["id"][self.tamanho - 1]
+        for nome, array in self._arrays.items():
+            array[self.tamanho:necessario] = lote[nome]
+        self.tamanho = necessario
+        if desordenado or np.any(np.diff(lote["id"]) < 0):
+            self._ordenar()
+
+    def _ordenar(self) -> None:
+        ordem = np.argsort(self["id"], kind="stable")
+        for nome in self._arrays:
+            self._arrays[nome][:self.tamanho] = self[nome][ordem]
+
+    def posicoes(self, ids: "np.ndarray") -> tuple["np.ndarray", "np.ndarray"]:
+        """
+        Localiza IDs por busca binária.
+
+        Returns:
+            tuple: Posições (válidas só onde encontrado) e máscara de encontrados.
+        """
+        atuais = self["id"]
+        posicoes = np.searchsorted(atuais, ids)
+        encontrados = posicoes < len(atuais)
+        encontrados[encontrados] = atuais[posicoes[encontrados]] == ids[encontrados]
+        return posicoes, encontrados
+
+    def mesclar(self, lote: dict[str, "np.ndarray"]) -> tuple[int, int]:
+        """
+        Sobrescreve as linhas já presentes e anexa as novas.
+
+        Returns:
+            tuple: Quantidade de linhas alteradas e de linhas novas.
+        """
+        posicoes, encontrados = self.posicoes(lote["id"])
+        for nome, array in self._arrays.items():
+            array[posicoes[encontrados]] = lote[nome][encontrados]
+        novas = ~encontrados
+        self.anexar({nome: valores[novas] for nome, valores in lote.items()})
+        return int(encontrados.sum()), int(novas.sum())
+
+    def remover(self, ids: "np.ndarray") -> int:
+        posicoes, encontrados = self.posicoes(ids)
+        if not encontrados.any():
+            return 0
+        manter = np.ones(self.tamanho, dtype=bool)
+        manter[posicoes[encontrados]] = False
+        restantes = int(manter.sum())
+        for nome in self._arrays:
+            self._arrays[nome][:restantes] = self[nome][manter]
+        removidas = self.tamanho - restantes
+        self.tamanho = restantes
+        return removidas
+
+
+class Snapshot:
+    """
+    Cópia colunar em memória de `livroscompras` e `livros` para consultas analíticas.
+
+    Cada coluna é um array NumPy compacto (inteiros de 32 bits, datas em
+    segundos, gênero e editora codificados como inteiros), e as agregações
+    rodam vetorizadas sobre os arrays em vez de percorrer linhas no banco.
+
+    A atualização incremental lê as compras com ID acima da marca d'água, as
+    linhas com updated_at recente (alterações e inserções confirmadas fora de
+    ordem) e os tombstones de `exclusoes`. Remoções que não deixam tombstone
+    são corrigidas pela recarga completa periódica (ANALYTICS_RECARGA_COMPLETA).
+    A leitura do banco acontece antes de qualquer alteração nos arrays, que é
+    feita sem pontos de suspensão; consultas concorrentes nunca veem um
+    snapshot pela metade.
+
+    Atributos:
+        compras (Colunas | None): Colunas das compras (None antes da primeira carga).
+        livros (Colunas | None): Colunas dos livros.
+        generos, editoras (list[str]): Valores correspondentes aos códigos.
+        ultimo_id (int): Maior ID de compra carregado (marca d'água).
+        atualizado_em (datetime | None): Início da última atualização.
+    """
+
+    def __init__(self):
+        self.compras: Colunas | None = None
+        self.livros: Colunas | None = None
+        self.generos: list[str] = []
+        self.editoras: list[str] = []
+        self._codigos_generos: dict[str, int] = {}
+        self._codigos_editoras: dict[str, int] = {}
+        self.ultimo_id = 0
+        self.atualizado_em: datetime | None = None
+        self._recarregado_em = 0.0
+        self._atualizado_monotonico = 0.0
+        self._ultima: dict | None = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _codificar(valores: tuple[str, ...], codigos: dict[str, int], vocabulario: list[str]) -> "np.ndarray":
+        resultado = np.empty(len(valores), dtype=np.int32)
+        for i, valor in enumerate(valores):
+            codigo = codigos.get(valor)
+            if codigo is None:
+                codigo = codigos[valor] = len(vocabulario)
+                vocabulario.append(valor)
+            resultado[i] = codigo
+        return resultado
+
+    async def _ler_compras(self, session: AsyncSession, *filtros) -> dict[str, "np.ndarray"]:
+        # Com shards, cada shard é lido e as partes são juntadas (`Colunas.anexar` reordena por ID).
+        partes = await shards.ler_compras(session, lambda sessao: self._ler_compras_de(sessao, *filtros))
+        return {nome: np.concatenate([parte[nome] for parte in partes]) for nome in COLUNAS_COMPRAS}
+
+    async def _ler_compras_de(self, session: AsyncSession, *filtros) -> dict[str, "np.ndarray"]:
+        stmt = (select(LivrosCompras.id, LivrosCompras.usuario_id, LivrosCompras.livro_id,
+                       LivrosCompras.data_compra, LivrosCompras.preco_pago, LivrosCompras.quantidade_comprados)
+                .where(*filtros)
+                .order_by(LivrosCompras.id)
+                .execution_options(yield_per=LOTE_LEITURA))
+        partes = {nome: [] for nome in COLUNAS_COMPRAS}
+        result = await session.stream(stmt)
+        async for lote in result.partitions(LOTE_LEITURA):
+            ids, usuarios, livros, datas, precos, quantidades = zip(*lote)
+            partes["id"].append(np.array(ids, dtype=np.int64))
+            partes["usuario_id"].append(np.array(usuarios, dtype=np.int32))
+            partes["livro_id"].append(np.array(livros, dtype=np.int32))
+            partes["data_compra"].append(np.array(datas, dtype="datetime64[s]").astype(np.int64))
+            partes["preco_pago"].append(np.array(precos, dtype=np.float64))
+            partes["quantidade"].append(np.array(quantidades, dtype=np.int32))
+        return {nome: np.concatenate(p) if p else np.empty(0, dtype=COLUNAS_COMPRAS[nome])
+                for nome, p in partes.items()}
+
+    async def _ler_livros(self, session: AsyncSession, vocabularios: tuple, *filtros) -> dict[str, "np.ndarray"]:
+        codigos_generos, generos, codigos_editoras, editoras = vocabularios
+        result = await session.execute(
+            select(Livro.id, Livro.preco_uni, Genero.nome, Editora.nome)
+            .join(Genero, Genero.id == Livro.genero_id)
+            .join(Editora, Editora.id == Livro.editora_id)
+            .where(*filtros)
+            .order_by(Livro.id)
+        )
+        linhas = result.all()
+        if not linhas:
+            return {nome: np.empty(0, dtype=tipo) for nome, tipo in COLUNAS_LIVROS.items()}
+        ids, precos, generos_livros, editoras_livros = zip(*linhas)
+        return {
+            "id": np.array(ids, dtype=np.int32),
+            "preco_uni": np.array(precos, dtype=np.float64),
+            "genero": self._codificar(generos_livros, codigos_generos, generos),
+            "editora": self._codificar(editoras_livros, codigos_editoras, editoras),
+        }
+
+    async def _ler_exclusoes(self, session: AsyncSession, entidade: str, desde: datetime) -> "np.ndarray":
+        result = await session.execute(
+            select(Exclusao.entidade_id).where(Exclusao.entidade == entidade, Exclusao.excluido_em >= desde)
+        )
+        return np.array(result.scalars().all(), dtype=np.int64)
+
+    async def atualizar(self, completa: bool = False) -> dict:
+        """
+        Atualiza o snapshot a partir do banco.
+
+        Args:
+            completa (bool): Recarrega tudo em vez de aplicar só as diferenças.
+                A primeira carga e as recargas periódicas são sempre completas.
+
+        Returns:
+            dict: Resumo da atualização (tipo, duração e linhas afetadas).
+        """
+        async with self._lock:
+            completa = (completa or self.compras is None
+                        or time.monotonic() - self._recarregado_em >= RECARGA_COMPLETA)
+            inicio = time.perf_counter()
+            marca = datetime.now()
+            async with async_session() as session:
+                if completa:
+                    resumo = await self._recarregar(session)
+                else:
+                    resumo = await self._aplicar_diferencas(session)
+            self.atualizado_em = marca
+            self._atualizado_monotonico = time.monotonic()
+            if completa:
+                self._recarregado_em = self._atualizado_monotonico
+
+            resumo = {"tipo": "completa" if completa else "incremental",
+                      "duracao_ms": round((time.perf_counter() - inicio) * 1000, 2), **resumo}
+            self._ultima = resumo
+            metricas.incrementar(f"analytics.atualizacoes.{resumo['tipo']}")
+            return resumo
+
+    async def _recarregar(self, session: AsyncSession) -> dict:
+        vocabularios = ({}, [], {}, [])
+        lote_livros = await self._ler_livros(session, vocabularios)
+        lote_compras = await self._ler_compras(session)
+
+        livros = Colunas(COLUNAS_LIVROS, max(len(lote_livros["id"]), 1024))
+        livros.anexar(lote_livros)
+        compras = Colunas(COLUNAS_COMPRAS, max(len(lote_compras["id"]), 1024))
+        compras.anexar(lote_compras)
+        self.livros, self.compras = livros, compras
+        self._codigos_generos, self.generos, self._codigos_editoras, self.editoras = vocabularios
+        self.ultimo_id = int(compras["id"][-1]) if compras.tamanho else 0
+        return {"lidas": len(lote_livros["id"]) + len(lote_compras["id"]),
+                "novas": compras.tamanho, "alteradas": 0, "removidas": 0}
+
+    async def _aplicar_diferencas(self, session: AsyncSession) -> dict:
+        desde = self.atualizado_em - timedelta(seconds=MARGEM)
+        # Valores novos só ganham código; os códigos existentes não mudam.
+        vocabularios = (self._codigos_generos, self.generos, self._codigos_editoras, self.editoras)
+        livros = await self._ler_livros(session, vocabularios, Livro.updated_at >= desde)
+        livros_excluidos = await self._ler_exclusoes(session, "livro", desde)
+        compras = await self._ler_compras(session, or_(LivrosCompras.id > self.ultimo_id,
+                                                       LivrosCompras.updated_at >= desde))
+        compras_excluidas = await self._ler_exclusoes(session, "compra", desde)
+
+        # Daqui em diante não há await: a troca é atômica para as consultas.
+        self.livros.mesclar(livros)
+        self.livros.remover(livros_excluidos.astype(np.int32))
+        alteradas, novas = self.compras.mesclar(compras)
+        removidas = self.compras.remover(compras_excluidas)
+        if len(compras["id"]):
+            self.ultimo_id = max(self.ultimo_id, int(compras["id"].max()))
+        return {"lidas": len(livros["id"]) + len(compras["id"]),
+                "novas": novas, "alteradas": alteradas, "removidas": removidas}
+
+    async def garantir_atualizado(self, idade_max: float = IDADE_MAX) -> None:
+        """
+        Atualiza o snapshot se ele for mais velho que `idade_max` segundos.
+        """
+        if self.compras is None or time.monotonic() - self._atualizado_monotonico >= idade_max:
+            await self.atualizar()
+
+    def selecionar(self, inicio: datetime | None = None, fim: datetime | None = None,
+                   genero: str | None = None, livro_id: int | None = None) -> "np.ndarray":
+        """
+        Máscara booleana das compras que atendem aos filtros.
+
+        Args:
+            inicio, fim (datetime | None): Intervalo de data_compra (fim exclusivo).
+            genero (str | None): Gênero do livro comprado.
+            livro_id (int | None): Livro comprado.
+        """
+        compras = self.compras
+        mascara = np.ones(compras.tamanho, dtype=bool)
+        if inicio is not None:
+            mascara &= compras["data_compra"] >= np.datetime64(inicio, "s").astype(np.int64)
+        if fim is not None:
+            mascara &= compras["data_compra"] < np.datetime64(fim, "s").astype(np.int64)
+        if livro_id is not None:
+            mascara &= compras["livro_id"] == livro_id
+        if genero is not None:
+            codigo = self._codigos_generos.get(genero)
+            if codigo is None:
+                mascara[:] = False
+            else:
+                posicoes, encontrados = self.livros.posicoes(compras["livro_id"])
+                generos = np.full(compras.tamanho, -1, dtype=np.int32)
+                generos[encontrados] = self.livros["genero"][posicoes[encontrados]]
+                mascara &= generos == codigo
+        return mascara
+
+    def percentis_preco(self, mascara: "np.ndarray", percentis: list[float]) -> dict:
+        """
+        Percentis, média, mínimo e máximo de preco_pago.
+        """
+        precos = self.compras["preco_pago"][mascara]
+        if len(precos) == 0:
+            return {"compras": 0, "percentis": {}, "media": None, "minimo": None, "maximo": None}
+        valores = np.percentile(precos, percentis)
+        return {
+            "compras": int(len(precos)),
+            "percentis": {f"p{p:g}": round(float(v), 2) for p, v in zip(percentis, valores)},
+            "media": round(float(precos.mean()), 2),
+            "minimo": round(float(precos.min()), 2),
+            "maximo": round(float(precos.max()), 2),
+        }
+
+    def histograma_horas(self, mascara: "np.ndarray") -> list[dict]:
+        """
+        Compras, unidades e receita por hora do dia (0 a 23).
+        """
+        horas = (self.compras["data_compra"][mascara] // 3600) % 24
+        compras = np.bincount(horas, minlength=24)
+        unidades = np.bincount(horas, weights=self.compras["quantidade"][mascara], minlength=24)
+        receita = np.bincount(horas, weights=self.compras["preco_pago"][mascara], minlength=24)
+        return [{"hora": h, "compras": int(compras[h]), "unidades": int(unidades[h]),
+                 "receita": round(float(receita[h]), 2)} for h in range(24)]
+
+    def distribuicao_cestas(self, mascara: "np.ndarray") -> dict:
+        """
+        Distribuição do tamanho das cestas (unidades compradas por usuário no mesmo dia).
+        """
+        usuarios = self.compras["usuario_id"][mascara].astype(np.int64)
+        dias = self.compras["data_compra"][mascara] // 86400
+        if len(usuarios) == 0:
+            return {"cestas": 0, "media": None, "p50": None, "p90": None, "maximo": None, "distribuicao": []}
+        chaves = (usuarios << 32) | (dias - dias.min())
+        _, cesta = np.unique(chaves, return_inverse=True)
+        tamanhos = np.bincount(cesta, weights=self.compras["quantidade"][mascara]).astype(np.int64)
+        valores, contagens = np.unique(tamanhos, return_counts=True)
+        p50, p90 = np.percentile(tamanhos, [50, 90])
+        return {
+            "cestas": int(len(tamanhos)),
+            "media": round(float(tamanhos.mean()), 2),
+            "p50": float(p50),
+            "p90": float(p90),
+            "maximo": int(tamanhos.max()),
+            "distribuicao": [{"unidades": int(v), "cestas": int(c)} for v, c in zip(valores, contagens)],
+        }
+
+    def estado(self) -> dict:
+        if self.compras is None:
+            return {"carregado": False}
+        bytes_compras, bytes_livros = self.compras.nbytes, self.livros.nbytes
+        return {
+            "carregado": True,
+            "compras": self.compras.tamanho,
+            "livros": self.livros.tamanho,
+            "ultimo_id": self.ultimo_id,
+            "atualizado_em": self.atualizado_em.isoformat(),
+            "memoria_bytes": {
+                "compras": bytes_compras,
+                "livros": bytes_livros,
+                "total": sum(bytes_compras.values()) + sum(bytes_livros.values()),
+            },
+            "ultima_atualizacao": self._ultima,
+        }
+
+
+snapshot = Snapshot()
+
+metricas.registrar_coletor("analytics", lambda: {
+    chave: valor for chave, valor in snapshot.estado().items() if chave != "ultima_atualizacao"
+})
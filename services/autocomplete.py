@@ -0,0 +1,200 @@
+import asyncio
+import contextvars
+import logging
+import os
+import unicodedata
+from bisect import bisect_left, insort
+from sqlmodel import select
+from database import async_session
+from metrics import metricas
+from models.livro import Livro
+from services.invalidacao import barramento
+
+logger = logging.getLogger(__name__)
+
+# Tamanho máximo de cada chave do índice (prefixos maiores são truncados).
+CHAVE_MAX = int(os.getenv("AUTOCOMPLETE_CHAVE_MAX", 32))
+
+# Palavras indexadas por campo (título ou autor).
+PALAVRAS_MAX = 16
+
+# Quantidade de IDs recarregados do banco por consulta.
+LOTE = 500
+
+
+def normalizar(texto: str) -> str:
+    """
+    Normaliza um texto para comparação: sem acentos, minúsculo e com espaços simples.
+
+    Args:
+        texto (str): Texto original.
+
+    Returns:
+        str: Texto normalizado (ex: "São  Paulo" -> "sao paulo").
+    """
+    decomposto = unicodedata.normalize("NFKD", texto)
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(sem_acentos.casefold().split())
+
+
+def gerar_chaves(titulo: str, autor: str) -> list[str]:
+    """
+    Gera as chaves de um livro: o texto a partir de cada palavra do título e do autor.
+
+    Assim "dom" e "casmurro" encontram "Dom Casmurro", e "machado de" encontra
+    "Machado de Assis".
+    """
+    chaves = set()
+    for campo in (titulo, autor):
+        palavras = normalizar(campo).split(" ")
+        for i in range(min(len(palavras), PALAVRAS_MAX)):
+            chave = " ".join(palavras[i:])[:CHAVE_MAX]
+            if chave:
+                chaves.add(chave)
+    return sorted(chaves)
+
+
+class IndiceAutocomplete:
+    """
+    Índice de prefixos em memória sobre título e autor dos livros.
+
+    Mantém uma lista ordenada de (chave, id) e responde por busca binária, sem
+    consultar o banco. É construído na inicialização e atualizado pelos eventos
+    do barramento de invalidação (escritas deste worker e dos demais). A memória
+    é limitada por CHAVE_MAX e PALAVRAS_MAX por livro.
+
+    Atributos:
+        pronto (bool): Indica se o índice já foi construído.
+    """
+
+    def __init__(self):
+        self._chaves: list[tuple[str, int]] = []
+        self._livros: dict[int, tuple[str, str, list[str]]] = {}
+        self._pendentes: set[int] = set()
+        self._reconstruir = False
+        self._tarefa: asyncio.Task | None = None
+        self.pronto = False
+
+    def atualizar(self, livro_id: int, titulo: str, autor: str) -> None:
+        """
+        Insere ou substitui um livro no índice.
+        """
+        self.remover(livro_id)
+        chaves = gerar_chaves(titulo, autor)
+        for chave in chaves:
+            insort(self._chaves, (chave, livro_id))
+        self._livros[livro_id] = (titulo, autor, chaves)
+
+    def remover(self, livro_id: int) -> None:
+        """
+        Remove um livro do índice (sem efeito se não estiver indexado).
+        """
+        anterior = self._livros.pop(livro_id, None)
+        if anterior is None:
+            return
+        for chave in anterior[2]:
+            posicao = bisect_left(self._chaves, (chave, livro_id))
+            if posicao < len(self._chaves) and self._chaves[posicao] == (chave, livro_id):
+                del self._chaves[posicao]
+
+    def sugerir(self, q: str, limit: int = 10) -> list[dict]:
+        """
+        Retorna livros cujo título ou autor tem uma palavra começando por `q`.
+
+        Args:
+            q (str): Texto digitado.
+            limit (int): Quantidade máxima de sugestões.
+
+        Returns:
+            list[dict]: Sugestões {id, titulo, autor}, na ordem das chaves.
+        """
+        prefixo = normalizar(q)[:CHAVE_MAX]
+        if not prefixo:
+            return []
+        encontrados: dict[int, None] = {}
+        posicao = bisect_left(self._chaves, (prefixo,))
+        while posicao < len(self._chaves) and len(encontrados) < limit:
+            chave, livro_id = self._chaves[posicao]
+            if not chave.startswith(prefixo):
+                break
+            encontrados[livro_id] = None
+            posicao += 1
+        return [{"id": i, "titulo": self._livros[i][0], "autor": self._livros[i][1]} for i in encontrados]
+
+    async def construir(self) -> None:
+        """
+        (Re)constrói o índice a partir da tabela de livros.
+        """
+        chaves: list[tuple[str, int]] = []
+        livros: dict[int, tuple[str, str, list[str]]] = {}
+        async with async_session() as session:
+            result = await session.stream(select(Livro.id, Livro.titulo, Livro.autor))
+            async for livro_id, titulo, autor in result:
+                chaves_livro = gerar_chaves(titulo, autor)
+                chaves.extend((chave, livro_id) for chave in chaves_livro)
+                livros[livro_id] = (titulo, autor, chaves_livro)
+        chaves.sort()
+        self._chaves, self._livros = chaves, livros
+        self.pronto = True
+        metricas.incrementar("autocomplete.reconstrucoes")
+
+    def invalidar(self, ids: list[int] | None) -> None:
+        """
+        Agenda a recarga dos livros alterados (assinante do barramento).
+
+        Args:
+            ids (list[int] | None): IDs alterados, ou None para reconstruir tudo.
+        """
+        if ids is None:
+            self._reconstruir = True
+        else:
+            self._pendentes.update(ids)
+        if self._tarefa is None or self._tarefa.done():
+            try:
+                # Contexto vazio: chamado após o commit de uma requisição, a tarefa
+                # não pode herdar o prazo dela (middlewares.deadline) nem o contador
+                # de instruções SQL (middlewares.sql_counter).
+                self._tarefa = asyncio.get_running_loop().create_task(self._aplicar_pendentes(),
+                                                                      context=contextvars.Context())
+            except RuntimeError:
+                pass
+
+    async def _aplicar_pendentes(self) -> None:
+        while self._reconstruir or self._pendentes:
+            ids = None
+            try:
+                if self._reconstruir:
+                    self._reconstruir = False
+                    self._pendentes.clear()
+                    await self.construir()
+                    continue
+
+                ids = list(self._pendentes)[:LOTE]
+                self._pendentes.difference_update(ids)
+                async with async_session() as session:
+                    result = await session.execute(
+                        select(Livro.id, Livro.titulo, Livro.autor).where(Livro.id.in_(ids))
+                    )
+                    encontrados = {livro_id: (titulo, autor) for livro_id, titulo, autor in result}
+                for livro_id in ids:
+                    if livro_id in encontrados:
+                        self.atualizar(livro_id, *encontrados[livro_id])
+                    else:
+                        self.remover(livro_id)
+            except Exception:
+                logger.exception("Falha ao atualizar o índice de autocomplete")
+                # A pendência volta, para a próxima invalidação tentar de novo.
+                if ids is None:
+                    self._reconstruir = True
+                else:
+                    self._pendentes.update(ids)
+                return
+
+    def estado(self) -> dict:
+        return {"pronto": self.pronto, "livros": len(self._livros), "chaves": len(self._chaves)}
+
+
+indice = IndiceAutocomplete()
+
+barramento.inscrever("livro", indice.invalidar)
+metricas.registrar_coletor("autocomplete", indice.estado)
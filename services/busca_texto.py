@@ -0,0 +1,56 @@
+from sqlalchemy import bindparam
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+from sqlalchemy.types import Boolean
+
+# Menor termo que o índice de trigramas consegue atender.
+TAMANHO_MINIMO = 3
+
+
+class contem(ColumnElement):
+    """
+    Filtro "coluna contém o termo", sem diferenciar maiúsculas.
+
+    No Postgres vira ILIKE '%termo%', atendido pelo índice GIN de trigramas
+    (pg_trgm) criado na migration. No SQLite vira uma consulta à tabela FTS5
+    com tokenizador trigram (`<tabela>_fts`), mantida por triggers. Termos com
+    menos de TAMANHO_MINIMO caracteres não têm trigramas e caem no ILIKE
+    (varredura) nos dois bancos.
+
+    Args:
+        coluna: Coluna de uma tabela que tenha o índice de trigramas.
+        termo (str): Texto procurado.
+    """
+    type = Boolean()
+    _is_implicitly_boolean = True
+    inherit_cache = True
+    _traverse_internals = [
+        ("coluna", InternalTraversal.dp_clauseelement),
+        ("indexado", InternalTraversal.dp_boolean),
+        ("padrao", InternalTraversal.dp_clauseelement),
+        ("consulta_fts", InternalTraversal.dp_clauseelement),
+    ]
+
+    def __init__(self, coluna, termo: str):
+        self.coluna = coluna = coluna.__clause_element__()
+        self.indexado = len(termo) >= TAMANHO_MINIMO
+        self.padrao = bindparam(None, f"%{termo}%", unique=True)
+        # Frase FTS5 restrita à coluna; aspas do termo são duplicadas.
+        frase = termo.replace('"', '""')
+        self.consulta_fts = bindparam(None, f'{coluna.key} : "{frase}"', unique=True)
+
+
+@compiles(contem)
+def _contem_ilike(elemento: contem, compiler, **kw) -> str:
+    return compiler.process(elemento.coluna.ilike(elemento.padrao), **kw)
+
+
+@compiles(contem, "sqlite")
+def _contem_fts(elemento: contem, compiler, **kw) -> str:
+    if not elemento.indexado:
+        return compiler.process(elemento.coluna.ilike(elemento.padrao), **kw)
+    tabela = elemento.coluna.table
+    fts = f"{tabela.name}_fts"
+    return (f"{compiler.process(tabela.c.id, **kw)} IN "
+            f"(SELECT rowid FROM {fts} WHERE {fts} MATCH {compiler.process(elemento.consulta_fts, **kw)})")
@@ -0,0 +1,93 @@
+from typing import Iterable
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+from metrics import metricas
+from models.catalogo import Dominio, Editora, Genero
+
+# Campo da API → (coluna em livros, tabela de domínio).
+CAMPOS: dict[str, tuple[str, type[Dominio]]] = {
+    "genero": ("genero_id", Genero),
+    "editora": ("editora_id", Editora),
+}
+
+
+def _registrar(modelo: type[Dominio], linhas: Iterable[tuple[int, str]]) -> None:
+    for id, nome in linhas:
+        modelo.ids[nome] = id
+        modelo.nomes[id] = nome
+
+
+async def carregar(session: AsyncSession) -> None:
+    """
+    Carrega gêneros e editoras inteiros no mapeamento (tabelas pequenas).
+
+    Chamado na inicialização, para as primeiras requisições não consultarem
+    as tabelas de domínio.
+    """
+    for _, modelo in CAMPOS.values():
+        result = await session.execute(select(modelo.id, modelo.nome))
+        _registrar(modelo, result)
+
+
+async def buscar_id(session: AsyncSession, modelo: type[Dominio], nome: str) -> int | None:
+    """
+    ID de um gênero ou editora pelo nome, para filtros.
+
+    Args:
+        session (AsyncSession): Sessão do banco.
+        modelo (type[Dominio]): Genero ou Editora.
+        nome (str): Nome procurado (exato).
+
+    Returns:
+        int | None: ID, ou None se nenhum livro usa esse nome.
+    """
+    id = modelo.ids.get(nome)
+    if id is None:
+        id = await session.scalar(select(modelo.id).where(modelo.nome == nome))
+        if id is not None:
+            _registrar(modelo, [(id, nome)])
+    return id
+
+
+async def _obter_ou_criar(session: AsyncSession, modelo: type[Dominio], nome: str) -> int:
+    id = modelo.ids.get(nome)
+    if id is not None:
+        return id
+    id = await session.scalar(select(modelo.id).where(modelo.nome == nome))
+    if id is not None:
+        _registrar(modelo, [(id, nome)])
+        return id
+    # Na transação da requisição: se ela falhar, o valor não fica órfão. Só vai
+    # para o mapeamento quando outra requisição o encontrar já confirmado.
+    try:
+        async with session.begin_nested():
+            registro = modelo(nome=nome)
+            session.add(registro)
+        metricas.incrementar(f"catalogo.criados.{modelo.__tablename__}")
+        return registro.id
+    except IntegrityError:
+        # Criado ao mesmo tempo por outra requisição.
+        return await session.scalar(select(modelo.id).where(modelo.nome == nome))
+
+
+async def colunas(session: AsyncSession, valores: dict) -> dict:
+    """
+    Troca os nomes de gênero e editora pelos IDs, nas colunas de `livros`.
+
+    Nomes ainda não cadastrados são criados na transação da sessão (confirmados
+    junto com o livro).
+
+    Args:
+        session (AsyncSession): Sessão da escrita do livro.
+        valores (dict): Campos de LivroPost, LivroUpdate ou LivroBulkItem.
+
+    Returns:
+        dict: Os mesmos campos, com genero_id/editora_id no lugar de genero/editora.
+    """
+    resultado = dict(valores)
+    for campo, (coluna, modelo) in CAMPOS.items():
+        if campo in resultado:
+            nome = resultado.pop(campo)
+            resultado[coluna] = None if nome is None else await _obter_ou_criar(session, modelo, nome)
+    return resultado
@@ -0,0 +1,145 @@
+from sqlalchemy import update, and_, or_, func
+from sqlmodel import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.livro import Livro
+from models.usuario import Usuario
+from models.livroCompras import LivrosCompras
+from models.estoque import LivroEstoqueSlot
+
+# Diferença mínima considerada divergência nos contadores de valor (float).
+TOLERANCIA_VALOR = 0.005
+
+
+async def registrar_venda(session: AsyncSession, livro_id: int, usuario_id: int,
+                          quantidade: int, valor: float, compras: int = 1,
+                          contar_livro: bool = True) -> None:
+    """
+    Atualiza os contadores de vendas do livro e do usuário.
+
+    Deve ser chamada dentro da mesma transação que grava a compra. Os valores
+    são somados no próprio UPDATE, sem ler a linha antes; para desfazer uma
+    venda basta passar valores negativos.
+
+    Args:
+        session (AsyncSession): Sessão da transação da compra.
+        livro_id (int): ID do livro vendido.
+        usuario_id (int): ID do usuário comprador.
+        quantidade (int): Unidades vendidas (negativo para estornar).
+        valor (float): Valor pago (negativo para estornar).
+        compras (int): Quantidade de compras a somar no usuário (1 ou -1).
+        contar_livro (bool): False quando a venda já foi somada numa fatia de
+            estoque (livro com estoque fragmentado, ver services.estoque).
+    """
+    if contar_livro:
+        await session.execute(
+            update(Livro)
+            .where(Livro.id == livro_id)
+            .values(
+                total_vendido=Livro.total_vendido + quantidade,
+                receita_total=Livro.receita_total + valor,
+            )
+        )
+    await session.execute(
+        update(Usuario)
+        .where(Usuario.id == usuario_id)
+        .values(
+            total_compras=Usuario.total_compras + compras,
+            total_gasto=Usuario.total_gasto + valor,
+        )
+    )
+
+
+async def estornar_usuario(session: AsyncSession, usuario_id: int) -> None:
+    """
+    Desconta dos livros as vendas de um usuário cujas compras serão removidas.
+
+    Usada antes de remover o usuário, já que as compras dele são apagadas pelo
+    banco (ON DELETE CASCADE) sem passar pelas rotas de compra. Um único UPDATE
+    agrega as compras por livro, sem carregá-las.
+
+    Args:
+        session (AsyncSession): Sessão da transação da remoção.
+        usuario_id (int): ID do usuário.
+    """
+    do_usuario = and_(LivrosCompras.usuario_id == usuario_id, LivrosCompras.livro_id == Livro.id)
+    vendidos = (select(func.coalesce(func.sum(LivrosCompras.quantidade_comprados), 0))
+                .where(do_usuario).scalar_subquery())
+    receita = (select(func.coalesce(func.sum(LivrosCompras.preco_pago), 0.0))
+               .where(do_usuario).scalar_subquery())
+    await session.execute(
+        update(Livro)
+        .where(Livro.id.in_(select(LivrosCompras.livro_id).where(LivrosCompras.usuario_id == usuario_id)))
+        .values(total_vendido=Livro.total_vendido - vendidos, receita_total=Livro.receita_total - receita)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def estornar_compras(session: AsyncSession, compras: list[LivrosCompras]) -> None:
+    """
+    Desconta dos livros as vendas das compras informadas.
+
+    Equivalente a `estornar_usuario` quando as compras estão em shards (fora do
+    banco principal): as compras, já carregadas, são somadas por livro aqui.
+
+    Args:
+        session (AsyncSession): Sessão da transação da remoção.
+        compras (list[LivrosCompras]): Compras que serão removidas.
+    """
+    por_livro: dict[int, list] = {}
+    for compra in compras:
+        total = por_livro.setdefault(compra.livro_id, [0, 0.0])
+        total[0] += compra.quantidade_comprados
+        total[1] += compra.preco_pago
+    for livro_id, (quantidade, valor) in por_livro.items():
+        await session.execute(
+            update(Livro)
+            .where(Livro.id == livro_id)
+            .values(total_vendido=Livro.total_vendido - quantidade, receita_total=Livro.receita_total - valor)
+        )
+
+
+async def reconciliar(session: AsyncSession) -> dict:
+    """
+    Recalcula os contadores a partir de `livroscompras` e corrige divergências.
+
+    Apenas as linhas com valores divergentes são atualizadas. As vendas
+    acumuladas nas fatias de estoque são descartadas, pois o valor recalculado
+    já as inclui.
+
+    Args:
+        session (AsyncSession): Sessão do banco (o commit fica a cargo de quem chama).
+
+    Returns:
+        dict: Quantidade de livros e usuários corrigidos.
+    """
+    await session.execute(
+        update(LivroEstoqueSlot)
+        .where(or_(LivroEstoqueSlot.vendido != 0, LivroEstoqueSlot.receita != 0))
+        .values(vendido=0, receita=0)
+    )
+
+    vendidos = (select(func.coalesce(func.sum(LivrosCompras.quantidade_comprados), 0))
+                .where(LivrosCompras.livro_id == Livro.id).scalar_subquery())
+    receita = (select(func.coalesce(func.sum(LivrosCompras.preco_pago), 0.0))
+               .where(LivrosCompras.livro_id == Livro.id).scalar_subquery())
+    livros = await session.execute(
+        update(Livro)
+        .where(or_(Livro.total_vendido != vendidos,
+                   func.abs(Livro.receita_total - receita) > TOLERANCIA_VALOR))
+        .values(total_vendido=vendidos, receita_total=receita)
+        .execution_options(synchronize_session=False)
+    )
+
+    quantidade = (select(func.count(LivrosCompras.id))
+                  .where(LivrosCompras.usuario_id == Usuario.id).scalar_subquery())
+    gasto = (select(func.coalesce(func.sum(LivrosCompras.preco_pago), 0.0))
+             .where(LivrosCompras.usuario_id == Usuario.id).scalar_subquery())
+    usuarios = await session.execute(
+        update(Usuario)
+        .where(or_(Usuario.total_compras != quantidade,
+                   func.abs(Usuario.total_gasto - gasto) > TOLERANCIA_VALOR))
+        .values(total_compras=quantidade, total_gasto=gasto)
+        .execution_options(synchronize_session=False)
+    )
+
+    return {"livros_corrigidos": livros.rowcount, "usuarios_corrigidos": usuarios.rowcount}
@@ -0,0 +1,262 @@
+import os
+import random
+from sqlalchemy import update, delete, insert, func
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from metrics import metricas
+from models.livro import Livro
+from models.estoque import LivroEstoqueSlot
+
+# Quantidade de fatias usada quando o pedido de fragmentação não informa uma.
+SLOTS_PADRAO = int(os.getenv("ESTOQUE_SLOTS", 8))
+
+# Fatias tentadas por compra antes de rebalancear.
+TENTATIVAS = 3
+
+
+def distribuir(total: int, slots: int) -> list[int]:
+    """
+    Divide `total` unidades em `slots` fatias o mais iguais possível.
+    """
+    base, resto = divmod(total, slots)
+    return [base + (1 if i < resto else 0) for i in range(slots)]
+
+
+async def _recolher(session: AsyncSession, livro_id: int) -> tuple[int, int]:
+    """
+    Junta as fatias de volta na linha do livro e as remove.
+
+    O estoque das fatias volta para livros.quantidade_estoque e as vendas
+    acumuladas nelas são somadas aos contadores do livro. A linha do livro é
+    travada antes (FOR UPDATE), o que serializa rebalanceamentos concorrentes
+    do mesmo título; as somas vêm do próprio DELETE ... RETURNING, que espera
+    os débitos em andamento nas fatias e devolve os valores já confirmados.
+
+    Returns:
+        tuple[int, int]: Estoque total do livro e quantidade de fatias que existiam.
+    """
+    await session.execute(select(Livro.id).where(Livro.id == livro_id).with_for_update())
+    removidas = (await session.execute(
+        delete(LivroEstoqueSlot).where(LivroEstoqueSlot.livro_id == livro_id)
+        .returning(LivroEstoqueSlot.quantidade, LivroEstoqueSlot.vendido, LivroEstoqueSlot.receita)
+    )).all()
+    result = await session.execute(
+        update(Livro)
+        .where(Livro.id == livro_id)
+        .values(
+            quantidade_estoque=Livro.quantidade_estoque + sum(fatia.quantidade for fatia in removidas),
+            total_vendido=Livro.total_vendido + sum(fatia.vendido for fatia in removidas),
+            receita_total=Livro.receita_total + sum(fatia.receita for fatia in removidas),
+        )
+        .returning(Livro.quantidade_estoque)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one(), len(removidas)
+
+
+async def _espalhar(session: AsyncSession, livro_id: int, total: int, slots: int) -> None:
+    """
+    Distribui `total` unidades em `slots` fatias novas e zera o estoque da linha do livro.
+    """
+    await session.execute(
+        insert(LivroEstoqueSlot),
+        [{"livro_id": livro_id, "slot": i, "quantidade": q} for i, q in enumerate(distribuir(total, slots))]
+    )
+    await session.execute(
+        update(Livro).where(Livro.id == livro_id).values(quantidade_estoque=0)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def fragmentar(session: AsyncSession, livro_id: int, slots: int) -> None:
+    """
+    Liga (ou refaz com outra quantidade de fatias) o estoque fragmentado de um livro.
+
+    Args:
+        session (AsyncSession): Sessão do banco (o commit fica a cargo de quem chama).
+        livro_id (int): ID do livro.
+        slots (int): Quantidade de fatias.
+    """
+    total, _ = await _recolher(session, livro_id)
+    await _espalhar(session, livro_id, total, slots)
+    await session.execute(
+        update(Livro).where(Livro.id == livro_id).values(estoque_fragmentado=True)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def desfragmentar(session: AsyncSession, livro_id: int) -> None:
+    """
+    Volta o estoque de um livro para a própria linha de `livros`.
+
+    Args:
+        session (AsyncSession): Sessão do banco (o commit fica a cargo de quem chama).
+        livro_id (int): ID do livro.
+    """
+    await _recolher(session, livro_id)
+    await session.execute(
+        update(Livro).where(Livro.id == livro_id).values(estoque_fragmentado=False)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def rebalancear(session: AsyncSession, livro_id: int, quantidade: int = 0, valor: float = 0) -> bool:
+    """
+    Redistribui o estoque entre as fatias, opcionalmente debitando uma compra.
+
+    Usado quando nenhuma fatia sozinha atende a compra: com as fatias recolhidas
+    a compra pode ser debitada do total antes de redistribuir o restante.
+
+    Args:
+        session (AsyncSession): Sessão da transação da compra.
+        livro_id (int): ID do livro.
+        quantidade (int): Unidades a debitar (0 para apenas rebalancear).
+        valor (float): Valor da compra a somar na receita do livro.
+
+    Returns:
+        bool: False se o estoque total não atende `quantidade` (nada é debitado).
+    """
+    metricas.incrementar("estoque.rebalanceamentos")
+    total, slots = await _recolher(session, livro_id)
+    atende = total >= quantidade
+    if atende and quantidade:
+        total -= quantidade
+        await session.execute(
+            update(Livro)
+            .where(Livro.id == livro_id)
+            .values(total_vendido=Livro.total_vendido + quantidade,
+                    receita_total=Livro.receita_total + valor)
+            .execution_options(synchronize_session=False)
+        )
+    await _espalhar(session, livro_id, total, slots or SLOTS_PADRAO)
+    return atende
+
+
+async def debitar(session: AsyncSession, livro_id: int, quantidade: int, valor: float) -> bool:
+    """
+    Debita uma compra de uma fatia aleatória com estoque suficiente.
+
+    A venda também é somada na própria fatia (vendido/receita), para que a
+    compra não precise atualizar a linha do livro. Se nenhuma fatia atender,
+    as fatias são rebalanceadas.
+
+    Args:
+        session (AsyncSession): Sessão da transação da compra.
+        livro_id (int): ID do livro (com estoque fragmentado).
+        quantidade (int): Unidades compradas.
+        valor (float): Valor pago.
+
+    Returns:
+        bool: False se o estoque do livro é insuficiente.
+    """
+    result = await session.execute(
+        select(LivroEstoqueSlot.slot)
+        .where(LivroEstoqueSlot.livro_id == livro_id, LivroEstoqueSlot.quantidade >= quantidade)
+    )
+    candidatos = list(result.scalars().all())
+    random.shuffle(candidatos)
+
+    for slot in candidatos[:TENTATIVAS]:
+        # A condição de quantidade é reavaliada sob o lock da linha: se outra
+        # compra esvaziou a fatia, nenhuma linha é alterada e tenta-se a próxima.
+        result = await session.execute(
+            update(LivroEstoqueSlot)
+            .where(LivroEstoqueSlot.livro_id == livro_id,
+                   LivroEstoqueSlot.slot == slot,
+                   LivroEstoqueSlot.quantidade >= quantidade)
+            .values(quantidade=LivroEstoqueSlot.quantidade - quantidade,
+                    vendido=LivroEstoqueSlot.vendido + quantidade,
+                    receita=LivroEstoqueSlot.receita + valor)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            metricas.incrementar("estoque.debitos_fragmentados")
+            return True
+
+    return await rebalancear(session, livro_id, quantidade, valor)
+
+
+async def creditar(session: AsyncSession, livro_id: int, quantidade: int) -> None:
+    """
+    Devolve unidades ao estoque (estorno), na fatia mais vazia.
+
+    Args:
+        session (AsyncSession): Sessão da transação.
+        livro_id (int): ID do livro (com estoque fragmentado).
+        quantidade (int): Unidades devolvidas.
+    """
+    mais_vazia = (select(LivroEstoqueSlot.slot)
+                  .where(LivroEstoqueSlot.livro_id == livro_id)
+                  .order_by(LivroEstoqueSlot.quantidade)
+                  .limit(1)
+                  .scalar_subquery())
+    await session.execute(
+        update(LivroEstoqueSlot)
+        .where(LivroEstoqueSlot.livro_id == livro_id, LivroEstoqueSlot.slot == mais_vazia)
+        .values(quantidade=LivroEstoqueSlot.quantidade + quantidade)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def definir(session: AsyncSession, livro_id: int, total: int) -> None:
+    """
+    Define o estoque total de um livro fragmentado, redistribuindo entre as fatias.
+
+    Args:
+        session (AsyncSession): Sessão da transação.
+        livro_id (int): ID do livro (com estoque fragmentado).
+        total (int): Novo estoque total.
+    """
+    await session.execute(
+        update(LivroEstoqueSlot).where(LivroEstoqueSlot.livro_id == livro_id).values(quantidade=0)
+        .execution_options(synchronize_session=False)
+    )
+    await session.execute(
+        update(Livro).where(Livro.id == livro_id).values(quantidade_estoque=total)
+        .execution_options(synchronize_session=False)
+    )
+    await rebalancear(session, livro_id)
+
+
+async def disponivel(session: AsyncSession, livro_id: int) -> int:
+    """
+    Estoque total de um livro fragmentado (soma das fatias e da linha do livro).
+    """
+    fatias = await session.execute(
+        select(func.coalesce(func.sum(LivroEstoqueSlot.quantidade), 0))
+        .where(LivroEstoqueSlot.livro_id == livro_id)
+    )
+    livro = await session.execute(select(Livro.quantidade_estoque).where(Livro.id == livro_id))
+    return fatias.scalar_one() + livro.scalar_one()
+
+
+async def aplicar(session: AsyncSession, livros: list[Livro]) -> None:
+    """
+    Soma as fatias no estoque e nos contadores dos livros fragmentados carregados.
+
+    Os valores são gravados como já persistidos (não marcam o objeto como
+    alterado), apenas para a resposta. Não faz consulta se nenhum livro da
+    lista estiver fragmentado.
+
+    Args:
+        session (AsyncSession): Sessão do banco.
+        livros (list[Livro]): Livros já carregados.
+    """
+    fragmentados = {livro.id: livro for livro in livros if livro.estoque_fragmentado}
+    if not fragmentados:
+        return
+
+    result = await session.execute(
+        select(LivroEstoqueSlot.livro_id,
+               func.sum(LivroEstoqueSlot.quantidade),
+               func.sum(LivroEstoqueSlot.vendido),
+               func.sum(LivroEstoqueSlot.receita))
+        .where(LivroEstoqueSlot.livro_id.in_(list(fragmentados)))
+        .group_by(LivroEstoqueSlot.livro_id)
+    )
+    for livro_id, quantidade, vendido, receita in result:
+        livro = fragmentados[livro_id]
+        set_committed_value(livro, "quantidade_estoque", livro.quantidade_estoque + quantidade)
+        set_committed_value(livro, "total_vendido", livro.total_vendido + vendido)
+        set_committed_value(livro, "receita_total", livro.receita_total + receita)
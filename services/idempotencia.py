@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import async_session
+from metrics import metricas
+from models.idempotencia import ChaveIdempotencia
+
+# Tempo (segundos) que uma chave e sua resposta ficam guardadas.
+TTL = int(os.getenv("IDEMPOTENCIA_TTL", 86400))
+
+# Tempo máximo (segundos) que uma repetição espera a execução original terminar.
+ESPERA = float(os.getenv("IDEMPOTENCIA_ESPERA", 10))
+
+# Reserva sem resposta há mais que isso (segundos) é de um worker que morreu e pode ser assumida.
+TRAVA = float(os.getenv("IDEMPOTENCIA_TRAVA", 60))
+
+# Intervalo (segundos) entre consultas enquanto outro worker executa a mesma chave.
+INTERVALO = 0.05
+
+# Probabilidade de uma reserva apagar as chaves expiradas.
+TAXA_LIMPEZA = 0.01
+
+
+def impressao(corpo: dict) -> str:
+    """
+    Hash estável do corpo da requisição.
+    """
+    return hashlib.sha256(json.dumps(jsonable_encoder(corpo), sort_keys=True).encode()).hexdigest()
+
+
+@dataclass
+class Reserva:
+    """
+    Resultado de `Idempotencia.reservar`.
+
+    Atributos:
+        escopo, chave (str): Identificação da chave.
+        status (int | None): Status guardado, quando a chave já foi concluída.
+        resposta (dict | list | None): Corpo guardado, quando a chave já foi concluída.
+        reservado_em (datetime | None): Marca da reserva feita por esta requisição.
+    """
+    escopo: str
+    chave: str
+    status: int | None = None
+    resposta: dict | list | None = None
+    reservado_em: datetime | None = None
+
+    @property
+    def concluida(self) -> bool:
+        return self.status is not None
+
+    def repetir(self) -> JSONResponse:
+        """
+        Resposta guardada da primeira execução, marcada com Idempotent-Replayed.
+        """
+        return JSONResponse(content=self.resposta, status_code=self.status,
+                            headers={"Idempotent-Replayed": "true"})
+
+
+class Idempotencia:
+    """
+    Controle das chaves de idempotência (cabeçalho Idempotency-Key).
+
+    A primeira requisição com uma chave a reserva numa transação própria (a
+    chave primária impede duas reservas) e grava a resposta na mesma transação
+    da operação, com `concluir`: ou a operação e a resposta ficam gravadas
+    juntas, ou nenhuma. Se a operação falhar, a reserva é liberada e o cliente
+    pode tentar de novo.
+
+    Repetições de uma chave concluída recebem a resposta guardada sem executar
+    nada. Repetições simultâneas esperam a original: no mesmo worker por um
+    Future, entre workers consultando a tabela. Uma reserva sem resposta há
+    mais de IDEMPOTENCIA_TRAVA segundos é de um worker que caiu antes do commit
+    (a resposta é gravada junto com a operação) e pode ser assumida.
+    """
+
+    def __init__(self):
+        self._em_andamento: dict[tuple[str, str], asyncio.Future] = {}
+
+    async def reservar(self, escopo: str, chave: str, impressao: str) -> Reserva:
+        """
+        Reserva a chave ou obtém a resposta já guardada.
+
+        Args:
+            escopo (str): Operação protegida.
+            chave (str): Valor do cabeçalho Idempotency-Key.
+            impressao (str): Hash do corpo (ver `impressao`).
+
+        Returns:
+            Reserva: Concluída (responder com `repetir`) ou reservada para esta requisição.
+
+        Raises:
+            HTTPException 422: Caso a chave já tenha sido usada com outro corpo.
+            HTTPException 409: Caso a execução original não termine dentro de IDEMPOTENCIA_ESPERA.
+        """
+        limite = time.monotonic() + ESPERA
+        while True:
+            local = self._em_andamento.get((escopo, chave))
+            if local is not None:
+                metricas.incrementar("idempotencia.coalescidas")
+                try:
+                    await asyncio.wait_for(asyncio.shield(local), max(limite - time.monotonic(), 0))
+                except asyncio.TimeoutError:
+                    raise self._em_processamento()
+                continue
+
+            reserva = await self._tentar_reservar(escopo, chave, impressao)
+            if reserva is not None:
+                if reserva.concluida:
+                    metricas.incrementar("idempotencia.repeticoes")
+                return reserva
+            if time.monotonic() >= limite:
+                raise self._em_processamento()
+            await asyncio.sleep(INTERVALO)
+
+    async def _tentar_reservar(self, escopo: str, chave: str, impressao: str) -> Reserva | None:
+        agora = datetime.now()
+        async with async_session() as session:
+            if random.random() < TAXA_LIMPEZA:
+                await session.execute(delete(ChaveIdempotencia).where(ChaveIdempotencia.expira_em < agora))
+                await session.commit()
+
+            registro = await session.get(ChaveIdempotencia, (escopo, chave))
+            if registro is not None and registro.expira_em < agora:
+                await session.delete(registro)
+                await session.commit()
+                registro = None
+
+            if registro is None:
+                session.add(ChaveIdempotencia(escopo=escopo, chave=chave, impressao=impressao,
+                                              reservado_em=agora, expira_em=agora + timedelta(seconds=TTL)))
+                try:
+                    await session.commit()
+                except IntegrityError:
+                    # Outro worker reservou entre a leitura e o INSERT.
+                    await session.rollback()
+                    return None
+                return self._reservada(escopo, chave, agora)
+
+            if registro.impressao != impressao:
+                raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                    detail="Idempotency-Key já utilizada com outra requisição")
+            if registro.status is not None:
+                return Reserva(escopo, chave, registro.status, json.loads(registro.resposta))
+
+            if registro.reservado_em < agora - timedelta(seconds=TRAVA):
+                result = await session.execute(
+                    update(ChaveIdempotencia)
+                    .where(ChaveIdempotencia.escopo == escopo, ChaveIdempotencia.chave == chave,
+                           ChaveIdempotencia.status.is_(None),
+                           ChaveIdempotencia.reservado_em == registro.reservado_em)
+                    .values(reservado_em=agora)
+                )
+                await session.commit()
+                if result.rowcount:
+                    metricas.incrementar("idempotencia.assumidas")
+                    return self._reservada(escopo, chave, agora)
+        return None
+
+    def _reservada(self, escopo: str, chave: str, reservado_em: datetime) -> Reserva:
+        self._em_andamento[(escopo, chave)] = asyncio.get_running_loop().create_future()
+        metricas.incrementar("idempotencia.reservas")
+        return Reserva(escopo, chave, reservado_em=reservado_em)
+
+    @staticmethod
+    def _em_processamento() -> HTTPException:
+        return HTTPException(status_code=status.HTTP_409_CONFLICT,
+                             detail="Requisição com esta Idempotency-Key ainda em processamento",
+                             headers={"Retry-After": "1"})
+
+    async def concluir(self, session: AsyncSession, reserva: Reserva, status_code: int, corpo) -> None:
+        """
+        Grava a resposta na transação da operação (o commit fica a cargo de quem chama).
+
+        Args:
+            session (AsyncSession): Sessão da transação da operação.
+            reserva (Reserva): Reserva obtida em `reservar`.
+            status_code (int): Status HTTP da resposta.
+            corpo: Corpo da resposta (convertido com jsonable_encoder).
+
+        Raises:
+            HTTPException 409: Caso a reserva tenha sido assumida por outra requisição
+                (esta demorou mais que IDEMPOTENCIA_TRAVA); a operação deve ser desfeita.
+        """
+        result = await session.execute(
+            update(ChaveIdempotencia)
+            .where(*self._filtro_reserva(reserva))
+            .values(status=status_code, resposta=json.dumps(jsonable_encoder(corpo)))
+        )
+        if result.rowcount == 0:
+            raise self._em_processamento()
+
+    @staticmethod
+    def _filtro_reserva(reserva: Reserva) -> tuple:
+        return (ChaveIdempotencia.escopo == reserva.escopo, ChaveIdempotencia.chave == reserva.chave,
+                ChaveIdempotencia.status.is_(None), ChaveIdempotencia.reservado_em == reserva.reservado_em)
+
+    async def finalizar(self, reserva: Reserva) -> None:
+        """
+        Encerra a reserva depois da operação, com ou sem sucesso.
+
+        Se a resposta não foi gravada (a operação falhou), a reserva é apagada
+        para que o cliente possa tentar de novo. As repetições que esperavam
+        neste worker são liberadas em seguida.
+        """
+        try:
+            async with async_session() as session:
+                await session.execute(delete(ChaveIdempotencia).where(*self._filtro_reserva(reserva)))
+                await session.commit()
+        finally:
+            futuro = self._em_andamento.pop((reserva.escopo, reserva.chave), None)
+            if futuro is not None and not futuro.done():
+                futuro.set_result(None)
+
+    def estado(self) -> dict:
+        return {"em_andamento": len(self._em_andamento)}
+
+
+idempotencia = Idempotencia()
+
+metricas.registrar_coletor("idempotencia", idempotencia.estado)
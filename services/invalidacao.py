@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+import os
+import ssl
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Iterable
+from sqlalchemy import event, delete, func
+from sqlalchemy.orm import Session
+from sqlmodel import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import async_session
+from metrics import metricas
+from models.invalidacao import Invalidacao
+
+logger = logging.getLogger(__name__)
+
+CANAL = "invalidacao"
+
+# Intervalo (segundos) de consulta da tabela de invalidações (modo SQLite).
+INTERVALO = float(os.getenv("INVALIDACAO_INTERVALO", 1))
+
+# Tempo (segundos) que os eventos ficam na tabela antes de serem apagados.
+RETENCAO = int(os.getenv("INVALIDACAO_RETENCAO", 3600))
+
+# O payload do NOTIFY é limitado a 8000 bytes; eventos maiores são divididos.
+IDS_POR_EVENTO = 500
+
+# Recebe os IDs invalidados, ou None quando tudo deve ser descartado
+# (por exemplo, após perder a conexão de escuta e possivelmente eventos).
+Assinante = Callable[[list[int] | None], None]
+
+
+class Barramento:
+    """
+    Barramento de invalidação de caches locais entre workers.
+
+    As rotas de escrita publicam, dentro da própria transação, os IDs das
+    entidades alteradas. No Postgres o evento vai por NOTIFY (entregue só no
+    commit) e cada worker escuta numa conexão asyncpg dedicada; no SQLite o
+    evento é gravado na tabela `invalidacoes`, consultada periodicamente.
+
+    O worker que fez a escrita invalida o próprio cache logo após o commit,
+    sem esperar o evento voltar.
+
+    Só publicam as escritas de campos mantidos em cache (título, autor...).
+    Compras alteram apenas estoque e contadores e não publicam: no Postgres o
+    NOTIFY serializa os commits, o que limitaria a vazão de compras.
+
+    Atributos:
+        origem (str): Identificador deste worker (eventos próprios são ignorados na escuta).
+        modo (str | None): "notify" (Postgres) ou "tabela" (SQLite); None antes de iniciar.
+        conectado (bool): Indica se a escuta está ativa.
+    """
+
+    def __init__(self):
+        self.origem = uuid.uuid4().hex
+        self.modo: str | None = None
+        self.conectado = False
+        self._assinantes: dict[str, list[Assinante]] = defaultdict(list)
+        self._tarefa: asyncio.Task | None = None
+
+    def inscrever(self, entidade: str, assinante: Assinante) -> None:
+        """
+        Registra uma função chamada quando entidades do tipo informado mudam.
+
+        Args:
+            entidade (str): Tipo da entidade (ex: "livro").
+            assinante (Assinante): Função que recebe os IDs alterados (ou None para tudo).
+        """
+        self._assinantes[entidade].append(assinante)
+
+    def entregar(self, entidade: str, ids: list[int] | None) -> None:
+        """
+        Repassa uma invalidação aos assinantes locais.
+        """
+        for assinante in self._assinantes.get(entidade, []):
+            try:
+                assinante(ids)
+            except Exception:
+                logger.exception("Falha ao invalidar cache de %s", entidade)
+        metricas.incrementar("invalidacao.entregues")
+
+    def _invalidar_tudo(self) -> None:
+        for entidade in list(self._assinantes):
+            self.entregar(entidade, None)
+
+    async def publicar(self, session: AsyncSession, entidade: str, ids: Iterable[int]) -> None:
+        """
+        Publica a alteração de entidades na transação corrente.
+
+        O evento só chega aos outros workers se a transação for confirmada.
+
+        Args:
+            session (AsyncSession): Sessão da transação de escrita.
+            entidade (str): Tipo da entidade (ex: "livro").
+            ids (Iterable[int]): IDs alterados.
+        """
+        ids = sorted({i for i in ids if i is not None})
+        if not ids:
+            return
+
+        session.info.setdefault("invalidacoes", []).append((entidade, ids))
+        postgres = session.bind.dialect.name == "postgresql"
+        for i in range(0, len(ids), IDS_POR_EVENTO):
+            lote = ids[i:i + IDS_POR_EVENTO]
+            if postgres:
+                payload = json.dumps({"origem": self.origem, "entidade": entidade, "ids": lote})
+                await session.execute(select(func.pg_notify(CANAL, payload)))
+            else:
+                session.add(Invalidacao(origem=self.origem, entidade=entidade,
+                                        ids=",".join(map(str, lote))))
+        metricas.incrementar("invalidacao.publicadas")
+
+    async def iniciar(self) -> None:
+        if os.getenv("DATABASE_URL", "").startswith("postgresql"):
+            self.modo = "notify"
+            self._tarefa = asyncio.create_task(self._escutar_notify())
+        else:
+            self.modo = "tabela"
+            self._tarefa = asyncio.create_task(self._consultar_tabela())
+
+    async def parar(self) -> None:
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+            self._tarefa = None
+        self.conectado = False
+
+    def _ao_notificar(self, conexao, pid, canal, payload: str) -> None:
+        evento = json.loads(payload)
+        if evento["origem"] == self.origem:
+            return
+        metricas.incrementar("invalidacao.recebidas")
+        self.entregar(evento["entidade"], evento["ids"])
+
+    async def _escutar_notify(self) -> None:
+        import asyncpg
+
+        dsn = os.getenv("DATABASE_URL").replace("postgresql+asyncpg", "postgresql")
+        espera = 1
+        while True:
+            try:
+                conexao = await asyncpg.connect(dsn, ssl=ssl.create_default_context())
+            except Exception:
+                logger.exception("Falha ao conectar a escuta de invalidações")
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, 30)
+                continue
+
+            perdida = asyncio.Event()
+            conexao.add_termination_listener(lambda _: perdida.set())
+            try:
+                await conexao.add_listener(CANAL, self._ao_notificar)
+                self.conectado = True
+                espera = 1
+                # Eventos publicados enquanto não havia escuta se perderam.
+                self._invalidar_tudo()
+                await perdida.wait()
+                logger.warning("Conexão de escuta de invalidações perdida; reconectando")
+            finally:
+                self.conectado = False
+                if not conexao.is_closed():
+                    await conexao.close()
+
+    async def _consultar_tabela(self) -> None:
+        async with async_session() as session:
+            result = await session.execute(select(func.max(Invalidacao.id)))
+            ultimo = result.scalar() or 0
+
+        ciclos = 0
+        while True:
+            await asyncio.sleep(INTERVALO)
+            try:
+                async with async_session() as session:
+                    result = await session.execute(
+                        select(Invalidacao).where(Invalidacao.id > ultimo).order_by(Invalidacao.id)
+                    )
+                    for evento in result.scalars().all():
+                        ultimo = evento.id
+                        if evento.origem != self.origem:
+                            metricas.incrementar("invalidacao.recebidas")
+                            self.entregar(evento.entidade, [int(i) for i in evento.ids.split(",")])
+
+                    ciclos += 1
+                    if ciclos * INTERVALO >= 60:
+                        ciclos = 0
+                        limite = datetime.now() - timedelta(seconds=RETENCAO)
+                        await session.execute(delete(Invalidacao).where(Invalidacao.criado_em < limite))
+                        await session.commit()
+                self.conectado = True
+            except Exception:
+                logger.exception("Falha ao consultar invalidações")
+                self.conectado = False
+
+    def estado(self) -> dict:
+        return {
+            "modo": self.modo,
+            "conectado": self.conectado,
+            "assinantes": sum(len(a) for a in self._assinantes.values()),
+        }
+
+
+barramento = Barramento()
+
+metricas.registrar_coletor("invalidacao", barramento.estado)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_apos_commit(session: Session) -> None:
+    for entidade, ids in session.info.pop("invalidacoes", []):
+        barramento.entregar(entidade, ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_apos_rollback(session: Session) -> None:
+    session.info.pop("invalidacoes", None)
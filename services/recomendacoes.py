@@ -0,0 +1,259 @@
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+import numpy as np
+from scipy import sparse
+from sqlalchemy import case, delete, insert, literal, or_
+from sqlmodel import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.livroCompras import LivrosCompras
+from models.recomendacao import LivroRecomendacao
+from services.shards import shards
+
+# Quantidade de vizinhos guardados por livro.
+K_PADRAO = int(os.getenv("RECOMENDACOES_K", 10))
+
+# Matriz de coocorrência salva entre execuções (base das atualizações incrementais).
+ARQUIVO = Path(os.getenv("RECOMENDACOES_ARQUIVO", "dados/coocorrencia.npz"))
+
+# Folga (segundos) na releitura por updated_at, para compras confirmadas depois
+# de outras com ID maior (transações longas, gravação nos shards). A execução é
+# rara, então uma folga larga custa pouco.
+MARGEM = float(os.getenv("RECOMENDACOES_MARGEM", 60))
+
+# Linhas lidas do banco por lote; IDs por cláusula IN; linhas por INSERT.
+LOTE_LEITURA = 50_000
+LOTE_IN = 500
+LOTE_ESCRITA = 5_000
+
+
+async def ler_pares(session: AsyncSession, *filtros,
+                    recentes_desde: datetime | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Lê as compras (usuario_id, livro_id) em lotes, do banco principal ou de cada shard.
+
+    Args:
+        session (AsyncSession): Sessão do banco.
+        *filtros: Condições sobre livroscompras.
+        recentes_desde (datetime | None): Marca as compras com updated_at a partir daqui.
+
+    Returns:
+        tuple: Arrays de usuários, livros e IDs (um item por compra) e a máscara das recentes.
+    """
+    recente = literal(0) if recentes_desde is None else case(
+        (LivrosCompras.updated_at >= recentes_desde, literal(1)), else_=literal(0))
+    stmt = (select(LivrosCompras.usuario_id, LivrosCompras.livro_id, LivrosCompras.id, recente)
+            .where(*filtros)
+            .execution_options(yield_per=LOTE_LEITURA))
+
+    async def ler(sessao: AsyncSession) -> list[np.ndarray]:
+        partes = []
+        result = await sessao.stream(stmt)
+        async for lote in result.partitions(LOTE_LEITURA):
+            partes.append(np.array(lote, dtype=np.int64))
+        return partes
+
+    partes = [parte for partes_banco in await shards.ler_compras(session, ler) for parte in partes_banco]
+    if not partes:
+        vazio = np.empty(0, dtype=np.int64)
+        return vazio, vazio, vazio, np.empty(0, dtype=bool)
+    pares = np.concatenate(partes)
+    return pares[:, 0], pares[:, 1], pares[:, 2], pares[:, 3].astype(bool)
+
+
+def matriz_binaria(usuarios: np.ndarray, livros: np.ndarray,
+                   indice_usuarios: np.ndarray, indice_livros: np.ndarray) -> sparse.csr_matrix:
+    """
+    Monta a matriz usuário x livro com 1 onde o usuário comprou o livro.
+
+    Args:
+        usuarios, livros (np.ndarray): Pares de compra.
+        indice_usuarios, indice_livros (np.ndarray): IDs ordenados que definem linhas e colunas.
+    """
+    linhas = np.searchsorted(indice_usuarios, usuarios)
+    colunas = np.searchsorted(indice_livros, livros)
+    matriz = sparse.csr_matrix((np.ones(len(linhas), dtype=np.int32), (linhas, colunas)),
+                               shape=(len(indice_usuarios), len(indice_livros)))
+    # Compras repetidas do mesmo livro pelo mesmo usuário contam uma vez.
+    matriz.data[:] = 1
+    return matriz
+
+
+def sem_diagonal(matriz: sparse.spmatrix) -> sparse.csr_matrix:
+    matriz = matriz.tocsr()
+    matriz.setdiag(0)
+    matriz.eliminate_zeros()
+    return matriz
+
+
+def reindexar(matriz: sparse.csr_matrix, indice_antigo: np.ndarray, indice_novo: np.ndarray) -> sparse.csr_matrix:
+    """
+    Leva a matriz de coocorrência para um índice de livros maior (livros novos).
+    """
+    coo = matriz.tocoo()
+    posicoes = np.searchsorted(indice_novo, indice_antigo)
+    return sparse.csr_matrix((coo.data, (posicoes[coo.row], posicoes[coo.col])),
+                             shape=(len(indice_novo), len(indice_novo)))
+
+
+def vizinhos(matriz: sparse.csr_matrix, linha: int, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Os k livros mais comprados junto com o livro da linha (desempate pelo menor ID).
+
+    Returns:
+        tuple: Colunas e contagens, da mais forte para a mais fraca.
+    """
+    inicio, fim = matriz.indptr[linha], matriz.indptr[linha + 1]
+    colunas, contagens = matriz.indices[inicio:fim], matriz.data[inicio:fim]
+    if len(contagens) > k:
+        escolhidos = np.argpartition(-contagens, k - 1)[:k]
+        colunas, contagens = colunas[escolhidos], contagens[escolhidos]
+    ordem = np.lexsort((colunas, -contagens))
+    return colunas[ordem], contagens[ordem]
+
+
+async def gravar(session: AsyncSession, matriz: sparse.csr_matrix, indice_livros: np.ndarray,
+                 linhas: np.ndarray, k: int, substituir_tudo: bool = False) -> None:
+    """
+    Grava o top-k das linhas informadas em livros_recomendacoes.
+    """
+    ids = indice_livros[linhas].tolist()
+    if substituir_tudo:
+        await session.execute(delete(LivroRecomendacao))
+    else:
+        for i in range(0, len(ids), LOTE_IN):
+            await session.execute(delete(LivroRecomendacao).where(LivroRecomendacao.livro_id.in_(ids[i:i + LOTE_IN])))
+
+    registros = []
+    for linha in linhas:
+        colunas, contagens = vizinhos(matriz, linha, k)
+        livro_id = int(indice_livros[linha])
+        for posicao, (coluna, contagem) in enumerate(zip(colunas.tolist(), contagens.tolist())):
+            registros.append({"livro_id": livro_id, "posicao": posicao,
+                              "recomendado_id": int(indice_livros[coluna]), "pontuacao": float(contagem)})
+        if len(registros) >= LOTE_ESCRITA:
+            await session.execute(insert(LivroRecomendacao), registros)
+            registros = []
+    if registros:
+        await session.execute(insert(LivroRecomendacao), registros)
+
+
+def salvar(matriz: sparse.csr_matrix, indice_livros: np.ndarray, ultimo_id: int, atualizado_em: datetime,
+           contados: np.ndarray, arquivo: Path = ARQUIVO) -> None:
+    arquivo.parent.mkdir(parents=True, exist_ok=True)
+    temporario = arquivo.with_suffix(".tmp.npz")
+    np.savez_compressed(temporario, data=matriz.data, indices=matriz.indices, indptr=matriz.indptr,
+                        shape=np.array(matriz.shape), livros=indice_livros, ultimo_id=np.array(ultimo_id),
+                        atualizado_em=np.array(atualizado_em, dtype="datetime64[us]"), contados=contados)
+    os.replace(temporario, arquivo)
+
+
+def carregar(arquivo: Path = ARQUIVO) -> tuple[sparse.csr_matrix, np.ndarray, int, datetime | None, np.ndarray]:
+    """
+    Lê a matriz salva por `salvar`.
+
+    Returns:
+        tuple: Matriz, índice de livros, último ID de compra, início da execução
+        que a salvou e IDs já contados com updated_at dentro da margem (arquivos
+        antigos não têm os dois últimos: None e vazio).
+    """
+    with np.load(arquivo) as dados:
+        matriz = sparse.csr_matrix((dados["data"], dados["indices"], dados["indptr"]), shape=tuple(dados["shape"]))
+        atualizado_em = dados["atualizado_em"].item() if "atualizado_em" in dados else None
+        contados = dados["contados"] if "contados" in dados else np.empty(0, dtype=np.int64)
+        return matriz, dados["livros"], int(dados["ultimo_id"]), atualizado_em, contados
+
+
+async def construir(session: AsyncSession, k: int = K_PADRAO, arquivo: Path = ARQUIVO) -> dict:
+    """
+    Recalcula todas as recomendações a partir do histórico completo de compras.
+
+    A coocorrência é X^T X, onde X é a matriz binária usuário x livro; o top-k de
+    cada linha vai para livros_recomendacoes e a matriz é salva em `arquivo`.
+
+    Args:
+        session (AsyncSession): Sessão do banco (o commit fica a cargo de quem chama).
+        k (int): Vizinhos por livro.
+        arquivo (Path): Onde salvar a matriz para atualizações incrementais.
+
+    Returns:
+        dict: Quantidade de compras lidas, livros com recomendações e último ID de compra.
+    """
+    inicio = datetime.now()
+    usuarios, livros, ids, recentes = await ler_pares(session, recentes_desde=inicio - timedelta(seconds=MARGEM))
+    ultimo_id = int(ids.max()) if len(ids) else 0
+    indice_usuarios, indice_livros = np.unique(usuarios), np.unique(livros)
+    x = matriz_binaria(usuarios, livros, indice_usuarios, indice_livros)
+    coocorrencia = sem_diagonal(x.T @ x)
+
+    await gravar(session, coocorrencia, indice_livros, np.arange(len(indice_livros)), k, substituir_tudo=True)
+    salvar(coocorrencia, indice_livros, ultimo_id, inicio, ids[recentes], arquivo)
+    return {"compras": len(livros), "livros_atualizados": len(indice_livros), "ultimo_id": ultimo_id}
+
+
+async def atualizar(session: AsyncSession, k: int = K_PADRAO, arquivo: Path = ARQUIVO) -> dict:
+    """
+    Soma à matriz salva apenas as compras ainda não contadas.
+
+    As candidatas são as de ID maior que o da última execução e as com
+    updated_at a partir do início dela menos MARGEM (confirmadas atrasadas,
+    como no snapshot de analytics); as que a última execução já contou nessa
+    faixa ficam de fora. Para os usuários com compras novas, N (livros novos do
+    usuário) e P (livros que ele já tinha) geram o incremento
+    N^T P + P^T N + N^T N. Só as linhas alteradas têm o top-k regravado.
+    Compra alterada dentro da margem entra com o par novo, mas o antigo não é
+    descontado, e remoções não são refletidas; uma reconstrução completa
+    periódica as corrige.
+
+    Args:
+        session (AsyncSession): Sessão do banco (o commit fica a cargo de quem chama).
+        k (int): Vizinhos por livro.
+        arquivo (Path): Matriz salva por `construir`.
+
+    Returns:
+        dict: Quantidade de compras novas lidas, livros atualizados e último ID de compra.
+    """
+    inicio = datetime.now()
+    coocorrencia, indice_livros, ultimo_id, atualizado_em, contados = carregar(arquivo)
+    candidatas = LivrosCompras.id > ultimo_id
+    if atualizado_em is not None:
+        candidatas = or_(candidatas, LivrosCompras.updated_at >= atualizado_em - timedelta(seconds=MARGEM))
+    usuarios, livros, ids, recentes = await ler_pares(session, candidatas,
+                                                      recentes_desde=inicio - timedelta(seconds=MARGEM))
+    ultimo_id = max(ultimo_id, int(ids.max(initial=0)))
+    # Na próxima execução, as já contadas que ainda estiverem dentro da margem.
+    proximos_contados = ids[recentes]
+    novas = ~np.isin(ids, contados)
+    novos_usuarios, novos_livros, novos_ids = usuarios[novas], livros[novas], ids[novas]
+    if len(novos_livros) == 0:
+        salvar(coocorrencia, indice_livros, ultimo_id, inicio, proximos_contados, arquivo)
+        return {"compras": 0, "livros_atualizados": 0, "ultimo_id": ultimo_id}
+
+    indice_usuarios = np.unique(novos_usuarios)
+    anteriores_usuarios, anteriores_livros = [], []
+    for i in range(0, len(indice_usuarios), LOTE_IN):
+        u, l, c, _ = await ler_pares(session, LivrosCompras.usuario_id.in_(indice_usuarios[i:i + LOTE_IN].tolist()))
+        # Compras que chegaram nesta execução não contam como anteriores.
+        anteriores = ~np.isin(c, novos_ids)
+        anteriores_usuarios.append(u[anteriores])
+        anteriores_livros.append(l[anteriores])
+    anteriores_usuarios = np.concatenate(anteriores_usuarios)
+    anteriores_livros = np.concatenate(anteriores_livros)
+
+    indice_novo = np.union1d(indice_livros, novos_livros)
+    if len(indice_novo) != len(indice_livros):
+        coocorrencia = reindexar(coocorrencia, indice_livros, indice_novo)
+        indice_livros = indice_novo
+
+    p = matriz_binaria(anteriores_usuarios, anteriores_livros, indice_usuarios, indice_livros)
+    n = matriz_binaria(novos_usuarios, novos_livros, indice_usuarios, indice_livros)
+    # Livro que o usuário já tinha comprado não gera coocorrência nova.
+    n = (n - n.multiply(p)).tocsr()
+    n.eliminate_zeros()
+    incremento = sem_diagonal(n.T @ p + p.T @ n + n.T @ n)
+
+    coocorrencia = (coocorrencia + incremento).tocsr()
+    linhas = np.unique(incremento.nonzero()[0])
+    await gravar(session, coocorrencia, indice_livros, linhas, k)
+    salvar(coocorrencia, indice_livros, ultimo_id, inicio, proximos_contados, arquivo)
+    return {"compras": len(novos_livros), "livros_atualizados": len(linhas), "ultimo_id": ultimo_id}
@@ -0,0 +1,298 @@
+import asyncio
+import logging
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+from sqlalchemy import extract
+from sqlmodel import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import async_session
+from metrics import metricas
+from models.catalogo import Editora
+from models.livro import Livro
+from models.livroCompras import LivrosCompras
+from services.shards import shards
+
+logger = logging.getLogger(__name__)
+
+# IDs de livros por cláusula IN (limite de parâmetros do SQLite).
+LOTE_IN = 500
+
+
+class FilaCheia(Exception):
+    """
+    Indica que a fila de relatórios atingiu o tamanho máximo.
+    """
+
+
+def _somar(partes: list[list], chave: str) -> dict:
+    """
+    Soma compras, unidades e receita de linhas com a mesma chave vindas de bancos diferentes.
+    """
+    totais: dict = {}
+    for parte in partes:
+        for linha in parte:
+            total = totais.setdefault(linha[chave], {chave: linha[chave], "compras": 0, "unidades": 0, "receita": 0.0})
+            total["compras"] += linha["compras"]
+            total["unidades"] += linha["unidades"]
+            total["receita"] += linha["receita"]
+    return totais
+
+
+async def _agregar(session: AsyncSession, stmt) -> list[list[dict]]:
+    # Com shards, a mesma agregação roda em cada shard (ver `Shards.ler_compras`).
+    async def ler(sessao: AsyncSession) -> list[dict]:
+        return [dict(linha._mapping) for linha in await sessao.execute(stmt)]
+
+    return await shards.ler_compras(session, ler)
+
+
+def _no_ano(stmt, ano: int | None):
+    if ano is None:
+        return stmt
+    return stmt.where(LivrosCompras.data_compra >= datetime(ano, 1, 1),
+                      LivrosCompras.data_compra < datetime(ano + 1, 1, 1))
+
+
+async def receita_anual(session: AsyncSession, ano: int) -> list[dict]:
+    """
+    Receita e unidades vendidas por mês em um ano.
+
+    Args:
+        session (AsyncSession): Sessão do banco.
+        ano (int): Ano de referência.
+
+    Returns:
+        list[dict]: Um item por mês com vendas.
+    """
+    mes = extract("month", LivrosCompras.data_compra).label("mes")
+    stmt = _no_ano(
+        select(
+            mes,
+            func.count(LivrosCompras.id).label("compras"),
+            func.sum(LivrosCompras.quantidade_comprados).label("unidades"),
+            func.sum(LivrosCompras.preco_pago).label("receita"),
+        )
+        .group_by(mes),
+        ano,
+    )
+    totais = _somar(await _agregar(session, stmt), "mes")
+    return [totais[m] for m in sorted(totais)]
+
+
+async def por_editora(session: AsyncSession, ano: int | None = None) -> list[dict]:
+    """
+    Receita e unidades vendidas por editora, opcionalmente em um ano.
+
+    Sem shards, a junção com livros e editoras é feita no banco. Com shards,
+    cada shard agrega por livro e os livros são mapeados para a editora no
+    banco principal.
+
+    Args:
+        session (AsyncSession): Sessão do banco.
+        ano (int | None): Ano de referência (None para todo o histórico).
+
+    Returns:
+        list[dict]: Um item por editora, da maior para a menor receita.
+    """
+    totais = [
+        func.count(LivrosCompras.id).label("compras"),
+        func.sum(LivrosCompras.quantidade_comprados).label("unidades"),
+        func.sum(LivrosCompras.preco_pago).label("receita"),
+    ]
+    if not shards.ativo:
+        stmt = _no_ano(
+            select(Editora.nome.label("editora"), *totais)
+            .join(Livro, Livro.id == LivrosCompras.livro_id)
+            .join(Editora, Editora.id == Livro.editora_id)
+            .group_by(Editora.id, Editora.nome),
+            ano,
+        )
+        result = await session.execute(stmt)
+        linhas = [dict(linha._mapping) for linha in result]
+    else:
+        por_livro = _somar(await _agregar(session, _no_ano(
+            select(LivrosCompras.livro_id, *totais).group_by(LivrosCompras.livro_id), ano)), "livro_id")
+        editoras: dict[int, str] = {}
+        ids = list(por_livro)
+        for i in range(0, len(ids), LOTE_IN):
+            result = await session.execute(
+                select(Livro.id, Editora.nome)
+                .join(Editora, Editora.id == Livro.editora_id)
+                .where(Livro.id.in_(ids[i:i + LOTE_IN]))
+            )
+            editoras.update(result.all())
+        linhas = list(_somar([[{**total, "editora": editoras[livro_id]}
+                               for livro_id, total in por_livro.items() if livro_id in editoras]],
+                             "editora").values())
+    return sorted(linhas, key=lambda linha: linha["receita"], reverse=True)
+
+
+GERADORES: dict[str, Callable[..., Awaitable[Any]]] = {
+    "receita_anual": receita_anual,
+    "por_editora": por_editora,
+}
+
+
+@dataclass
+class Job:
+    """
+    Relatório solicitado e o seu estado de execução.
+    """
+    tipo: str
+    parametros: dict
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "pendente"
+    criado_em: datetime = field(default_factory=datetime.now)
+    iniciado_em: datetime | None = None
+    concluido_em: datetime | None = None
+    expira_em: datetime | None = None
+    resultado: Any = None
+    erro: str | None = None
+    tarefa: asyncio.Task | None = field(default=None, repr=False)
+
+
+class GerenciadorRelatorios:
+    """
+    Fila local de relatórios executados por um conjunto limitado de workers asyncio.
+
+    Não depende de broker externo: os jobs e os resultados ficam na memória do
+    processo e expiram após `ttl` segundos do término.
+
+    Atributos:
+        workers (int): Quantidade de relatórios executados ao mesmo tempo.
+        fila_max (int): Quantidade máxima de relatórios aguardando execução.
+        ttl (int): Tempo (segundos) que o resultado fica disponível.
+    """
+
+    def __init__(self, workers: int, fila_max: int, ttl: int):
+        self.workers = workers
+        self.fila_max = fila_max
+        self.ttl = ttl
+        self.jobs: dict[str, Job] = {}
+        self._fila: asyncio.Queue[Job] | None = None
+        self._tarefas: list[asyncio.Task] = []
+
+    async def iniciar(self) -> None:
+        self._fila = asyncio.Queue(maxsize=self.fila_max)
+        self._tarefas = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tarefas.append(asyncio.create_task(self._expirar_periodicamente()))
+
+    async def parar(self) -> None:
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        for job in self.jobs.values():
+            if job.tarefa is not None:
+                job.tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas = []
+
+    def enfileirar(self, tipo: str, parametros: dict) -> Job:
+        """
+        Coloca um relatório na fila.
+
+        Args:
+            tipo (str): Tipo do relatório (chave de GERADORES).
+            parametros (dict): Parâmetros do gerador.
+
+        Returns:
+            Job: Job criado, com status "pendente".
+
+        Raises:
+            FilaCheia: Se a fila estiver no tamanho máximo.
+        """
+        job = Job(tipo=tipo, parametros=parametros)
+        try:
+            self._fila.put_nowait(job)
+        except asyncio.QueueFull:
+            metricas.incrementar("relatorios.rejeitados")
+            raise FilaCheia()
+        self.jobs[job.id] = job
+        return job
+
+    def obter(self, job_id: str) -> Job | None:
+        job = self.jobs.get(job_id)
+        if job is not None and job.expira_em is not None and job.expira_em <= datetime.now():
+            self.jobs.pop(job_id, None)
+            return None
+        return job
+
+    def cancelar(self, job_id: str) -> Job | None:
+        """
+        Cancela um relatório pendente ou em execução.
+
+        Args:
+            job_id (str): ID do relatório.
+
+        Returns:
+            Job | None: Job cancelado (ou já finalizado), None se não existir.
+        """
+        job = self.obter(job_id)
+        if job is None:
+            return None
+        if job.status == "pendente":
+            self._finalizar(job, "cancelado")
+        elif job.status == "executando" and job.tarefa is not None:
+            job.tarefa.cancel()
+        return job
+
+    def _finalizar(self, job: Job, status: str) -> None:
+        job.status = status
+        job.concluido_em = datetime.now()
+        job.expira_em = job.concluido_em + timedelta(seconds=self.ttl)
+        job.tarefa = None
+        metricas.incrementar(f"relatorios.{status}")
+
+    async def _executar(self, job: Job) -> Any:
+        async with async_session() as session:
+            return await GERADORES[job.tipo](session, **job.parametros)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._fila.get()
+            try:
+                if job.status != "pendente":
+                    continue
+                job.status = "executando"
+                job.iniciado_em = datetime.now()
+                job.tarefa = asyncio.create_task(self._executar(job))
+                try:
+                    job.resultado = await job.tarefa
+                    self._finalizar(job, "concluido")
+                except asyncio.CancelledError:
+                    self._finalizar(job, "cancelado")
+                    # Só propaga se o próprio worker foi cancelado (encerramento).
+                    if asyncio.current_task().cancelling():
+                        raise
+                except Exception as e:
+                    logger.exception("Falha ao gerar relatório %s", job.id)
+                    job.erro = str(e)
+                    self._finalizar(job, "falhou")
+            finally:
+                self._fila.task_done()
+
+    async def _expirar_periodicamente(self, intervalo: float = 60) -> None:
+        while True:
+            await asyncio.sleep(intervalo)
+            agora = datetime.now()
+            for job_id in [j.id for j in self.jobs.values() if j.expira_em and j.expira_em <= agora]:
+                self.jobs.pop(job_id, None)
+
+    def estado(self) -> dict:
+        return {
+            "workers": self.workers,
+            "profundidade_fila": self._fila.qsize() if self._fila else 0,
+            "executando": sum(1 for j in self.jobs.values() if j.status == "executando"),
+            "armazenados": len(self.jobs),
+        }
+
+
+gerenciador = GerenciadorRelatorios(
+    workers=int(os.getenv("RELATORIOS_WORKERS", 2)),
+    fila_max=int(os.getenv("RELATORIOS_FILA_MAX", 50)),
+    ttl=int(os.getenv("RELATORIOS_TTL", 3600)),
+)
+
+metricas.registrar_coletor("relatorios", gerenciador.estado)
@@ -0,0 +1,145 @@
+from datetime import date, datetime, time, timedelta
+from typing import Literal
+from sqlalchemy import literal_column
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+from sqlalchemy.types import DateTime, String, TypeDecorator
+from sqlmodel import select, func
+from models.livroCompras import LivrosCompras
+
+Bucket = Literal["hour", "day", "week"]
+
+# Limite de pontos por série (um ano por hora cabe).
+MAX_PONTOS = 10_000
+
+PASSOS: dict[str, timedelta] = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+
+class TipoHora(TypeDecorator):
+    """
+    Tipo da hora de uma venda: datetime no Postgres e texto 'AAAA-MM-DD HH' no SQLite.
+    """
+    impl = DateTime
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        return dialect.type_descriptor(String() if dialect.name == "sqlite" else DateTime())
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and dialect.name == "sqlite":
+            return value.strftime("%Y-%m-%d %H")
+        return value
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, str):
+            return datetime.strptime(value, "%Y-%m-%d %H")
+        return value
+
+
+class hora(ColumnElement):
+    """
+    Hora cheia de uma coluna de data, na mesma expressão do índice ix_livroscompras_hora.
+
+    Postgres: date_trunc('hour', coluna). SQLite: substr(coluna, 1, 13), que
+    sobre o texto gravado pelo SQLAlchemy ('AAAA-MM-DD HH:MM:SS.ffffff') dá a
+    hora sem converter data por linha.
+    """
+    inherit_cache = True
+    type = TipoHora()
+    _traverse_internals = [("coluna", InternalTraversal.dp_clauseelement)]
+
+    def __init__(self, coluna):
+        self.coluna = coluna.__clause_element__()
+
+
+@compiles(hora)
+def _hora_date_trunc(elemento: hora, compiler, **kw) -> str:
+    return f"date_trunc('hour', {compiler.process(elemento.coluna, **kw)})"
+
+
+@compiles(hora, "sqlite")
+def _hora_substr(elemento: hora, compiler, **kw) -> str:
+    return f"substr({compiler.process(elemento.coluna, **kw)}, 1, 13)"
+
+
+def truncar(momento: datetime, bucket: Bucket) -> datetime:
+    """
+    Início do período (hora, dia ou semana começando na segunda-feira) que contém o momento.
+    """
+    if bucket == "hour":
+        return momento.replace(minute=0, second=0, microsecond=0)
+    dia = datetime.combine(momento.date(), time.min)
+    if bucket == "week":
+        dia -= timedelta(days=dia.weekday())
+    return dia
+
+
+def quantidade_pontos(inicio: date, fim: date, bucket: Bucket) -> int:
+    """
+    Quantidade de períodos entre as datas (fim inclusivo).
+    """
+    primeiro = truncar(datetime.combine(inicio, time.min), bucket)
+    limite = datetime.combine(fim + timedelta(days=1), time.min)
+    return max(0, -(-(limite - primeiro) // PASSOS[bucket]))
+
+
+def consulta_serie_vendas(inicio: date, fim: date, livro_id: int | None = None):
+    """
+    Monta a consulta de compras, unidades e receita por hora.
+
+    Filtro e agrupamento usam a mesma expressão `hora` do índice
+    ix_livroscompras_hora (que inclui quantidade_comprados e preco_pago), então
+    o banco percorre só o índice, já na ordem do agrupamento, sem ordenar as
+    linhas. Com livro_id, o índice (livro_id, data_compra, ...) cobre a consulta.
+    Dias e semanas são somados a partir das horas em `agregar`.
+    """
+    periodo = hora(LivrosCompras.data_compra)
+    stmt = (
+        select(
+            periodo.label("hora"),
+            func.count(literal_column("*")).label("compras"),
+            func.sum(LivrosCompras.quantidade_comprados).label("unidades"),
+            func.sum(LivrosCompras.preco_pago).label("receita"),
+        )
+        .where(periodo >= datetime.combine(inicio, time.min),
+               periodo < datetime.combine(fim + timedelta(days=1), time.min))
+        .group_by(periodo)
+    )
+    if livro_id is not None:
+        stmt = stmt.where(LivrosCompras.livro_id == livro_id)
+    return stmt
+
+
+def agregar(linhas, inicio: date, fim: date, bucket: Bucket) -> list[dict]:
+    """
+    Soma as horas em períodos do bucket e completa a série com zeros.
+
+    Args:
+        linhas: Resultado de `consulta_serie_vendas`.
+        inicio, fim (date): Intervalo pedido (fim inclusivo).
+        bucket (Bucket): Tamanho do período.
+
+    Returns:
+        list[dict]: Um ponto por período, em ordem, inclusive os vazios.
+    """
+    totais: dict[datetime, list] = {}
+    for linha in linhas:
+        total = totais.setdefault(truncar(linha.hora, bucket), [0, 0, 0.0])
+        total[0] += linha.compras
+        total[1] += int(linha.unidades)
+        total[2] += float(linha.receita)
+
+    passo = PASSOS[bucket]
+    momento = truncar(datetime.combine(inicio, time.min), bucket)
+    limite = datetime.combine(fim + timedelta(days=1), time.min)
+    pontos = []
+    while momento < limite:
+        compras, unidades, receita = totais.get(momento, (0, 0, 0.0))
+        pontos.append({"inicio": momento, "compras": compras, "unidades": unidades, "receita": round(receita, 2)})
+        momento += passo
+    return pontos
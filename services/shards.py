@@ -0,0 +1,302 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, TypeVar
+from sqlalchemy import inspect, select, text, update
+from sqlalchemy.engine import Connection, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlalchemy.sql import Executable
+from database import async_session, criar_engine
+from metrics import metricas
+from models.livroCompras import LivrosCompras
+from models.sequencia import Sequencia
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Bancos das compras, separados por vírgula. Vazio: compras no banco principal (DATABASE_URL).
+URLS = [url.strip() for url in os.getenv("DATABASE_SHARD_URLS", "").split(",") if url.strip()]
+
+# IDs de compra reservados por vez em `sequencias` (uma escrita no banco principal por bloco).
+BLOCO_IDS = int(os.getenv("SHARDS_BLOCO_IDS", 100))
+
+
+def shard_do_usuario(usuario_id: int, quantidade: int) -> int:
+    """
+    Shard das compras de um usuário (jump consistent hash, Lamping e Veach).
+
+    Ao passar de N para N+1 shards, só ~1/(N+1) dos usuários muda de shard, e
+    todos vão para o novo; com `hash % N` quase todos mudariam.
+
+    Args:
+        usuario_id (int): ID do usuário.
+        quantidade (int): Quantidade de shards.
+
+    Returns:
+        int: Índice do shard, de 0 a quantidade - 1.
+    """
+    chave = usuario_id & 0xFFFFFFFFFFFFFFFF
+    atual, proximo = -1, 0
+    while proximo < quantidade:
+        atual = proximo
+        chave = (chave * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        proximo = int((atual + 1) * ((1 << 31) / ((chave >> 33) + 1)))
+    return atual
+
+
+def criar_tabela(conn: Connection) -> bool:
+    """
+    Cria `livroscompras` e seus índices num shard, se ainda não existir.
+
+    O shard não tem usuarios nem livros, então a tabela é criada sem chaves
+    estrangeiras (a existência de usuário e livro é verificada no banco
+    principal, pela rota). Índices restritos a outro banco (ddl_if) são pulados.
+
+    Args:
+        conn (Connection): Conexão síncrona com o shard.
+
+    Returns:
+        bool: True se a tabela foi criada.
+    """
+    if inspect(conn).has_table(LivrosCompras.__tablename__):
+        return False
+    tabela = LivrosCompras.__table__
+    conn.execute(CreateTable(tabela, include_foreign_key_constraints=[]))
+    for indice in tabela.indexes:
+        condicao = getattr(indice, "_ddl_if", None)
+        if condicao is not None and condicao.dialect not in (None, conn.dialect.name):
+            continue
+        conn.execute(CreateIndex(indice))
+    return True
+
+
+class Shards:
+    """
+    Distribuição da tabela `livroscompras` em vários bancos (shards).
+
+    Cada compra fica no shard do seu usuário (`shard_do_usuario`). Livros,
+    usuários, estoque e contadores continuam no banco principal, então uma
+    escrita de compra toca dois bancos: `gravar` confirma primeiro os shards e
+    depois o banco principal, desfazendo os shards se o commit principal falhar.
+    Os IDs vêm de blocos reservados na tabela `sequencias` do banco principal e
+    são únicos entre os shards, o que permite mover compras de shard (ver
+    scripts.shards) sem renumerá-las.
+
+    Consultas por ID ou sem usuário (listagens, buscas, métricas) são enviadas
+    a todos os shards em paralelo (`espalhar`); as rotas combinam os resultados.
+    Por isso uma compra ainda não movida para o shard certo (durante uma
+    redistribuição) continua visível.
+
+    Sem DATABASE_SHARD_URLS, `ativo` é False e as rotas usam o banco principal.
+    """
+
+    def __init__(self, urls: list[str]):
+        self.urls = urls
+        self._engines: list[AsyncEngine] = []
+        self._fabricas: list[async_sessionmaker[AsyncSession]] = []
+        self._ids = iter(())
+        self._trava_ids = asyncio.Lock()
+
+    @property
+    def ativo(self) -> bool:
+        return bool(self.urls)
+
+    @property
+    def quantidade(self) -> int:
+        return len(self.urls)
+
+    def _iniciar(self) -> None:
+        if not self._engines:
+            # Sem chaves estrangeiras no shard (ver `criar_tabela`).
+            self._engines = [criar_engine(url, chaves_estrangeiras=False) for url in self.urls]
+            self._fabricas = [async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+                              for engine in self._engines]
+
+    def indice(self, usuario_id: int) -> int:
+        return shard_do_usuario(usuario_id, self.quantidade)
+
+    def sessao(self, indice: int) -> AsyncSession:
+        """
+        Nova sessão com um shard (usar com `async with`).
+        """
+        self._iniciar()
+        return self._fabricas[indice]()
+
+    async def espalhar(self, executar: Callable[[AsyncSession], Awaitable[T]]) -> list[T]:
+        """
+        Executa a mesma função em todos os shards em paralelo.
+
+        Args:
+            executar: Recebe a sessão de um shard e devolve o resultado dele.
+
+        Returns:
+            list: Resultado de cada shard, na ordem de DATABASE_SHARD_URLS.
+        """
+        async def no_shard(indice: int):
+            async with self.sessao(indice) as session:
+                return await executar(session)
+
+        metricas.incrementar("shards.espalhadas")
+        return await asyncio.gather(*(no_shard(i) for i in range(self.quantidade)))
+
+    async def localizar(self, compra_id: int) -> tuple[int, LivrosCompras | None]:
+        """
+        Procura uma compra pelo ID em todos os shards.
+
+        Returns:
+            tuple: Índice do shard e a compra (ou -1 e None, se não existir).
+        """
+        encontradas = await self.espalhar(lambda session: session.get(LivrosCompras, compra_id))
+        return next(((i, compra) for i, compra in enumerate(encontradas) if compra is not None), (-1, None))
+
+    async def ler_compras(self, session: AsyncSession, ler: Callable[[AsyncSession], Awaitable[T]]) -> list[T]:
+        """
+        Executa uma leitura de `livroscompras` onde as compras estão.
+
+        Para os leitores fora das rotas (relatórios, analytics, recomendações,
+        feed de alterações): sem shards, `ler` roda uma vez na sessão do banco
+        principal; com shards, roda em cada shard em paralelo (`espalhar`).
+        Quem chama combina as partes.
+
+        Args:
+            session (AsyncSession): Sessão do banco principal.
+            ler: Recebe uma sessão e devolve as compras lidas dela.
+
+        Returns:
+            list: Uma parte por banco lido.
+        """
+        if not self.ativo:
+            return [await ler(session)]
+        return await self.espalhar(ler)
+
+    async def anexar_compras(self, objetos: list, coluna, relacao: str) -> None:
+        """
+        Preenche a relação de compras de livros ou usuários a partir dos shards.
+
+        Com shards, as compras não estão no banco principal e o joinedload das
+        rotas viria vazio; as consultas das rotas deixam de carregá-las e as
+        compras dos objetos são lidas de todos os shards numa consulta por
+        shard. A relação é preenchida como se tivesse sido carregada do banco
+        (sem marcar o objeto como alterado). Sem shards, não faz nada.
+
+        Args:
+            objetos (list): Livros ou usuários já carregados.
+            coluna: Coluna de LivrosCompras que aponta para eles (livro_id ou usuario_id).
+            relacao (str): Nome da relação nos objetos ("compras" ou "livros_comprados").
+        """
+        if not self.ativo or not objetos:
+            return
+        stmt = select(LivrosCompras).where(coluna.in_({objeto.id for objeto in objetos}))
+
+        async def ler(session: AsyncSession) -> list[LivrosCompras]:
+            return (await session.execute(stmt)).scalars().all()
+
+        por_objeto: dict[int, list[LivrosCompras]] = {}
+        for parte in await self.espalhar(ler):
+            for compra in parte:
+                por_objeto.setdefault(getattr(compra, coluna.key), []).append(compra)
+        for objeto in objetos:
+            compras = sorted(por_objeto.get(objeto.id, []), key=lambda compra: compra.id)
+            set_committed_value(objeto, relacao, compras)
+
+    async def proximo_id(self) -> int:
+        """
+        Próximo ID de compra, do bloco reservado por este processo.
+
+        Quando o bloco acaba, reserva outro de SHARDS_BLOCO_IDS somando o valor
+        em `sequencias` num único UPDATE, que serializa os processos no banco
+        principal. IDs de um bloco não usado (processo reiniciado) são pulados.
+        """
+        async with self._trava_ids:
+            proximo = next(self._ids, None)
+            if proximo is None:
+                async with async_session() as session:
+                    result = await session.execute(
+                        update(Sequencia)
+                        .where(Sequencia.nome == LivrosCompras.__tablename__)
+                        .values(valor=Sequencia.valor + BLOCO_IDS)
+                        .returning(Sequencia.valor)
+                    )
+                    ultimo = result.scalar_one()
+                    await session.commit()
+                metricas.incrementar("shards.blocos_ids")
+                self._ids = iter(range(ultimo - BLOCO_IDS + 1, ultimo + 1))
+                proximo = next(self._ids)
+            return proximo
+
+    async def gravar(self, session: AsyncSession, alteracoes: list[tuple[int, Executable, Executable]]) -> None:
+        """
+        Aplica alterações de compras nos shards e faz o commit do banco principal.
+
+        As instruções de cada shard rodam numa transação dele, na ordem dada;
+        em seguida é feito o commit de `session`. Se algo falhar, as instruções
+        de desfazer dos shards já confirmados rodam em ordem inversa e o erro é
+        propagado (com rollback de `session`). Uma falha ao desfazer é só
+        registrada no log: a compra fica divergente até ser corrigida à mão.
+
+        Args:
+            session (AsyncSession): Sessão do banco principal, com as demais
+                alterações da operação (estoque, contadores).
+            alteracoes: Tuplas (índice do shard, instrução, instrução que a desfaz).
+        """
+        por_shard: dict[int, list[tuple[Executable, Executable]]] = {}
+        for indice, instrucao, desfazer in alteracoes:
+            por_shard.setdefault(indice, []).append((instrucao, desfazer))
+
+        confirmados: list[int] = []
+        try:
+            for indice, instrucoes in por_shard.items():
+                async with self.sessao(indice) as shard:
+                    for instrucao, _ in instrucoes:
+                        await shard.execute(instrucao)
+                    await shard.commit()
+                confirmados.append(indice)
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            for indice in reversed(confirmados):
+                await self._desfazer(indice, [desfazer for _, desfazer in reversed(por_shard[indice])])
+            raise
+
+    async def _desfazer(self, indice: int, instrucoes: list[Executable]) -> None:
+        metricas.incrementar("shards.compensacoes")
+        try:
+            async with self.sessao(indice) as shard:
+                for instrucao in instrucoes:
+                    await shard.execute(instrucao)
+                await shard.commit()
+        except Exception:
+            metricas.incrementar("shards.compensacoes_falhas")
+            logger.exception("Falha ao desfazer alteração de compras no shard %d", indice)
+
+    async def verificar(self) -> bool:
+        """
+        Indica se todos os shards respondem.
+        """
+        if not self.ativo:
+            return True
+
+        async def responde(session: AsyncSession) -> bool:
+            try:
+                await session.execute(text("SELECT 1"))
+                return True
+            except Exception:
+                return False
+
+        return all(await self.espalhar(responde))
+
+    async def encerrar(self) -> None:
+        for engine in self._engines:
+            await engine.dispose()
+        self._engines, self._fabricas = [], []
+
+    def estado(self) -> dict:
+        return {"shards": [make_url(url).render_as_string(hide_password=True) for url in self.urls]}
+
+
+shards = Shards(URLS)
+
+metricas.registrar_coletor("shards", shards.estado)